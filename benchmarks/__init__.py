@@ -0,0 +1 @@
+"""Performance benchmarks for ccres_weather_station."""
@@ -0,0 +1,78 @@
+"""Compare the peak RSS of concatenating files with xr.concat or in place.
+
+Each method runs in its own process so ``ru_maxrss`` is not shared.
+
+Usage::
+
+    python -m benchmarks.bench_concat_memory --days 1096
+
+"""
+
+import argparse
+import datetime as dt
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import xarray as xr
+
+from benchmarks.sirta_generator import write_sirta_days
+from ccres_weather_station.config.config import Config
+from ccres_weather_station.readers.sirta import SirtaReader
+
+METHODS = ("xr.concat", "preallocated")
+
+
+def _run(method: str, directory: Path, engine: str) -> None:
+    files = sorted(directory.glob("*.asc"))
+    reader = SirtaReader(Config.default(), engine=engine)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if method == "xr.concat":
+        ds = xr.concat([reader.read_file(file) for file in files], dim="time")
+    else:
+        ds = reader.read_files(files)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(
+        f"{method:>12}: {elapsed:6.2f} s, peak RSS {peak / 1024:7.1f} MiB "
+        f"(+{(peak - baseline) / 1024:.1f} MiB), dataset {ds.nbytes / 2**20:.1f} MiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=1096)
+    parser.add_argument("--engine", default="numpy")
+    parser.add_argument("--method", choices=METHODS)
+    parser.add_argument("--directory", type=Path)
+    args = parser.parse_args()
+
+    if args.method is not None:
+        _run(args.method, args.directory, args.engine)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_sirta_days(Path(tmp), dt.date(2018, 1, 1), args.days)
+        for method in METHODS:
+            subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.bench_concat_memory",
+                    "--method",
+                    method,
+                    "--directory",
+                    tmp,
+                    "--engine",
+                    args.engine,
+                ],
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
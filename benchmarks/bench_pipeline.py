@@ -0,0 +1,68 @@
+"""Benchmarks of each stage of the conversion of SIRTA files."""
+
+import datetime as dt
+from pathlib import Path
+from typing import List
+
+import pytest
+import xarray as xr
+
+from ccres_weather_station.bounders.apply_bounds import apply_bounds
+from ccres_weather_station.config.config import Config
+from ccres_weather_station.readers.constants import ENGINES
+from ccres_weather_station.readers.sirta import SirtaReader
+from ccres_weather_station.writers.write import ConfigWriter, write_nc
+
+
+@pytest.fixture(scope="module")
+def config() -> Config:
+    return Config.default()
+
+
+@pytest.fixture(scope="module")
+def dataset(sirta_span: List[Path], config: Config) -> xr.Dataset:
+    return SirtaReader(config, engine="numpy").read_files(sirta_span)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def bench_read_file(measure, sirta_span: List[Path], config: Config, engine: str):
+    if engine == "pyarrow":
+        pytest.importorskip("pyarrow")
+    reader = SirtaReader(config, engine=engine)
+    ds = measure(reader.count_rows(sirta_span[0]), reader.read_file, sirta_span[0])
+    assert ds.sizes["time"] > 0
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def bench_read_files(measure, sirta_span: List[Path], config: Config, engine: str):
+    if engine == "pyarrow":
+        pytest.importorskip("pyarrow")
+    reader = SirtaReader(config, engine=engine)
+    rows = sum(reader.count_rows(file) for file in sirta_span)
+    ds = measure(rows, reader.read_files, sirta_span)
+    assert ds.sizes["time"] > 0
+
+
+def bench_apply_bounds(measure, dataset: xr.Dataset, config: Config):
+    start = dt.datetime(2020, 1, 2)
+    end = start + dt.timedelta(days=7)
+    measure(dataset.sizes["time"], apply_bounds, dataset, config, start, end)
+
+
+def bench_config_writer(measure, dataset: xr.Dataset, config: Config):
+    def add_metadata(ds: xr.Dataset) -> None:
+        writer = ConfigWriter(config)
+        writer.add_config_meta(ds)
+        writer.get_encoding(ds)
+
+    measure(dataset.sizes["time"], add_metadata, dataset.copy())
+
+
+@pytest.mark.parametrize("preset", [None, "balanced"])
+def bench_write_nc(
+    measure, dataset: xr.Dataset, config: Config, tmp_path: Path, preset: str
+):
+    def write(ds: xr.Dataset) -> None:
+        write_nc(ds.copy(), config, tmp_path / "out.nc", preset=preset)
+
+    measure(dataset.sizes["time"], write, dataset)
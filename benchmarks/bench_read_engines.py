@@ -0,0 +1,46 @@
+"""Compare the rows/s of each parse engine of SirtaReader.read_file.
+
+Usage::
+
+    python -m benchmarks.bench_read_engines --days 30
+
+"""
+
+import argparse
+import datetime as dt
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.sirta_generator import write_sirta_days
+from ccres_weather_station.config.config import Config
+from ccres_weather_station.readers.constants import ENGINES
+from ccres_weather_station.readers.sirta import SirtaReader
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    config = Config.default()
+    with tempfile.TemporaryDirectory() as tmp:
+        files = write_sirta_days(Path(tmp), dt.date(2020, 1, 1), args.days)
+        for engine in ENGINES:
+            reader = SirtaReader(config, engine=engine)
+            try:
+                reader.read_file(files[0])
+            except ImportError as err:
+                print(f"{engine:>8}: skipped ({err})")
+                continue
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                rows = sum(len(reader.parse_file(file)) for file in files)
+                best = min(best, time.perf_counter() - start)
+            print(f"{engine:>8}: {rows / best:12,.0f} rows/s ({rows} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Measure SirtaReader.read_files with several numbers of workers.
+
+Usage::
+
+    python -m benchmarks.bench_read_files --days 365 --workers 1 4 0
+
+"""
+
+import argparse
+import datetime as dt
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.sirta_generator import write_sirta_days
+from ccres_weather_station.config.config import Config
+from ccres_weather_station.readers.constants import ENGINES
+from ccres_weather_station.readers.sirta import SirtaReader
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--engine", choices=ENGINES, default="numpy")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 0])
+    args = parser.parse_args()
+
+    reader = SirtaReader(Config.default(), engine=args.engine)
+    with tempfile.TemporaryDirectory() as tmp:
+        files = write_sirta_days(Path(tmp), dt.date(2020, 1, 1), args.days)
+        for workers in args.workers:
+            start = time.perf_counter()
+            ds = reader.read_files(files, workers=workers)
+            elapsed = time.perf_counter() - start
+            rows = ds.sizes[reader.time_name]
+            speed = rows / elapsed
+            print(f"workers={workers:>3}: {elapsed:7.2f} s, {speed:12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Measure the fixed cost of the CLI: ``--help`` and a one-file conversion.
+
+Each case runs in a fresh interpreter, the median wall time is compared to
+a budget and the slowest imports are listed from ``python -X importtime``.
+The exit code is 1 when a budget is exceeded.
+
+Usage::
+
+    python -m benchmarks.bench_startup --repeat 5 --help-budget 0.3
+
+"""
+
+import argparse
+import datetime as dt
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from benchmarks.sirta_generator import write_sirta_days
+
+CLI = [sys.executable, "-m", "ccres_weather_station.cli.cli"]
+
+
+def _wall_time(command: List[str], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, capture_output=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def _slowest_imports(command: List[str], top: int) -> List[Tuple[int, str]]:
+    """Get the cumulative import times in us of the slowest top-level imports."""
+    stderr = subprocess.run(
+        [command[0], "-X", "importtime"] + command[1:],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        # Nested imports are indented, keep the top-level ones
+        if not name.startswith("  "):
+            imports.append((int(cumulative), name.strip()))
+    return sorted(imports, reverse=True)[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--help-budget", type=float, default=0.3)
+    parser.add_argument("--convert-budget", type=float, default=3.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = write_sirta_days(Path(tmp), dt.date(2020, 1, 1), 1)
+        cases = {
+            "help": (CLI + ["--help"], args.help_budget),
+            "convert": (
+                CLI
+                + ["--station", "sirta", "--input-files", str(files[0])]
+                + ["--output-file", str(Path(tmp) / "out.nc"), "--no-cache"],
+                args.convert_budget,
+            ),
+        }
+        over_budget = False
+        for name, (command, budget) in cases.items():
+            elapsed = _wall_time(command, args.repeat)
+            status = "ok" if elapsed <= budget else "OVER BUDGET"
+            over_budget |= elapsed > budget
+            print(f"{name:>8}: {elapsed:6.3f} s (budget {budget:.3f} s) {status}")
+            for cumulative, module in _slowest_imports(command, args.top):
+                print(f"{'':>10}{cumulative / 1e6:6.3f} s  import {module}")
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
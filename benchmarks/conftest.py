@@ -0,0 +1,80 @@
+"""Fixtures of the benchmark suite.
+
+The input files are generated once per session with realistic defects. The
+span is set with ``--bench-days`` (default 30 days, 43200 rows).
+
+Each benchmark stores in ``extra_info`` its throughput in rows/s and the
+peak memory in MiB added by one run, measured in a forked process so
+native allocations, e.g. by pyarrow, are counted too.
+Save a run with ``--benchmark-autosave`` and compare a later one with
+``--benchmark-compare --benchmark-compare-fail=mean:10%`` to catch
+regressions.
+
+"""
+
+import datetime as dt
+import multiprocessing
+import resource
+from pathlib import Path
+from typing import Any, Callable, List
+
+import pytest
+
+from benchmarks.sirta_generator import REALISTIC_DEFECTS, write_sirta_days
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption(
+        "--bench-days",
+        type=int,
+        default=30,
+        help="Number of days of generated SIRTA files",
+    )
+
+
+@pytest.fixture(scope="session")
+def sirta_span(
+    request: pytest.FixtureRequest, tmp_path_factory: pytest.TempPathFactory
+) -> List[Path]:
+    days = request.config.getoption("--bench-days")
+    return write_sirta_days(
+        tmp_path_factory.mktemp("sirta"), dt.date(2020, 1, 1), days, REALISTIC_DEFECTS
+    )
+
+
+def _max_rss() -> int:
+    # In KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _run_forked(connection: Any, func: Callable[..., Any], *args: Any) -> None:
+    before = _max_rss()
+    func(*args)
+    connection.send(_max_rss() - before)
+    connection.close()
+
+
+def peak_memory(func: Callable[..., Any], *args: Any) -> float:
+    """Get the peak memory in MiB added by one call, run in a child process."""
+    context = multiprocessing.get_context("fork")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_run_forked, args=(sender, func, *args))
+    process.start()
+    sender.close()
+    peak = receiver.recv()
+    process.join()
+    return peak / 2**10
+
+
+@pytest.fixture()
+def measure(benchmark: Any) -> Callable[..., Any]:
+    """Benchmark a function and record its rows/s and peak memory."""
+
+    def _measure(rows: int, func: Callable[..., Any], *args: Any) -> Any:
+        result = benchmark(func, *args)
+        benchmark.extra_info["rows"] = rows
+        benchmark.extra_info["rows_per_s"] = rows / benchmark.stats.stats.mean
+        benchmark.extra_info["peak_mib"] = peak_memory(func, *args)
+        return result
+
+    return _measure
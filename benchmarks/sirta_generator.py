@@ -0,0 +1,137 @@
+"""Write synthetic SIRTA-format ASCII files for benchmarks.
+
+Files follow the layout of the SIRTA meteoairsol daily files: a commented
+header, then one line per minute with the ISO 8601 time and six values.
+Spans of days to decades can be written, with the defects of real files:
+missing days, outages of a few hours inside a day, comment lines in the
+data and missing values written as ``nan``.
+
+"""
+
+import argparse
+import datetime as dt
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+SIRTA_NAME = "meteoairsol_1a_Lz1NairF1minPtuvPrain_v01_{day:%Y%m%d}_000000_1440.asc"
+SIRTA_HEADER = (
+    "# SIRTA meteoairsol synthetic file\n"
+    "# time wind_speed wind_direction air_temperature relative_humidity "
+    "pressure precipitation_rate\n"
+)
+MAINTENANCE_COMMENT = "# instrument maintenance"
+
+
+@dataclass(frozen=True)
+class Defects:
+    """Defects of the generated files, as probabilities.
+
+    Parameters
+    ----------
+    missing_day : float
+        Probability that the file of a day does not exist
+    outage : float
+        Probability that a day has an outage of up to 6 hours without rows
+    nan : float
+        Probability that a value is missing
+    comment : float
+        Probability that a comment line follows a row
+
+    """
+
+    missing_day: float = 0.0
+    outage: float = 0.0
+    nan: float = 0.0
+    comment: float = 0.0
+
+
+NO_DEFECTS = Defects()
+REALISTIC_DEFECTS = Defects(missing_day=0.01, outage=0.05, nan=0.001, comment=0.001)
+
+
+def _day_values(rng: np.random.Generator, n: int) -> np.ndarray:
+    minutes = np.arange(n)
+    daily = np.sin(2 * np.pi * minutes / 1440)
+    return np.column_stack(
+        [
+            np.abs(rng.normal(3, 1.5, n)),
+            rng.uniform(0, 360, n),
+            12 + 6 * daily + rng.normal(0, 0.2, n),
+            np.clip(70 - 20 * daily + rng.normal(0, 2, n), 0, 100),
+            1013 + rng.normal(0, 0.5, n).cumsum() / 10,
+            np.where(rng.random(n) < 0.05, rng.exponential(2, n), 0.0),
+        ]
+    )
+
+
+def write_sirta_day(
+    path: Path, day: dt.date, seed: int = 0, defects: Defects = NO_DEFECTS
+) -> Path:
+    """Write one daily file of up to 1440 1-minute records."""
+    rng = np.random.default_rng(seed)
+    time = pd.date_range(pd.Timestamp(day), periods=1440, freq="1min")
+    values = _day_values(rng, time.size)
+    keep = np.ones(time.size, dtype=bool)
+    if rng.random() < defects.outage:
+        start = rng.integers(0, time.size)
+        keep[start : start + rng.integers(1, 6 * 60)] = False
+    values[rng.random(values.shape) < defects.nan] = np.nan
+    comments = rng.random(time.size) < defects.comment
+
+    stamps = time.strftime("%Y-%m-%dT%H:%M:%SZ")
+    lines = []
+    for stamp, row, kept, comment in zip(stamps, values, keep, comments):
+        if kept:
+            lines.append(
+                f"{stamp} {row[0]:.2f} {row[1]:.1f} {row[2]:.2f} {row[3]:.1f} "
+                f"{row[4]:.2f} {row[5]:.2f}"
+            )
+        if comment:
+            lines.append(MAINTENANCE_COMMENT)
+    path.write_text(SIRTA_HEADER + "\n".join(lines) + "\n")
+    return path
+
+
+def write_sirta_days(
+    directory: Path, start: dt.date, days: int, defects: Defects = NO_DEFECTS
+) -> List[Path]:
+    """Write the daily files of ``days`` consecutive days in ``directory``.
+
+    Returns
+    -------
+    List[Path]
+        Written files, without the missing days
+
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    missing = np.random.default_rng(days).random(days) < defects.missing_day
+    paths = []
+    for i in range(days):
+        if missing[i]:
+            continue
+        day = start + dt.timedelta(days=i)
+        path = directory / SIRTA_NAME.format(day=day)
+        paths.append(write_sirta_day(path, day, i, defects))
+    return paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Write synthetic SIRTA files")
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--start", type=dt.date.fromisoformat, default="2020-01-01")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument(
+        "--realistic", action="store_true", help="Add gaps, comments and NaNs"
+    )
+    args = parser.parse_args()
+    defects = REALISTIC_DEFECTS if args.realistic else NO_DEFECTS
+    paths = write_sirta_days(args.directory, args.start, args.days, defects)
+    print(f"{len(paths)} files written in {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""Convert many input files to many outputs in one process.
+
+Input files are grouped by output path, rendered from an output pattern
+with the start of the period covered by each file. The same reader and
+configuration are used for every output, and a failing input or output is
+logged and skipped instead of aborting the whole run.
+
+"""
+
+import datetime as dt
+import logging
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import xarray as xr
+
+from ccres_weather_station.bounders.apply_bounds import apply_bounds
+from ccres_weather_station.config.config import Config
+from ccres_weather_station.metrics.metrics import Metrics, measure
+from ccres_weather_station.qc.qc import apply_qc
+from ccres_weather_station.readers.base import BaseReader
+from ccres_weather_station.readers.sources import (
+    expand_archives,
+    input_size,
+    split_member,
+)
+from ccres_weather_station.resample.resample import resample
+from ccres_weather_station.types import PathLike, PathsLike
+from ccres_weather_station.writers.constants import DEFAULT_OUTPUT_FORMAT
+from ccres_weather_station.writers.presets import DEFAULT_READ_PERIOD
+from ccres_weather_station.writers.write import get_writer
+
+lgr = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one output of a batch."""
+
+    output: Path
+    inputs: List[Path]
+    failed_inputs: List[Path] = field(default_factory=list)
+    error: Optional[str] = None
+    bytes_read: int = 0
+    rows: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.failed_inputs
+
+
+def list_input_files(
+    input_dir: Optional[PathLike] = None,
+    pattern: str = "*",
+    file_list: Optional[Iterable[str]] = None,
+) -> List[Path]:
+    """List the input files of a batch.
+
+    Parameters
+    ----------
+    input_dir : Optional[PathLike]
+        Directory searched recursively for files matching ``pattern``
+    pattern : str
+        Glob pattern of the input files
+    file_list : Optional[Iterable[str]]
+        Lines of a file containing one input path per line
+
+    Returns
+    -------
+    List[Path]
+        Sorted unique input files
+
+    """
+    files: Set[Path] = set()
+    if input_dir is not None:
+        files.update(p for p in Path(input_dir).rglob(pattern) if p.is_file())
+    if file_list is not None:
+        files.update(Path(line.strip()) for line in file_list if line.strip())
+    return sorted(files)
+
+
+def render_output(
+    reader: BaseReader, file: PathLike, output_pattern: str, station: str
+) -> Path:
+    """Render the output path of an input file.
+
+    The pattern is a ``str.format`` template with the fields ``station``,
+    ``stem`` (input file or archive member name without suffix) and ``date``
+    (start of the input file), e.g. ``out/{station}_{date:%Y%m}.nc``.
+
+    """
+    coverage = reader.file_coverage(file)
+    date = coverage[0] if coverage is not None else None
+    if date is None and "{date" in output_pattern:
+        raise ValueError(f"Cannot get the date of {file} from its name")
+    container, member = split_member(file)
+    stem = Path(member).stem if member is not None else container.stem
+    return Path(output_pattern.format(station=station, stem=stem, date=date))
+
+
+def group_by_output(
+    reader: BaseReader, files: PathsLike, output_pattern: str, station: str
+) -> Tuple[Dict[Path, List[Path]], List[BatchResult]]:
+    """Group the input files by output path.
+
+    Returns
+    -------
+    Tuple[Dict[Path, List[Path]], List[BatchResult]]
+        Input files of each output, and the failures of files without any
+        output
+
+    """
+    groups: Dict[Path, List[Path]] = {}
+    failures = []
+    for file in files:
+        try:
+            output = render_output(reader, file, output_pattern, station)
+        except (ValueError, KeyError, IndexError) as err:
+            lgr.error(f"No output for {file}: {err}")
+            failures.append(
+                BatchResult(output=Path(), inputs=[Path(file)], error=str(err))
+            )
+            continue
+        groups.setdefault(output, []).append(Path(file))
+    return groups, failures
+
+
+def _read_isolated(
+    reader: BaseReader,
+    files: List[Path],
+    workers: Optional[int],
+    start_date: Optional[dt.datetime],
+    end_date: Optional[dt.datetime],
+    metrics: Optional[Metrics] = None,
+    duplicates: Optional[str] = None,
+    regular: bool = False,
+) -> Tuple[Optional[xr.Dataset], List[Path]]:
+    """Read files, dropping the ones that cannot be read."""
+    read_files = partial(
+        reader.read,
+        workers=workers,
+        start_date=start_date,
+        end_date=end_date,
+        metrics=metrics,
+        duplicates=duplicates,
+        regular=regular,
+    )
+    try:
+        return read_files(files), []
+    except Exception as err:
+        lgr.warning(f"Cannot read all the files at once ({err}), trying one by one")
+
+    good, failed = [], []
+    for file in files:
+        try:
+            reader.read_file(file)
+        except Exception as err:
+            lgr.error(f"Cannot read {file}: {err}")
+            failed.append(file)
+            continue
+        good.append(file)
+    if not good:
+        return None, failed
+    return read_files(good), failed
+
+
+def convert_group(
+    reader: BaseReader,
+    config: Config,
+    output: Path,
+    files: List[Path],
+    start_date: Optional[dt.datetime] = None,
+    end_date: Optional[dt.datetime] = None,
+    workers: Optional[int] = None,
+    mode: str = "w",
+    preset: Optional[str] = None,
+    read_period: str = DEFAULT_READ_PERIOD,
+    output_format: str = DEFAULT_OUTPUT_FORMAT,
+    metrics: Optional[Metrics] = None,
+    resample_period: Optional[str] = None,
+    qc: bool = False,
+    qc_mask: bool = False,
+    duplicates: Optional[str] = None,
+    regular: bool = False,
+) -> BatchResult:
+    """Convert the input files of one output, never raising."""
+    result = BatchResult(output=output, inputs=files)
+    dim_time = config.coords["time"].name
+    try:
+        with measure(metrics, "read", output) as record:
+            ds, result.failed_inputs = _read_isolated(
+                reader,
+                files,
+                workers,
+                start_date,
+                end_date,
+                metrics,
+                duplicates,
+                regular,
+            )
+            record.bytes_read = result.bytes_read = sum(map(input_size, files))
+            if ds is not None:
+                record.rows = ds.sizes[dim_time]
+        if ds is None:
+            result.error = "No input file could be read"
+            return result
+        with measure(metrics, "bounds", output) as record:
+            ds = apply_bounds(ds, config, start_date, end_date)
+            record.rows = ds.sizes[dim_time]
+        if qc or qc_mask:
+            with measure(metrics, "qc", output) as record:
+                ds = apply_qc(ds, config, qc_mask)
+                record.rows = ds.sizes[dim_time]
+        if resample_period is not None:
+            with measure(metrics, "resample", output) as record:
+                ds = resample(ds, config, resample_period)
+                record.rows = ds.sizes[dim_time]
+        output.parent.mkdir(parents=True, exist_ok=True)
+        get_writer(output_format)(
+            ds, config, output, mode, preset, read_period, metrics=metrics
+        )
+        result.rows = ds.sizes[dim_time]
+    except Exception as err:
+        lgr.exception(f"Cannot write {output}")
+        result.error = str(err)
+        return result
+    lgr.info(f"Output file {output.absolute()} generated from {len(files)} files")
+    return result
+
+
+def run_batch(
+    reader: BaseReader,
+    config: Config,
+    files: PathsLike,
+    output_pattern: str,
+    station: str,
+    start_date: Optional[dt.datetime] = None,
+    end_date: Optional[dt.datetime] = None,
+    workers: Optional[int] = None,
+    mode: str = "w",
+    preset: Optional[str] = None,
+    read_period: str = DEFAULT_READ_PERIOD,
+    output_format: str = DEFAULT_OUTPUT_FORMAT,
+    metrics: Optional[Metrics] = None,
+    resample_period: Optional[str] = None,
+    qc: bool = False,
+    qc_mask: bool = False,
+    duplicates: Optional[str] = None,
+    regular: bool = False,
+) -> List[BatchResult]:
+    """Convert all files, one output at a time.
+
+    Parameters
+    ----------
+    reader : BaseReader
+        Reader shared by all the outputs
+    config : Config
+        Configuration shared by all the outputs
+    files : PathsLike
+        Input files, the members of the archives are converted
+    output_pattern : str
+        Template of the outputs, see ``render_output``
+    station : str
+        Station name, available in the output pattern
+    start_date : Optional[dt.datetime]
+        Date from which to keep all output data
+    end_date : Optional[dt.datetime]
+        Date from which to remove all output data
+    workers : Optional[int]
+        Number of processes parsing the files of each output
+    mode : str
+        Write mode of ``write_nc``
+    preset : Optional[str]
+        Encoding preset of ``write_nc``
+    read_period : str
+        Expected read pattern of ``write_nc``
+    output_format : str
+        Format of the outputs, one of ``OUTPUT_FORMATS``
+    metrics : Optional[Metrics]
+        Metrics where the stages of each output are recorded
+    resample_period : Optional[str]
+        Width of the bins the outputs are resampled into, e.g. ``10min``,
+        None to keep the input samples
+    qc : bool
+        Flag the values outside of their valid range, see ``apply_qc``
+    qc_mask : bool
+        Flag the values outside of their valid range and replace them with NaN
+    duplicates : Optional[str]
+        Merge the rows of the inputs of each output by time with this
+        duplicate policy, see ``BaseReader.read``
+    regular : bool
+        Merge the rows and reindex them onto a regular grid
+
+    Returns
+    -------
+    List[BatchResult]
+        One result per output, plus the inputs without output
+
+    """
+    selected = reader.select_files(expand_archives(files), start_date, end_date)
+    groups, results = group_by_output(reader, selected, output_pattern, station)
+    lgr.info(f"{len(selected)} input files to convert into {len(groups)} outputs")
+    for output, group in sorted(groups.items()):
+        results.append(
+            convert_group(
+                reader,
+                config,
+                output,
+                group,
+                start_date,
+                end_date,
+                workers,
+                mode,
+                preset,
+                read_period,
+                output_format,
+                metrics,
+                resample_period,
+                qc,
+                qc_mask,
+                duplicates,
+                regular,
+            )
+        )
+    return results
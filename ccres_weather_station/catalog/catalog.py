@@ -0,0 +1,325 @@
+"""Persistent catalog of the input files of a station.
+
+The catalog is a SQLite database holding, for each input file, its size,
+modification time, number of rows and the times of its first and last
+rows. Only the first and last data lines of a file are decoded to index it,
+its rows are counted by the reader scanning its lines without parsing them,
+and unchanged files are not read again when the catalog is updated.
+
+Times are stored as integer nanoseconds since 1970 and indexed, so the
+files intersecting a time range are found with an index range scan.
+
+"""
+
+import datetime as dt
+import logging
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from types import TracebackType
+from typing import List, Optional, Tuple, Type
+
+import numpy as np
+
+from ccres_weather_station.readers.base import BaseReader
+from ccres_weather_station.readers.sources import (
+    expand_archives,
+    input_stat,
+    split_member,
+)
+from ccres_weather_station.types import PathLike, PathsLike
+
+lgr = logging.getLogger(__name__)
+
+CATALOG_VERSION = "1"
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    first_ns INTEGER NOT NULL,
+    last_ns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_first_ns ON files (first_ns);
+"""
+
+
+def _to_ns(date: dt.datetime) -> int:
+    return int(np.datetime64(date, "ns").astype(np.int64))
+
+
+def _from_ns(ns: int) -> np.datetime64:
+    return np.datetime64(ns, "ns")
+
+
+@dataclass
+class CatalogEntry:
+    """One input file of the catalog.
+
+    ``rows`` is the number of data lines counted by ``BaseReader.count_rows``,
+    ``first`` and ``last`` the times of the first and last rows.
+
+    """
+
+    path: Path
+    size: int
+    mtime_ns: int
+    rows: int
+    first: np.datetime64
+    last: np.datetime64
+
+    @property
+    def step(self) -> Optional[np.timedelta64]:
+        """Mean time step between two rows, None with less than two rows."""
+        if self.rows < 2:
+            return None
+        return (self.last - self.first) / (self.rows - 1)
+
+
+class Catalog:
+    """Catalog of the input files of one station.
+
+    Parameters
+    ----------
+    path : PathLike
+        Path of the SQLite database, created if needed
+    station : str
+        Station of the files, a catalog only holds the files of one station
+
+    Raises
+    ------
+    ValueError
+        If the catalog was built for another station or by an incompatible
+        version
+
+    """
+
+    def __init__(self, path: PathLike, station: str):
+        self.path = Path(path)
+        self.station = station.lower()
+        self._connection = sqlite3.connect(str(self.path))
+        self._connection.executescript(_SCHEMA)
+        meta = (("version", CATALOG_VERSION), ("station", self.station))
+        with self._connection:
+            for key, value in meta:
+                self._connection.execute(
+                    "INSERT OR IGNORE INTO meta VALUES (?, ?)", (key, value)
+                )
+        for key, value in meta:
+            stored = self._get_meta(key)
+            if stored != value:
+                self.close()
+                raise ValueError(
+                    f"Catalog {self.path} has {key} {stored}, expected {value}"
+                )
+
+    def __enter__(self) -> "Catalog":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._connection.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def _max_duration_ns(self) -> int:
+        value = self._get_meta("max_duration_ns")
+        return 0 if value is None else int(value)
+
+    def _index_file(self, reader: BaseReader, path: Path) -> Optional[CatalogEntry]:
+        stat = input_stat(path)
+        row = self._connection.execute(
+            "SELECT size, mtime_ns FROM files WHERE path = ?", (str(path),)
+        ).fetchone()
+        if row == (stat.st_size, stat.st_mtime_ns):
+            return None
+
+        extent = reader.file_extent(path)
+        if extent is None:
+            coverage = reader.file_coverage(path)
+            if coverage is None:
+                raise ValueError(f"Cannot get the time coverage of {path}")
+            # The name gives the end excluded, keep the last row included
+            extent = (
+                np.datetime64(coverage[0], "ns"),
+                np.datetime64(coverage[1], "ns") - np.timedelta64(1, "ns"),
+            )
+        return CatalogEntry(
+            path=path,
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            rows=reader.count_rows(path),
+            first=extent[0],
+            last=extent[1],
+        )
+
+    def update(
+        self, reader: BaseReader, files: PathsLike
+    ) -> Tuple[int, int, List[Path]]:
+        """Index new and modified files.
+
+        Parameters
+        ----------
+        reader : BaseReader
+            Reader of the station, telling the times of the first and last
+            rows of a file
+        files : PathsLike
+            Files to index, unchanged files since the last update are
+            skipped. Archives are replaced with their members.
+
+        Returns
+        -------
+        Tuple[int, int, List[Path]]
+            Number of indexed files, of unchanged files, and the files that
+            could not be indexed
+
+        """
+        indexed, unchanged, failed = 0, 0, []
+        max_duration = self._max_duration_ns()
+        with self._connection:
+            for file in expand_archives(files):
+                path = Path(file).resolve()
+                try:
+                    entry = self._index_file(reader, path)
+                except (OSError, ValueError) as err:
+                    lgr.error(f"Cannot index {path}: {err}")
+                    failed.append(path)
+                    continue
+                if entry is None:
+                    unchanged += 1
+                    continue
+                first = int(entry.first.astype(np.int64))
+                last = int(entry.last.astype(np.int64))
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                    (str(path), entry.size, entry.mtime_ns, entry.rows, first, last),
+                )
+                max_duration = max(max_duration, last - first)
+                indexed += 1
+            self._connection.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('max_duration_ns', ?)",
+                (str(max_duration),),
+            )
+        lgr.info(
+            f"{indexed} files indexed, {unchanged} unchanged, {len(failed)} failed"
+        )
+        return indexed, unchanged, failed
+
+    def prune(self) -> List[Path]:
+        """Remove the files that do not exist anymore."""
+        removed = [
+            entry.path
+            for entry in self.entries()
+            if not split_member(entry.path)[0].exists()
+        ]
+        with self._connection:
+            self._connection.executemany(
+                "DELETE FROM files WHERE path = ?", [(str(p),) for p in removed]
+            )
+        return removed
+
+    def entries(self) -> List[CatalogEntry]:
+        """Get all the files ordered by the time of their first row."""
+        rows = self._connection.execute(
+            "SELECT path, size, mtime_ns, rows, first_ns, last_ns FROM files "
+            "ORDER BY first_ns, path"
+        )
+        return [
+            CatalogEntry(
+                path=Path(path),
+                size=size,
+                mtime_ns=mtime_ns,
+                rows=n_rows,
+                first=_from_ns(first),
+                last=_from_ns(last),
+            )
+            for path, size, mtime_ns, n_rows, first, last in rows
+        ]
+
+    def select(
+        self,
+        start_date: Optional[dt.datetime] = None,
+        end_date: Optional[dt.datetime] = None,
+    ) -> List[Path]:
+        """Get the files with rows from start_date to end_date, both included.
+
+        The first row of a matching file is at most the longest file
+        duration before start_date, so the query is a range scan of the
+        index on the first rows.
+
+        """
+        low = -(2**63) if start_date is None else _to_ns(start_date)
+        high = 2**63 - 1 if end_date is None else _to_ns(end_date)
+        if start_date is not None:
+            low_first = max(low - self._max_duration_ns(), -(2**63))
+        else:
+            low_first = low
+        rows = self._connection.execute(
+            "SELECT path FROM files WHERE first_ns BETWEEN ? AND ? AND last_ns >= ? "
+            "ORDER BY first_ns, path",
+            (low_first, high, low),
+        )
+        return [Path(path) for path, in rows]
+
+    def gaps(
+        self, max_step: Optional[np.timedelta64] = None
+    ) -> List[Tuple[np.datetime64, np.datetime64]]:
+        """Get the periods between files without any row.
+
+        Parameters
+        ----------
+        max_step : Optional[np.timedelta64]
+            Longest time between two rows not considered as a gap. By
+            default the median time step of the files.
+
+        Returns
+        -------
+        List[Tuple[np.datetime64, np.datetime64]]
+            Time of the last row before and of the first row after each gap
+
+        """
+        entries = self.entries()
+        if max_step is None:
+            steps = [entry.step for entry in entries if entry.step is not None]
+            max_step = (
+                np.sort(np.array(steps))[len(steps) // 2]
+                if steps
+                else np.timedelta64(0, "ns")
+            )
+        gaps = []
+        for previous_last, entry in zip(self._running_last(entries), entries[1:]):
+            if entry.first - previous_last > max_step:
+                gaps.append((previous_last, entry.first))
+        return gaps
+
+    def overlaps(self) -> List[Tuple[Path, Path]]:
+        """Get the pairs of consecutive files covering the same times."""
+        entries = self.entries()
+        overlaps = []
+        latest = None
+        for entry in entries:
+            if latest is not None and entry.first <= latest.last:
+                overlaps.append((latest.path, entry.path))
+            if latest is None or entry.last > latest.last:
+                latest = entry
+        return overlaps
+
+    @staticmethod
+    def _running_last(entries: List[CatalogEntry]) -> List[np.datetime64]:
+        running: List[np.datetime64] = []
+        for entry in entries:
+            running.append(entry.last if not running else max(running[-1], entry.last))
+        return running
@@ -4,37 +4,124 @@ import datetime as dt
 import logging
 import sys
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, TextIO, Tuple
 
 import click
 
-from ccres_weather_station.bounders.apply_bounds import apply_bounds
 from ccres_weather_station.config.config import Config
 from ccres_weather_station.logger import get_log_level_from_count, init_logger
-from ccres_weather_station.readers.register import get_reader_class
+from ccres_weather_station.manifest.constants import DEFAULT_JOBS
+from ccres_weather_station.readers.constants import (
+    AUTO_ENGINE,
+    DEFAULT_CACHE_DIR,
+    DEFAULT_CACHE_SIZE,
+    DEFAULT_ENGINE,
+    DEFAULT_MEMORY_BUDGET,
+    DEFAULT_SCHEDULER,
+    DUPLICATE_POLICIES,
+    ENGINES,
+    SCHEDULERS,
+)
 from ccres_weather_station.types import PathLike, PathsLike
-from ccres_weather_station.writers.write import write_nc
+from ccres_weather_station.watch.constants import (
+    DEFAULT_INTERVAL as DEFAULT_WATCH_INTERVAL,
+)
+from ccres_weather_station.writers.constants import (
+    DEFAULT_OUTPUT_FORMAT,
+    OUTPUT_FORMATS,
+)
+from ccres_weather_station.writers.presets import DEFAULT_READ_PERIOD, ENCODING_PRESETS
+
+if TYPE_CHECKING:
+    from ccres_weather_station.batch.batch import BatchResult
+    from ccres_weather_station.readers.base import BaseReader
+
+# numpy, pandas, xarray and netCDF4 are only imported by the commands using
+# them, so that --help and argument errors stay fast.
 
 lgr = logging.getLogger(__name__)
 CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"])
+DEFAULT_COMMAND = "convert"
 
 
 def _get_dates(
-    start_date: Optional[dt.datetime], end_date: Optional[dt.datetime]
+    start_date: Optional[dt.datetime],
+    end_date: Optional[dt.datetime],
+    open_end: bool = False,
 ) -> Tuple[Optional[dt.datetime], Optional[dt.datetime]]:
+    """Check the date bounds, a lone start date keeping only its day.
+
+    With ``open_end``, a start date without end date keeps all the data
+    after it.
+
+    """
     if start_date is not None:
         if end_date is not None:
             if start_date > end_date:
                 raise ValueError("Start date is newer than end_date")
             elif start_date == end_date:
                 end_date = start_date + dt.timedelta(days=1)
-        else:
+        elif not open_end:
             end_date = start_date + dt.timedelta(days=1)
     return start_date, end_date
 
 
-@click.command(context_settings=CONTEXT_SETTINGS)
-@click.option(
+def _get_config(config_file: Optional[PathLike]) -> Config:
+    config = Config.default()
+    if config_file is not None:
+        config.add_config_from_toml(config_file)
+    return config
+
+
+def _get_reader(
+    station: str,
+    config: Config,
+    engine: str,
+    cache_dir: PathLike,
+    cache_size: int,
+    no_cache: bool,
+) -> "BaseReader":
+    from ccres_weather_station.readers.cache import ParsedCache
+    from ccres_weather_station.readers.register import get_station_reader_class
+
+    lgr.debug("Get reader class")
+    reader_class = get_station_reader_class(station, config)
+
+    cache = None
+    if not no_cache:
+        cache = ParsedCache(cache_dir, max_bytes=cache_size * 2**20)
+
+    lgr.debug("Instantiate class")
+    return reader_class(config, engine=engine, cache=cache)
+
+
+class DefaultCommandGroup(click.Group):
+    """Group running the ``convert`` command when no command is given.
+
+    It keeps ``ccres_weather_station --station ...`` working.
+
+    """
+
+    def parse_args(self, ctx: click.Context, args: List[str]) -> List[str]:
+        if (
+            args
+            and args[0] not in self.commands
+            and args[0] not in ctx.help_option_names
+        ):
+            args.insert(0, DEFAULT_COMMAND)
+        return super().parse_args(ctx, args)
+
+
+def _add_options(options: List[Callable]) -> Callable:
+    def decorator(f: Callable) -> Callable:
+        for option in reversed(options):
+            f = option(f)
+        return f
+
+    return decorator
+
+
+VERBOSE_OPTION = click.option(
     "-v",
     "--verbose",
     count=True,
@@ -46,6 +133,252 @@ def _get_dates(
         "-vv sets the level to DEBUG."
     ),
 )
+
+CONFIG_OPTION = click.option(
+    "--config",
+    "config_file",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help=(
+        "\b\nStation TOML file completing the default configuration.\n"
+        "A [reader] section declares the layout of the input files"
+    ),
+)
+
+ENGINE_OPTION = click.option(
+    "--engine",
+    type=click.Choice([*ENGINES, AUTO_ENGINE]),
+    default=DEFAULT_ENGINE,
+    show_default=True,
+    help=(
+        "\b\nEngine used to parse the input files.\n"
+        "auto picks the fastest one able to parse them"
+    ),
+)
+
+READER_OPTIONS = [
+    ENGINE_OPTION,
+    click.option(
+        "--workers",
+        type=click.IntRange(min=0),
+        default=1,
+        show_default=True,
+        help=("\b\nNumber of processes parsing the input files.\n0 uses all CPUs"),
+    ),
+    click.option(
+        "--cache-dir",
+        type=click.Path(file_okay=False),
+        default=DEFAULT_CACHE_DIR,
+        show_default=True,
+        help=("\b\nDirectory of the cache of parsed input files"),
+    ),
+    click.option(
+        "--cache-size",
+        type=click.IntRange(min=0),
+        default=DEFAULT_CACHE_SIZE // 2**20,
+        show_default=True,
+        help=(
+            "\b\nMaximum size of the cache in MiB.\nOldest used files are removed first"
+        ),
+    ),
+    click.option(
+        "--no-cache",
+        is_flag=True,
+        default=False,
+        help=("\b\nAlways parse the input files, without using the cache"),
+    ),
+]
+
+INPUT_OPTIONS = [
+    click.option(
+        "--input-dir",
+        type=click.Path(exists=True, file_okay=False),
+        default=None,
+        help=("\b\nDirectory searched recursively for input files"),
+    ),
+    click.option(
+        "--pattern",
+        type=str,
+        default="*",
+        show_default=True,
+        help=("\b\nGlob pattern of the input files in --input-dir"),
+    ),
+    click.option(
+        "--file-list",
+        type=click.File("r"),
+        default=None,
+        help=("\b\nFile with one input file per line.\n'-' reads them from stdin"),
+    ),
+]
+
+CATALOG_OPTION = click.option(
+    "--catalog",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help=(
+        "\b\nCatalog built by the index command.\n"
+        "Its files in the date range are used as input files"
+    ),
+)
+
+ENCODING_OPTIONS = [
+    click.option(
+        "--output-format",
+        type=click.Choice(OUTPUT_FORMATS),
+        default=DEFAULT_OUTPUT_FORMAT,
+        show_default=True,
+        help=(
+            "\b\nFormat of the output.\n"
+            "zarr writes a local directory store and needs the zarr package"
+        ),
+    ),
+    click.option(
+        "--encoding-preset",
+        type=click.Choice(list(ENCODING_PRESETS)),
+        default=None,
+        help=(
+            "\b\nCompression of the time series not set in the configuration.\n"
+            "Their chunk size is derived from --read-period"
+        ),
+    ),
+    click.option(
+        "--read-period",
+        type=str,
+        default=DEFAULT_READ_PERIOD,
+        show_default=True,
+        help=(
+            "\b\nPeriod usually read at once from the outputs, e.g. 1h, 1D.\n"
+            "'full' when whole time series are read"
+        ),
+    ),
+]
+
+LAZY_OPTIONS = [
+    click.option(
+        "--lazy",
+        is_flag=True,
+        default=False,
+        help=(
+            "\b\nRead the input files lazily with dask, one chunk per file,\n"
+            "and write the output chunk by chunk.\n"
+            "Needs the dask package"
+        ),
+    ),
+    click.option(
+        "--memory-budget",
+        type=click.IntRange(min=1),
+        default=DEFAULT_MEMORY_BUDGET // 2**20,
+        show_default=True,
+        help=(
+            "\b\nMemory in MiB for the files parsed at once with --lazy.\n"
+            "It sets how many files are parsed in parallel"
+        ),
+    ),
+    click.option(
+        "--scheduler",
+        type=click.Choice(SCHEDULERS),
+        default=DEFAULT_SCHEDULER,
+        show_default=True,
+        help=("\b\nWhere the files are parsed with --lazy: dask threads or processes"),
+    ),
+]
+
+METRICS_OPTIONS = [
+    click.option(
+        "--metrics-json",
+        type=click.Path(dir_okay=False),
+        default=None,
+        help=(
+            "\b\nWrite the wall time, CPU time, rows, bytes and peak memory\n"
+            "of each stage and input file to this JSON file.\n"
+            "Tracing the memory slows the run down"
+        ),
+    ),
+    click.option(
+        "--profile",
+        type=click.Path(dir_okay=False),
+        default=None,
+        help=("\b\nDump the cProfile statistics of the run to this file"),
+    ),
+]
+
+APPEND_OPTION = click.option(
+    "--append",
+    is_flag=True,
+    default=False,
+    help=(
+        "\b\nAppend the new records to the output file along time.\n"
+        "The file is created with an unlimited time if it does not exist"
+    ),
+)
+
+RESAMPLE_OPTION = click.option(
+    "--resample",
+    "resample_period",
+    type=str,
+    default=None,
+    help=(
+        "\b\nAggregate the output into regular bins of this width, e.g. 10min.\n"
+        "Each variable is reduced with the time method of its cell_methods"
+    ),
+)
+
+MERGE_OPTIONS = [
+    click.option(
+        "--duplicates",
+        type=click.Choice(DUPLICATE_POLICIES),
+        default=None,
+        help=(
+            "\b\nMerge the rows of the input files by time, keeping one row\n"
+            "per time: the first or last one in the order of the files,\n"
+            "or the first value that is not NaN of each variable.\n"
+            "By default the files are concatenated in the given order"
+        ),
+    ),
+    click.option(
+        "--regular-grid",
+        "regular",
+        is_flag=True,
+        default=False,
+        help=(
+            "\b\nMerge the rows of the input files by time and reindex them\n"
+            "onto a regular grid at the sampling period, filled with NaN"
+        ),
+    ),
+]
+
+QC_OPTIONS = [
+    click.option(
+        "--qc",
+        is_flag=True,
+        default=False,
+        help=(
+            "\b\nFlag the values outside of the valid_min and valid_max\n"
+            "of the configuration, and the steps, flat lines and spikes\n"
+            "found by the qc tests of the configuration,\n"
+            "in <variable>_qc flag variables"
+        ),
+    ),
+    click.option(
+        "--qc-mask",
+        is_flag=True,
+        default=False,
+        help=("\b\nRun --qc and replace the flagged values with NaN"),
+    ),
+]
+
+
+@click.group(cls=DefaultCommandGroup, context_settings=CONTEXT_SETTINGS)
+def main() -> None:
+    """Command line interface for ccres_weather_station.
+
+    Without command, the arguments are given to the convert command.
+
+    """
+
+
+@main.command(context_settings=CONTEXT_SETTINGS)
+@VERBOSE_OPTION
 @click.option(
     "--start-date",
     type=click.DateTime(formats=["%Y-%m-%d"]),
@@ -70,6 +403,7 @@ def _get_dates(
     required=True,
     help=("\b\nStation name"),
 )
+@CONFIG_OPTION
 @click.option(
     "--input-files",
     type=click.Path(exists=True),
@@ -83,42 +417,624 @@ def _get_dates(
     required=True,
     help=("\b\nOutput file to be written"),
 )
-def main(
+@_add_options(READER_OPTIONS)
+@_add_options(MERGE_OPTIONS)
+@_add_options(QC_OPTIONS)
+@RESAMPLE_OPTION
+@APPEND_OPTION
+@_add_options(ENCODING_OPTIONS)
+@_add_options(LAZY_OPTIONS)
+@_add_options(METRICS_OPTIONS)
+def convert(
     verbose: int,
     start_date: Optional[dt.datetime],
     end_date: Optional[dt.datetime],
     station: str,
+    config_file: Optional[PathLike],
     input_files: PathsLike,
     output_file: PathLike,
+    engine: str,
+    workers: int,
+    cache_dir: PathLike,
+    cache_size: int,
+    no_cache: bool,
+    duplicates: Optional[str],
+    regular: bool,
+    qc: bool,
+    qc_mask: bool,
+    resample_period: Optional[str],
+    append: bool,
+    output_format: str,
+    encoding_preset: Optional[str],
+    read_period: str,
+    lazy: bool,
+    memory_budget: int,
+    scheduler: str,
+    metrics_json: Optional[PathLike],
+    profile: Optional[PathLike],
 ) -> int:
-    """Command line interface for ccres_weather_station."""
+    """Convert input files of a station into one NetCDF file or Zarr store."""
+    from contextlib import nullcontext
+
+    from ccres_weather_station.bounders.apply_bounds import apply_bounds
+    from ccres_weather_station.metrics.metrics import collect, measure, path_size
+    from ccres_weather_station.qc.qc import apply_qc
+    from ccres_weather_station.readers.lazy import lazy_scheduler, lazy_workers
+    from ccres_weather_station.resample.resample import resample
+    from ccres_weather_station.writers.write import get_writer
+
     log_level = get_log_level_from_count(verbose)
     init_logger(log_level)
 
+    if lazy and (duplicates is not None or regular):
+        raise click.UsageError("--lazy reads each file as is, without merging")
     start_date, end_date = _get_dates(start_date, end_date)
     output_file = Path(output_file)
     input_files = [Path(input_file) for input_file in input_files]
 
-    lgr.debug("Get reader class")
-    reader_class = get_reader_class(station)
-
     lgr.debug("Get configuration")
-    config = Config.default()
+    config = _get_config(config_file)
 
-    lgr.debug("Instantiate class")
-    reader = reader_class(config)
+    reader = _get_reader(station, config, engine, cache_dir, cache_size, no_cache)
+    dim_time = config.coords["time"].name
+
+    with collect(metrics_json, profile) as metrics:
+        lgr.debug("Read files")
+        with measure(metrics, "read", output_file) as record:
+            if lazy:
+                ds = reader.read_files_lazy(
+                    input_files, workers, start_date=start_date, end_date=end_date
+                )
+            else:
+                ds = reader.read(
+                    input_files,
+                    workers=workers,
+                    start_date=start_date,
+                    end_date=end_date,
+                    metrics=metrics,
+                    duplicates=duplicates,
+                    regular=regular,
+                )
+            record.rows = ds.sizes[dim_time]
+            record.bytes_read = sum(path_size(path) for path in input_files)
+
+        lgr.debug("Apply bound to dataset")
+        with measure(metrics, "bounds", output_file) as record:
+            ds = apply_bounds(ds, config, start_date, end_date)
+            record.rows = ds.sizes[dim_time]
 
-    lgr.debug("Read files")
-    ds = reader.read_files(input_files)
+        if qc or qc_mask:
+            lgr.debug("Flag values outside of their valid range")
+            with measure(metrics, "qc", output_file) as record:
+                ds = apply_qc(ds, config, qc_mask)
+                record.rows = ds.sizes[dim_time]
 
-    lgr.debug("Apply bound to dataset")
-    ds = apply_bounds(ds, config, start_date, end_date)
+        if resample_period is not None:
+            lgr.debug(f"Resample dataset into bins of {resample_period}")
+            with measure(metrics, "resample", output_file) as record:
+                ds = resample(ds, config, resample_period)
+                record.rows = ds.sizes[dim_time]
 
-    lgr.debug("Write dataset")
-    write_nc(ds, config, output_file)
+        lgr.debug("Write dataset")
+        computing = (
+            lazy_scheduler(lazy_workers(input_files, memory_budget * 2**20), scheduler)
+            if lazy
+            else nullcontext()
+        )
+        with computing:
+            get_writer(output_format)(
+                ds,
+                config,
+                output_file,
+                mode="a" if append else "w",
+                preset=encoding_preset,
+                read_period=read_period,
+                metrics=metrics,
+            )
     lgr.info(f"Output file {output_file.absolute()} generated")
     return 0
 
 
+@main.command(context_settings=CONTEXT_SETTINGS)
+@VERBOSE_OPTION
+@click.option(
+    "--station",
+    type=str,
+    required=True,
+    help=("\b\nStation name"),
+)
+@CONFIG_OPTION
+@_add_options(INPUT_OPTIONS)
+@CATALOG_OPTION
+@click.option(
+    "--from",
+    "start_date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help=("\b\nDate from which to keep all output data"),
+)
+@click.option(
+    "--to",
+    "end_date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help=("\b\nDate from which to remove all output data"),
+)
+@click.option(
+    "--output-pattern",
+    type=str,
+    required=True,
+    help=(
+        "\b\nTemplate of the output files, with the fields\n"
+        "{station}, {stem} and {date} (start of the input file).\n"
+        "Inputs with the same output are merged, "
+        "e.g. out/{station}_{date:%Y%m}.nc"
+    ),
+)
+@_add_options(READER_OPTIONS)
+@_add_options(MERGE_OPTIONS)
+@_add_options(QC_OPTIONS)
+@RESAMPLE_OPTION
+@APPEND_OPTION
+@_add_options(ENCODING_OPTIONS)
+@_add_options(METRICS_OPTIONS)
+def batch(
+    verbose: int,
+    station: str,
+    config_file: Optional[PathLike],
+    input_dir: Optional[PathLike],
+    pattern: str,
+    file_list: Optional[TextIO],
+    catalog: Optional[PathLike],
+    start_date: Optional[dt.datetime],
+    end_date: Optional[dt.datetime],
+    output_pattern: str,
+    engine: str,
+    workers: int,
+    cache_dir: PathLike,
+    cache_size: int,
+    no_cache: bool,
+    duplicates: Optional[str],
+    regular: bool,
+    qc: bool,
+    qc_mask: bool,
+    resample_period: Optional[str],
+    append: bool,
+    output_format: str,
+    encoding_preset: Optional[str],
+    read_period: str,
+    metrics_json: Optional[PathLike],
+    profile: Optional[PathLike],
+) -> Any:
+    """Convert many input files into many outputs in one process.
+
+    A failing input or output is logged and skipped, the exit code is 1 if
+    there is any failure.
+
+    """
+    from ccres_weather_station.batch.batch import list_input_files, run_batch
+    from ccres_weather_station.catalog.catalog import Catalog
+    from ccres_weather_station.metrics.metrics import collect
+
+    log_level = get_log_level_from_count(verbose)
+    init_logger(log_level)
+
+    if input_dir is None and file_list is None and catalog is None:
+        raise click.UsageError("Give --input-dir, --file-list and/or --catalog")
+    start_date, end_date = _get_dates(start_date, end_date, open_end=True)
+    files = list_input_files(input_dir, pattern, file_list)
+    if catalog is not None:
+        with Catalog(catalog, station) as opened:
+            selected = opened.select(start_date, end_date)
+        files = sorted({file.resolve() for file in files}.union(selected))
+
+    config = _get_config(config_file)
+    reader = _get_reader(station, config, engine, cache_dir, cache_size, no_cache)
+    with collect(metrics_json, profile) as metrics:
+        results = run_batch(
+            reader,
+            config,
+            files,
+            output_pattern,
+            station,
+            start_date,
+            end_date,
+            workers,
+            mode="a" if append else "w",
+            preset=encoding_preset,
+            read_period=read_period,
+            output_format=output_format,
+            metrics=metrics,
+            resample_period=resample_period,
+            qc=qc,
+            qc_mask=qc_mask,
+            duplicates=duplicates,
+            regular=regular,
+        )
+
+    failures = [result for result in results if not result.ok]
+    for result in failures:
+        inputs = result.failed_inputs or result.inputs
+        click.echo(
+            f"FAILED {result.output}: {result.error or 'unreadable inputs'} "
+            f"({', '.join(str(p) for p in inputs)})",
+            err=True,
+        )
+    click.echo(f"{len(results) - len(failures)} succeeded, {len(failures)} failed")
+    if failures:
+        sys.exit(1)
+    return 0
+
+
+@main.command(context_settings=CONTEXT_SETTINGS)
+@VERBOSE_OPTION
+@click.option(
+    "--manifest",
+    type=click.Path(exists=True, dir_okay=False),
+    required=True,
+    help=(
+        "\b\nTOML file with one [[stations]] table per station, giving\n"
+        "its inputs, output_pattern and batch options"
+    ),
+)
+@click.option(
+    "--jobs",
+    type=click.IntRange(min=0),
+    default=DEFAULT_JOBS,
+    show_default=True,
+    help=(
+        "\b\nMaximum number of outputs converted at once, over all the\n"
+        "stations. 0 uses all CPUs"
+    ),
+)
+@click.option(
+    "--jobs-per-device",
+    type=click.IntRange(min=1),
+    default=None,
+    help=("\b\nMaximum number of outputs converted at once from one disk"),
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False),
+    default=DEFAULT_CACHE_DIR,
+    show_default=True,
+    help=("\b\nDirectory of the cache of parsed input files"),
+)
+@click.option(
+    "--cache-size",
+    type=click.IntRange(min=0),
+    default=DEFAULT_CACHE_SIZE // 2**20,
+    show_default=True,
+    help=("\b\nMaximum size of the cache in MiB"),
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    help=("\b\nAlways parse the input files, without using the cache"),
+)
+@click.option(
+    "--summary-json",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help=("\b\nWrite the summary of each station to this JSON file"),
+)
+def manifest(
+    verbose: int,
+    manifest: PathLike,
+    jobs: int,
+    jobs_per_device: Optional[int],
+    cache_dir: PathLike,
+    cache_size: int,
+    no_cache: bool,
+    summary_json: Optional[PathLike],
+) -> Any:
+    """Convert the input files of many stations on one pool of processes.
+
+    The throughput and failures of every station are summarized at the end,
+    the exit code is 1 if there is any failure.
+
+    """
+    import json
+    from dataclasses import asdict
+
+    from ccres_weather_station.manifest.manifest import run_manifest
+    from ccres_weather_station.readers.cache import ParsedCache
+
+    log_level = get_log_level_from_count(verbose)
+    init_logger(log_level)
+
+    cache = None if no_cache else ParsedCache(cache_dir, max_bytes=cache_size * 2**20)
+    try:
+        stations, total = run_manifest(manifest, jobs, jobs_per_device, cache)
+    except ValueError as err:
+        raise click.UsageError(f"Invalid manifest {manifest}: {err}")
+
+    click.echo(
+        f"{'station':<16}{'outputs':>8}{'failed':>8}{'inputs':>8}"
+        f"{'MiB':>10}{'rows':>12}{'time (s)':>10}{'MiB/s':>8}"
+    )
+    for summary in [*stations, total]:
+        click.echo(
+            f"{summary.station:<16}{summary.outputs:>8}{summary.failed:>8}"
+            f"{summary.inputs:>8}{summary.bytes_read / 2**20:>10.1f}"
+            f"{summary.rows:>12}{summary.wall_time:>10.2f}"
+            f"{summary.mib_per_second:>8.1f}"
+        )
+    for summary in stations:
+        for error in summary.errors:
+            click.echo(f"FAILED {summary.station} {error}", err=True)
+    if summary_json is not None:
+        Path(summary_json).write_text(
+            json.dumps(
+                {
+                    "total": asdict(total),
+                    "stations": [asdict(summary) for summary in stations],
+                },
+                indent=2,
+            )
+            + "\n"
+        )
+    if total.failed:
+        sys.exit(1)
+    return 0
+
+
+@main.command(context_settings=CONTEXT_SETTINGS)
+@VERBOSE_OPTION
+@click.option(
+    "--station",
+    type=str,
+    required=True,
+    help=("\b\nStation name"),
+)
+@CONFIG_OPTION
+@_add_options(INPUT_OPTIONS)
+@click.option(
+    "--catalog",
+    type=click.Path(dir_okay=False),
+    required=True,
+    help=("\b\nCatalog to create or update"),
+)
+def index(
+    verbose: int,
+    station: str,
+    config_file: Optional[PathLike],
+    input_dir: Optional[PathLike],
+    pattern: str,
+    file_list: Optional[TextIO],
+    catalog: PathLike,
+) -> Any:
+    """Index the time coverage of input files into a catalog.
+
+    Only new or modified files are read, their lines are counted and only
+    the first and last ones are parsed. Files that do not exist anymore are
+    removed from the catalog. The gaps and overlaps between files are
+    reported.
+
+    """
+    from ccres_weather_station.batch.batch import list_input_files
+    from ccres_weather_station.catalog.catalog import Catalog
+    from ccres_weather_station.readers.register import get_station_reader_class
+
+    log_level = get_log_level_from_count(verbose)
+    init_logger(log_level)
+
+    if input_dir is None and file_list is None:
+        raise click.UsageError("Give --input-dir and/or --file-list")
+    files = list_input_files(input_dir, pattern, file_list)
+
+    config = _get_config(config_file)
+    reader = get_station_reader_class(station, config)(config)
+    with Catalog(catalog, station) as opened:
+        indexed, unchanged, failed = opened.update(reader, files)
+        removed = opened.prune()
+        entries = opened.entries()
+        gaps = opened.gaps()
+        overlaps = opened.overlaps()
+
+    for path in failed:
+        click.echo(f"FAILED {path}", err=True)
+    click.echo(
+        f"{indexed} indexed, {unchanged} unchanged, {len(removed)} removed, "
+        f"{len(failed)} failed"
+    )
+    if entries:
+        click.echo(
+            f"{len(entries)} files, {sum(entry.rows for entry in entries)} rows "
+            f"from {min(entry.first for entry in entries)} "
+            f"to {max(entry.last for entry in entries)}"
+        )
+    for before, after in gaps:
+        click.echo(f"GAP {before} -> {after}")
+    for first, second in overlaps:
+        click.echo(f"OVERLAP {first} {second}")
+    if failed:
+        sys.exit(1)
+    return 0
+
+
+@main.command(context_settings=CONTEXT_SETTINGS)
+@VERBOSE_OPTION
+@click.option(
+    "--station",
+    type=str,
+    required=True,
+    help=("\b\nStation name"),
+)
+@CONFIG_OPTION
+@click.option(
+    "--input-dir",
+    type=click.Path(exists=True, file_okay=False),
+    required=True,
+    help=("\b\nDirectory searched recursively for input files"),
+)
+@click.option(
+    "--pattern",
+    type=str,
+    default="*",
+    show_default=True,
+    help=("\b\nGlob pattern of the input files in --input-dir"),
+)
+@click.option(
+    "--output-pattern",
+    type=str,
+    required=True,
+    help=(
+        "\b\nTemplate of the output files, as in the batch command.\n"
+        "New records are appended to them"
+    ),
+)
+@click.option(
+    "--state",
+    type=click.Path(dir_okay=False),
+    required=True,
+    help=(
+        "\b\nJSON file keeping the part of each input file already ingested.\n"
+        "Created if it does not exist"
+    ),
+)
+@click.option(
+    "--interval",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_WATCH_INTERVAL,
+    show_default=True,
+    help=(
+        "\b\nSeconds between two scans of the input directory.\n"
+        "With the watchdog package, changes also start a scan"
+    ),
+)
+@click.option(
+    "--once",
+    is_flag=True,
+    default=False,
+    help=("\b\nScan the input directory once then exit"),
+)
+@ENGINE_OPTION
+@_add_options(ENCODING_OPTIONS)
+def watch(
+    verbose: int,
+    station: str,
+    config_file: Optional[PathLike],
+    input_dir: PathLike,
+    pattern: str,
+    output_pattern: str,
+    state: PathLike,
+    interval: float,
+    once: bool,
+    engine: str,
+    output_format: str,
+    encoding_preset: Optional[str],
+    read_period: str,
+) -> Any:
+    """Append the records of input files to the outputs as they arrive.
+
+    Only the lines written since the last scan are parsed. The state file
+    lets a new run resume where the previous one stopped. With --once, the
+    exit code is 1 if there is any failure.
+
+    """
+    from ccres_weather_station.readers.columnar import ColumnarReader
+    from ccres_weather_station.readers.register import get_station_reader_class
+    from ccres_weather_station.watch.watch import WatchState
+    from ccres_weather_station.watch.watch import watch as watch_directory
+
+    log_level = get_log_level_from_count(verbose)
+    init_logger(log_level)
+
+    config = _get_config(config_file)
+    reader = get_station_reader_class(station, config)(config, engine=engine)
+    if not isinstance(reader, ColumnarReader):
+        raise click.UsageError(f"The reader of {station} cannot parse new lines")
+
+    failed = False
+
+    def report(results: List["BatchResult"]) -> None:
+        nonlocal failed
+        for result in results:
+            if result.ok:
+                continue
+            failed = True
+            click.echo(
+                f"FAILED {result.output}: {result.error} "
+                f"({', '.join(str(p) for p in result.inputs)})",
+                err=True,
+            )
+
+    watch_directory(
+        reader,
+        config,
+        input_dir,
+        WatchState.load(state),
+        output_pattern,
+        station,
+        pattern=pattern,
+        interval=interval,
+        once=once,
+        preset=encoding_preset,
+        read_period=read_period,
+        output_format=output_format,
+        on_pass=report,
+    )
+    if failed:
+        sys.exit(1)
+    return 0
+
+
+@main.command("measure-encoding", context_settings=CONTEXT_SETTINGS)
+@VERBOSE_OPTION
+@click.option(
+    "--input-file",
+    type=click.Path(exists=True, dir_okay=False),
+    required=True,
+    help=("\b\nNetCDF file whose data is written with each preset"),
+)
+@CONFIG_OPTION
+@click.option(
+    "--preset",
+    "presets",
+    type=click.Choice(list(ENCODING_PRESETS)),
+    multiple=True,
+    help=("\b\nPreset to measure, all by default"),
+)
+@click.option(
+    "--read-period",
+    type=str,
+    default=DEFAULT_READ_PERIOD,
+    show_default=True,
+    help=("\b\nPeriod usually read at once, sets the chunk size"),
+)
+def measure_encoding(
+    verbose: int,
+    input_file: PathLike,
+    config_file: Optional[PathLike],
+    presets: Tuple[str, ...],
+    read_period: str,
+) -> int:
+    """Report the file size, write and read times of the encoding presets.
+
+    The read time is the time to read every variable entirely.
+
+    """
+    import xarray as xr
+
+    from ccres_weather_station.writers.encoding import measure_presets
+
+    log_level = get_log_level_from_count(verbose)
+    init_logger(log_level)
+
+    time_name = _get_config(config_file).coords["time"].name
+    with xr.open_dataset(input_file) as ds:
+        measures = measure_presets(ds.load(), time_name, presets, read_period)
+
+    click.echo(f"{'preset':<12}{'size (MiB)':>12}{'write (s)':>12}{'read (s)':>12}")
+    for measure in measures:
+        click.echo(
+            f"{measure.preset:<12}{measure.size / 2**20:>12.3f}"
+            f"{measure.write_time:>12.3f}{measure.read_time:>12.3f}"
+        )
+    return 0
+
+
 if __name__ == "__main__":
     sys.exit(main())  # pragma: no cover
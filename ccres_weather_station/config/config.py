@@ -1,7 +1,9 @@
+import copy
 import logging
-from dataclasses import asdict, dataclass
+from dataclasses import asdict, dataclass, field
+from functools import cached_property, lru_cache
 from pathlib import Path
-from typing import Dict, Iterator, Optional, Tuple
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Tuple, Union
 
 import toml
 
@@ -11,6 +13,17 @@ lgr = logging.getLogger(__name__)
 DEFAULT_CONFIG = Path(__file__).parent / "default.toml"
 
 
+def _get_chunksizes(
+    chunksizes: Union[None, int, Sequence[int]],
+) -> Optional[Tuple[int, ...]]:
+    """Get the chunk size of each dimension, a single int for 1D variables."""
+    if chunksizes is None:
+        return None
+    if isinstance(chunksizes, int):
+        return (chunksizes,)
+    return tuple(int(size) for size in chunksizes)
+
+
 @dataclass(repr=True)
 class VariableMeta:
     standard_name: Optional[str] = None
@@ -19,6 +32,8 @@ class VariableMeta:
     comment: Optional[str] = None
     instrument: Optional[str] = None
     cell_methods: Optional[str] = None
+    valid_min: Optional[float] = None
+    valid_max: Optional[float] = None
 
     def __iter__(self) -> Iterator[Tuple[str, str]]:
         return iter(asdict(self).items())
@@ -45,11 +60,34 @@ class VariableEncoding:
     complevel: Optional[int] = None
     fletcher32: Optional[bool] = None
     contiguous: Optional[bool] = None
-    chunksizes: Optional[int] = None
+    chunksizes: Optional[Tuple[int, ...]] = None
     dtype: Optional[str] = None
     units: Optional[str] = None
     calendar: Optional[str] = None
 
+    def __post_init__(self) -> None:
+        self.chunksizes = _get_chunksizes(self.chunksizes)
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        return iter(asdict(self).items())
+
+
+@dataclass(repr=True)
+class VariableQC:
+    """Parameters of the temporal quality control tests of a variable.
+
+    A test runs only when its parameters are set, see
+    ``ccres_weather_station.qc.temporal``.
+
+    """
+
+    max_step: Optional[float] = None
+    flat_line_minutes: Optional[float] = None
+    flat_line_tolerance: Optional[float] = None
+    spike_window_minutes: Optional[float] = None
+    spike_threshold: Optional[float] = None
+    spike_min_deviation: Optional[float] = None
+
     def __iter__(self) -> Iterator[Tuple[str, str]]:
         return iter(asdict(self).items())
 
@@ -59,6 +97,41 @@ class VariableConfig:
     name: str
     meta: VariableMeta
     encoding: VariableEncoding
+    qc: VariableQC = field(default_factory=VariableQC)
+
+
+@dataclass(repr=True)
+class ReaderConfig:
+    """Layout of the input files, parsed by ``GenericReader``.
+
+    ``columns`` gives the 0-based column of each configuration variable
+    read from the files, and ``time_column`` the one of the time. With the
+    ``fixed_width`` layout, they are ``[start, stop]`` character spans.
+
+    Notes
+    -----
+        See ``ccres_weather_station.readers.generic`` for all the fields
+
+    """
+
+    layout: str = "whitespace"
+    columns: Dict[str, Any] = field(default_factory=dict)
+    time_column: Any = 0
+    time_format: Optional[str] = None
+    delimiter: Optional[str] = None
+    comment: Optional[str] = None
+    skip_rows: Optional[int] = None
+    dtype: Optional[str] = None
+    missing_values: Tuple[str, ...] = ()
+    file_pattern: Optional[str] = None
+    file_date_format: Optional[str] = None
+    file_period: Optional[str] = None
+
+    def __post_init__(self) -> None:
+        self.missing_values = tuple(str(value) for value in self.missing_values)
+
+    def __iter__(self) -> Iterator[Tuple[str, Any]]:
+        return iter(asdict(self).items())
 
 
 @dataclass(repr=True)
@@ -93,11 +166,14 @@ class CoordEncoding:
     complevel: Optional[int] = None
     fletcher32: Optional[bool] = None
     contiguous: Optional[bool] = None
-    chunksizes: Optional[int] = None
+    chunksizes: Optional[Tuple[int, ...]] = None
     dtype: Optional[str] = None
     units: Optional[str] = None
     calendar: Optional[str] = None
 
+    def __post_init__(self) -> None:
+        self.chunksizes = _get_chunksizes(self.chunksizes)
+
     def __iter__(self) -> Iterator[Tuple[str, str]]:
         return iter(asdict(self).items())
 
@@ -109,6 +185,113 @@ class CoordConfig:
     encoding: CoordEncoding
 
 
+Items = Tuple[Tuple[str, Any], ...]
+
+
+def _freeze(value: Any) -> Any:
+    """Turn the lists and tables of a TOML value into tuples to make it hashable."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple((key, _freeze(v)) for key, v in value.items())
+    return value
+
+
+def _items(pairs: Iterable[Tuple[str, Any]]) -> Items:
+    """Keep the set values of key-value pairs in a hashable form."""
+    return tuple((key, _freeze(value)) for key, value in pairs if value is not None)
+
+
+@dataclass(frozen=True)
+class CompiledEntry:
+    """Variable or coordinate of a :class:`CompiledConfig`."""
+
+    key: str
+    name: str
+    attrs: Items
+    encoding: Items
+    qc: Items = ()
+
+
+@dataclass(frozen=True)
+class CompiledConfig:
+    """Immutable and hashable form of a :class:`Config`.
+
+    The unset (None) metadata and encoding fields are dropped once, and the
+    lookup tables below are built on first use. The returned dictionaries
+    are shared and must not be modified.
+
+    """
+
+    variables: Tuple[CompiledEntry, ...]
+    coords: Tuple[CompiledEntry, ...]
+    attrs: Items
+    reader: Optional[Items] = None
+
+    def __deepcopy__(self, memo: Dict) -> "CompiledConfig":
+        return self
+
+    @cached_property
+    def variable_names(self) -> Dict[str, str]:
+        """Name in the dataset of each configuration variable."""
+        return {entry.key: entry.name for entry in self.variables}
+
+    @cached_property
+    def coord_names(self) -> Dict[str, str]:
+        """Name in the dataset of each configuration coordinate."""
+        return {entry.key: entry.name for entry in self.coords}
+
+    @property
+    def time_name(self) -> str:
+        return self.coord_names["time"]
+
+    @cached_property
+    def variable_attrs(self) -> Dict[str, Dict[str, Any]]:
+        """Attributes by variable name in the dataset."""
+        return {entry.name: dict(entry.attrs) for entry in self.variables}
+
+    @cached_property
+    def coord_attrs(self) -> Dict[str, Dict[str, Any]]:
+        """Attributes by coordinate name in the dataset."""
+        return {entry.name: dict(entry.attrs) for entry in self.coords}
+
+    @cached_property
+    def variable_encodings(self) -> Dict[str, Dict[str, Any]]:
+        """Encoding by variable name in the dataset."""
+        return {entry.name: dict(entry.encoding) for entry in self.variables}
+
+    @cached_property
+    def variable_qc(self) -> Dict[str, Dict[str, Any]]:
+        """Quality control parameters by variable name in the dataset."""
+        return {entry.name: dict(entry.qc) for entry in self.variables}
+
+    @cached_property
+    def coord_encodings(self) -> Dict[str, Dict[str, Any]]:
+        """Encoding by coordinate name in the dataset."""
+        return {entry.name: dict(entry.encoding) for entry in self.coords}
+
+    @cached_property
+    def global_attrs(self) -> Dict[str, Any]:
+        return dict(self.attrs)
+
+    @cached_property
+    def reader_layout(self) -> Optional[Dict[str, Any]]:
+        """Set fields of the ``[reader]`` section, None without section."""
+        if self.reader is None:
+            return None
+        layout = dict(self.reader)
+        layout["columns"] = dict(layout.get("columns", ()))
+        return layout
+
+
+@lru_cache(maxsize=32)
+def _load_toml(path: Path, mtime_ns: int) -> "Config":
+    """Parse and compile a TOML file, once per path and modification time."""
+    config = Config._from_dict(dict(toml.load(str(path))))
+    config.compile()
+    return config
+
+
 @dataclass()
 class Config:
     """Configuration object containing metdata.
@@ -122,6 +305,13 @@ class Config:
     variables: Dict[str, VariableConfig]
     coords: Dict[str, CoordConfig]
     attrs: Dict[str, str]
+    reader: Optional[ReaderConfig] = None
+    _compiled: Optional[CompiledConfig] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _fingerprint: Optional[str] = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
     @staticmethod
     def _get_meta_var(d: Dict) -> Dict[str, VariableConfig]:
@@ -146,10 +336,15 @@ class Config:
             if "encoding" in d["variables"][var]:
                 var_encoding = VariableEncoding(**d["variables"][var]["encoding"])
 
+            var_qc: VariableQC = VariableQC()
+            if "qc" in d["variables"][var]:
+                var_qc = VariableQC(**d["variables"][var]["qc"])
+
             _variables[var] = VariableConfig(
                 name=d["variables"][var]["name"],
                 meta=var_meta,
                 encoding=var_encoding,
+                qc=var_qc,
             )
         return _variables
 
@@ -190,11 +385,32 @@ class Config:
             attrs = d["attrs"]
         return attrs
 
+    @staticmethod
+    def _get_reader(d: Dict) -> Optional[ReaderConfig]:
+        if "reader" not in d:
+            return None
+        return ReaderConfig(**d["reader"])
+
+    @classmethod
+    def _from_dict(cls, d: Dict) -> "Config":
+        variables: Dict[str, VariableConfig] = cls._get_meta_var(d)
+        coords: Dict[str, CoordConfig] = cls._get_meta_coord(d)
+        global_attrs = cls._get_global_attrs(d)
+
+        return cls(
+            variables,
+            coords,
+            global_attrs,
+            cls._get_reader(d),
+        )
+
     @classmethod
     def from_toml(cls, path: PathLike) -> "Config":
         """Class method handling the creation of the object.
 
-        It creates the object from a valid Toml configuration file
+        It creates the object from a valid Toml configuration file. A file
+        is parsed once per modification time, each call returns a copy that
+        can be modified freely.
 
 
         Parameters
@@ -208,19 +424,8 @@ class Config:
             The interpretation of the Toml file
 
         """
-        path = Path(path)
-
-        d = dict(toml.load(str(path.absolute())))
-
-        variables: Dict[str, VariableConfig] = cls._get_meta_var(d)
-        coords: Dict[str, CoordConfig] = cls._get_meta_coord(d)
-        global_attrs = cls._get_global_attrs(d)
-
-        return cls(
-            variables,
-            coords,
-            global_attrs,
-        )
+        path = Path(path).absolute()
+        return copy.deepcopy(_load_toml(path, path.stat().st_mtime_ns))
 
     @classmethod
     def default(cls) -> "Config":
@@ -257,6 +462,10 @@ class Config:
                     key,
                     getattr(other.variables[var].encoding, key),
                 )
+            for key, value in other.variables[var].qc:
+                if value is None:
+                    continue
+                setattr(self.variables[var].qc, key, value)
 
     def _add_other_coord(self, other: "Config") -> None:
         for coord in other.coords:
@@ -285,6 +494,11 @@ class Config:
             if attr is not None:
                 self.attrs[key] = attr
 
+    def _add_other_reader(self, other: "Config") -> None:
+        # A layout describes whole files, it replaces the previous one
+        if other.reader is not None:
+            self.reader = other.reader
+
     def add_config_from_toml(self, path: PathLike) -> "Config":
         """Integrate another config file to object.
 
@@ -309,5 +523,44 @@ class Config:
         self._add_other_var(other)
         self._add_other_coord(other)
         self._add_other_attrs(other)
+        self._add_other_reader(other)
+        self._compiled = None
 
         return self
+
+    def compile(self) -> CompiledConfig:
+        """Get the immutable and hashable form of the configuration.
+
+        It is built once and kept while the fields are unchanged: a
+        fingerprint of the fields, their repr, is compared at each call, so
+        fields modified directly are taken into account.
+
+        """
+        fingerprint = repr((self.variables, self.coords, self.attrs, self.reader))
+        if self._compiled is None or fingerprint != self._fingerprint:
+            self._fingerprint = fingerprint
+            self._compiled = CompiledConfig(
+                variables=tuple(
+                    CompiledEntry(
+                        key,
+                        var.name,
+                        _items(var.meta),
+                        _items(var.encoding),
+                        _items(var.qc),
+                    )
+                    for key, var in self.variables.items()
+                ),
+                coords=tuple(
+                    CompiledEntry(
+                        key, coord.name, _items(coord.meta), _items(coord.encoding)
+                    )
+                    for key, coord in self.coords.items()
+                ),
+                attrs=_items(self.attrs.items()),
+                reader=None if self.reader is None else _items(self.reader),
+            )
+        return self._compiled
+
+    def invalidate(self) -> None:
+        """Forget the compiled form, ``compile`` builds it again."""
+        self._compiled = None
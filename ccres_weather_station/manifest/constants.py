@@ -0,0 +1,3 @@
+"""Constants of the manifest runs, importable without numpy, pandas or xarray."""
+
+DEFAULT_JOBS = 1
@@ -0,0 +1,464 @@
+"""Convert the files of many stations in one run, from a manifest.
+
+The manifest is a TOML file with one ``[[stations]]`` table per station,
+giving its inputs and outputs like the ``batch`` command, and a
+``[defaults]`` table of the options shared by the stations::
+
+    [defaults]
+    engine = "auto"
+    qc = true
+
+    [[stations]]
+    station = "sirta"
+    input_dir = "/data/sirta"
+    pattern = "*.asc"
+    output_pattern = "out/{station}_{date:%Y%m}.nc"
+
+    [[stations]]
+    station = "lindenberg"
+    config = "lindenberg.toml"
+    inputs = ["/data/lindenberg/2021.tar.gz"]
+    output_pattern = "out/{station}_{date:%Y%m}.nc"
+
+Relative paths are relative to the manifest. Each output of each station is
+a job, and all the jobs share one pool of processes, so ``jobs`` bounds the
+conversions running at once whatever the number of stations.
+
+Jobs are started in an I/O-aware order: the next job is taken from the
+device (``st_dev`` of its first input) with the fewest running jobs, then
+with the most bytes left to read, and the largest job of a device first. The
+reads of concurrent jobs are so spread over the disks, and ``per_device``
+bounds the jobs reading the same disk.
+
+"""
+
+import datetime as dt
+import logging
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import toml
+
+from ccres_weather_station.batch.batch import (
+    BatchResult,
+    convert_group,
+    group_by_output,
+    list_input_files,
+)
+from ccres_weather_station.config.config import Config
+from ccres_weather_station.manifest.constants import DEFAULT_JOBS
+from ccres_weather_station.readers.base import BaseReader
+from ccres_weather_station.readers.cache import ParsedCache
+from ccres_weather_station.readers.constants import DEFAULT_ENGINE
+from ccres_weather_station.readers.register import get_station_reader_class
+from ccres_weather_station.readers.sources import (
+    expand_archives,
+    input_size,
+    split_member,
+)
+from ccres_weather_station.types import PathLike
+from ccres_weather_station.writers.constants import DEFAULT_OUTPUT_FORMAT
+from ccres_weather_station.writers.presets import DEFAULT_READ_PERIOD
+
+lgr = logging.getLogger(__name__)
+
+_PATH_FIELDS = ("input_dir", "config", "output_pattern")
+
+
+@dataclass
+class StationEntry:
+    """One station of a manifest, with the options of the ``batch`` command."""
+
+    station: str
+    output_pattern: str
+    input_dir: Optional[str] = None
+    pattern: str = "*"
+    inputs: List[str] = field(default_factory=list)
+    config: Optional[str] = None
+    engine: str = DEFAULT_ENGINE
+    start_date: Optional[dt.datetime] = None
+    end_date: Optional[dt.datetime] = None
+    duplicates: Optional[str] = None
+    regular: bool = False
+    qc: bool = False
+    qc_mask: bool = False
+    resample: Optional[str] = None
+    append: bool = False
+    output_format: str = DEFAULT_OUTPUT_FORMAT
+    encoding_preset: Optional[str] = None
+    read_period: str = DEFAULT_READ_PERIOD
+
+    def __post_init__(self) -> None:
+        # TOML dates without time are dates
+        for name in ("start_date", "end_date"):
+            date = getattr(self, name)
+            if isinstance(date, dt.date) and not isinstance(date, dt.datetime):
+                setattr(self, name, dt.datetime.combine(date, dt.time()))
+
+
+def _resolve(value: Optional[str], root: Path) -> Optional[str]:
+    if value is None:
+        return None
+    return str(root / Path(value).expanduser())
+
+
+def load_manifest(path: PathLike) -> List[StationEntry]:
+    """Read the stations of a manifest.
+
+    Raises
+    ------
+    ValueError
+        If a station has unknown or missing options, or appears twice
+
+    """
+    path = Path(path)
+    content = toml.load(str(path))
+    defaults = content.get("defaults", {})
+    known = {f.name for f in fields(StationEntry)}
+    root = path.absolute().parent
+
+    entries: List[StationEntry] = []
+    for i, table in enumerate(content.get("stations", [])):
+        options: Dict[str, Any] = {**defaults, **table}
+        name = options.get("station", f"stations[{i}]")
+        unknown = set(options) - known
+        if unknown:
+            raise ValueError(f"Unknown options {sorted(unknown)} for {name}")
+        try:
+            entry = StationEntry(**options)
+        except TypeError as err:
+            raise ValueError(f"Missing options for {name}: {err}") from err
+        for key in _PATH_FIELDS:
+            setattr(entry, key, _resolve(getattr(entry, key), root))
+        entry.inputs = [str(_resolve(file, root)) for file in entry.inputs]
+        entries.append(entry)
+
+    stations = [entry.station.lower() for entry in entries]
+    twice = {station for station in stations if stations.count(station) > 1}
+    if twice:
+        raise ValueError(f"Stations {sorted(twice)} appear more than once")
+    if not entries:
+        lgr.warning(f"No [[stations]] in {path}")
+    return entries
+
+
+@dataclass
+class Job:
+    """Conversion of the input files of one output of a station."""
+
+    station: str
+    reader: BaseReader
+    config: Config
+    output: Path
+    files: List[Path]
+    entry: StationEntry
+    size: int = 0
+    device: int = 0
+
+
+@dataclass
+class JobResult:
+    """Outcome of a job, or of inputs of a station without any output."""
+
+    station: str
+    result: BatchResult
+    wall_time: float = 0.0
+
+
+def _device(file: Path) -> int:
+    try:
+        return split_member(file)[0].stat().st_dev
+    except OSError:
+        return 0
+
+
+def _size(file: Path) -> int:
+    try:
+        return input_size(file)
+    except (OSError, KeyError):
+        return 0
+
+
+def plan_jobs(
+    entries: List[StationEntry], cache: Optional[ParsedCache] = None
+) -> Tuple[List[Job], List[JobResult]]:
+    """Group the input files of every station into one job per output.
+
+    A station whose configuration or reader cannot be loaded fails as a
+    whole, and an output claimed by two stations is only written by the
+    first one.
+
+    Returns
+    -------
+    Tuple[List[Job], List[JobResult]]
+        Jobs to run, and the failures found while planning them
+
+    """
+    jobs: List[Job] = []
+    failures: List[JobResult] = []
+    owners: Dict[Path, str] = {}
+    for entry in entries:
+        try:
+            config = Config.default()
+            if entry.config is not None:
+                config.add_config_from_toml(entry.config)
+            reader_class = get_station_reader_class(entry.station, config)
+            reader = reader_class(config, engine=entry.engine, cache=cache)
+            files = list_input_files(entry.input_dir, entry.pattern, entry.inputs)
+            files = reader.select_files(
+                expand_archives(files), entry.start_date, entry.end_date
+            )
+        except Exception as err:
+            lgr.error(f"Cannot plan the station {entry.station}: {err}")
+            failures.append(
+                JobResult(entry.station, BatchResult(Path(), [], error=str(err)))
+            )
+            continue
+
+        groups, unmatched = group_by_output(
+            reader, files, entry.output_pattern, entry.station
+        )
+        failures.extend(JobResult(entry.station, result) for result in unmatched)
+        for output, group in sorted(groups.items()):
+            owner = owners.setdefault(output.absolute(), entry.station)
+            if owner != entry.station:
+                error = f"Output already written by the station {owner}"
+                failures.append(
+                    JobResult(entry.station, BatchResult(output, group, error=error))
+                )
+                continue
+            jobs.append(
+                Job(
+                    entry.station,
+                    reader,
+                    config,
+                    output,
+                    group,
+                    entry,
+                    size=sum(map(_size, group)),
+                    device=_device(group[0]),
+                )
+            )
+    return jobs, failures
+
+
+class IOScheduler:
+    """Order in which jobs are started, spreading the reads over the devices.
+
+    Parameters
+    ----------
+    jobs : List[Job]
+        Jobs to run
+    per_device : Optional[int]
+        Maximum number of running jobs reading the same device, None for no
+        limit
+
+    """
+
+    def __init__(self, jobs: List[Job], per_device: Optional[int] = None):
+        self.per_device = per_device
+        self.pending: Dict[int, Deque[Job]] = {}
+        self.remaining: Counter = Counter()
+        self.running: Counter = Counter()
+        for job in sorted(jobs, key=lambda job: job.size, reverse=True):
+            self.pending.setdefault(job.device, deque()).append(job)
+            self.remaining[job.device] += job.size
+
+    def __bool__(self) -> bool:
+        return any(self.pending.values())
+
+    def next_job(self) -> Optional[Job]:
+        """Start the next job, None if every device with jobs is at its limit."""
+        devices = [
+            device
+            for device, queue in self.pending.items()
+            if queue
+            and (self.per_device is None or self.running[device] < self.per_device)
+        ]
+        if not devices:
+            return None
+        device = min(
+            devices, key=lambda device: (self.running[device], -self.remaining[device])
+        )
+        job = self.pending[device].popleft()
+        self.running[device] += 1
+        self.remaining[device] -= job.size
+        return job
+
+    def done(self, job: Job) -> None:
+        self.running[job.device] -= 1
+
+
+def run_job(job: Job) -> JobResult:
+    """Convert the files of a job, never raising."""
+    entry = job.entry
+    start = time.perf_counter()
+    result = convert_group(
+        job.reader,
+        job.config,
+        job.output,
+        job.files,
+        entry.start_date,
+        entry.end_date,
+        mode="a" if entry.append else "w",
+        preset=entry.encoding_preset,
+        read_period=entry.read_period,
+        output_format=entry.output_format,
+        resample_period=entry.resample,
+        qc=entry.qc,
+        qc_mask=entry.qc_mask,
+        duplicates=entry.duplicates,
+        regular=entry.regular,
+    )
+    return JobResult(job.station, result, time.perf_counter() - start)
+
+
+def run_jobs(
+    jobs: List[Job], max_jobs: int = DEFAULT_JOBS, per_device: Optional[int] = None
+) -> List[JobResult]:
+    """Run jobs in one pool of processes, in the order of an ``IOScheduler``.
+
+    Parameters
+    ----------
+    jobs : List[Job]
+        Jobs of all the stations
+    max_jobs : int
+        Maximum number of jobs running at once, 1 runs them in this process
+        and 0 uses one process per CPU
+    per_device : Optional[int]
+        Maximum number of running jobs reading the same device
+
+    Returns
+    -------
+    List[JobResult]
+        Result of each job, in the order they finished
+
+    """
+    if max_jobs == 0:
+        max_jobs = os.cpu_count() or 1
+    scheduler = IOScheduler(jobs, per_device)
+    results: List[JobResult] = []
+    if max_jobs == 1:
+        while scheduler:
+            job = scheduler.next_job()
+            assert job is not None
+            results.append(run_job(job))
+            scheduler.done(job)
+        return results
+
+    lgr.info(f"Run {len(jobs)} jobs with {max_jobs} processes")
+    with ProcessPoolExecutor(max_workers=max_jobs) as pool:
+        running: Dict[Future, Job] = {}
+        while scheduler or running:
+            while len(running) < max_jobs:
+                job = scheduler.next_job()
+                if job is None:
+                    break
+                running[pool.submit(run_job, job)] = job
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                job = running.pop(future)
+                scheduler.done(job)
+                try:
+                    results.append(future.result())
+                except Exception as err:
+                    # The worker died, e.g. killed when out of memory
+                    lgr.error(f"Job of {job.output} failed: {err}")
+                    results.append(
+                        JobResult(
+                            job.station,
+                            BatchResult(job.output, job.files, error=str(err)),
+                        )
+                    )
+    return results
+
+
+@dataclass
+class StationSummary:
+    """Throughput and failures of a station, or of the whole run."""
+
+    station: str
+    outputs: int = 0
+    failed: int = 0
+    inputs: int = 0
+    bytes_read: int = 0
+    rows: int = 0
+    wall_time: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def mib_per_second(self) -> float:
+        return self.bytes_read / 2**20 / self.wall_time if self.wall_time else 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.wall_time if self.wall_time else 0.0
+
+
+def summarize(
+    results: List[JobResult], elapsed: float
+) -> Tuple[List[StationSummary], StationSummary]:
+    """Sum the results of each station, and of the run.
+
+    The wall time of a station is the sum of the times of its jobs, the
+    one of the run is ``elapsed``, so the total throughput accounts for
+    the jobs running at once.
+
+    """
+    stations: Dict[str, StationSummary] = {}
+    total = StationSummary("total", wall_time=elapsed)
+    for job in results:
+        result = job.result
+        summary = stations.setdefault(job.station, StationSummary(job.station))
+        for counts in (summary, total):
+            counts.outputs += result.output != Path()
+            counts.failed += not result.ok
+            counts.inputs += len(result.inputs)
+            counts.bytes_read += result.bytes_read
+            counts.rows += result.rows
+        summary.wall_time += job.wall_time
+        if not result.ok:
+            inputs = result.failed_inputs or result.inputs
+            summary.errors.append(
+                f"{result.output}: {result.error or 'unreadable inputs'} "
+                f"({', '.join(str(p) for p in inputs)})"
+            )
+    return [stations[name] for name in sorted(stations)], total
+
+
+def run_manifest(
+    path: PathLike,
+    max_jobs: int = DEFAULT_JOBS,
+    per_device: Optional[int] = None,
+    cache: Optional[ParsedCache] = None,
+) -> Tuple[List[StationSummary], StationSummary]:
+    """Convert the files of all the stations of a manifest.
+
+    Parameters
+    ----------
+    path : PathLike
+        Manifest file, see the module documentation
+    max_jobs : int
+        Maximum number of outputs converted at once, over all the stations
+    per_device : Optional[int]
+        Maximum number of outputs converted at once from the same device
+    cache : Optional[ParsedCache]
+        Cache of parsed files shared by the stations
+
+    Returns
+    -------
+    Tuple[List[StationSummary], StationSummary]
+        Summary of each station and of the run
+
+    """
+    start = time.perf_counter()
+    jobs, failures = plan_jobs(load_manifest(path), cache)
+    stations = {job.station for job in jobs}
+    lgr.info(f"{len(jobs)} outputs to convert for {len(stations)} stations")
+    results = failures + run_jobs(jobs, max_jobs, per_device)
+    return summarize(results, time.perf_counter() - start)
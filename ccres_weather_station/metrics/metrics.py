@@ -0,0 +1,265 @@
+"""Per-stage metrics and profiling of a conversion.
+
+A :class:`Metrics` collects one :class:`StageMetrics` per stage of the
+pipeline (read, bounds, qc, resample, metadata, write) and one per parsed input file,
+with their wall and CPU times, rows and bytes read or written. While it is
+open, ``tracemalloc`` traces the Python allocations so the peak memory of
+each stage and of each file parsed in the main process is known; the memory
+of the files parsed by worker processes and of native libraries such as
+pyarrow is not traced.
+
+Only the standard library is imported here, so that the CLI can import it
+without slowing down.
+
+"""
+
+import cProfile
+import json
+import logging
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Type, TypeVar
+
+from ccres_weather_station.types import PathLike
+
+lgr = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class StageMetrics:
+    """Metrics of one stage of the pipeline, or of one input file.
+
+    ``peak_memory`` is the peak of the traced memory in bytes during the
+    stage, None when it is not traced.
+
+    """
+
+    stage: str
+    input_file: Optional[str] = None
+    output: Optional[str] = None
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    rows: int = 0
+    bytes_read: int = 0
+    bytes_written: int = 0
+    peak_memory: Optional[int] = None
+
+
+# Traced peak reached before the last reset inside the current stage
+_carried_peak = 0
+
+
+def _reset_peak() -> bool:
+    """Reset the traced peak, False if the memory is not traced."""
+    global _carried_peak
+    if not tracemalloc.is_tracing() or not hasattr(tracemalloc, "reset_peak"):
+        return False
+    _carried_peak = max(_carried_peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.reset_peak()
+    return True
+
+
+def timed(func: Callable[..., T], *args: Any) -> Tuple[T, float, float]:
+    """Call a function and get its result, wall time and CPU time."""
+    wall, cpu = time.perf_counter(), time.process_time()
+    result = func(*args)
+    return result, time.perf_counter() - wall, time.process_time() - cpu
+
+
+def timed_peak(
+    func: Callable[..., T], *args: Any
+) -> Tuple[T, float, float, Optional[int]]:
+    """Call a function and get its result, wall and CPU times and peak memory.
+
+    The peak is the one of the traced memory during the call, None when it
+    is not traced. The stage around the call keeps its own peak.
+
+    """
+    tracing = _reset_peak()
+    result, wall, cpu = timed(func, *args)
+    peak = tracemalloc.get_traced_memory()[1] if tracing else None
+    return result, wall, cpu, peak
+
+
+def path_size(path: PathLike) -> int:
+    """Get the size of a file, or of all the files of a directory."""
+    path = Path(path)
+    if not path.exists():
+        return 0
+    if path.is_dir():
+        return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+    return path.stat().st_size
+
+
+class Metrics:
+    """Metrics of a run, opened as a context manager.
+
+    Parameters
+    ----------
+    trace_memory : bool
+        Trace the Python allocations to get the peak memory of each stage.
+        Tracing slows the run down.
+
+    """
+
+    def __init__(self, trace_memory: bool = True):
+        self.trace_memory = trace_memory
+        self.records: List[StageMetrics] = []
+        self.total = StageMetrics(stage="total")
+        self._start: Optional[Tuple[float, float]] = None
+        self._started_tracing = False
+
+    def __enter__(self) -> "Metrics":
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._start = (time.perf_counter(), time.process_time())
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        if self._start is not None:
+            self.total.wall_time = time.perf_counter() - self._start[0]
+            self.total.cpu_time = time.process_time() - self._start[1]
+        if tracemalloc.is_tracing():
+            # The peak is reset at each stage
+            peaks = [r.peak_memory for r in self.records if r.peak_memory is not None]
+            self.total.peak_memory = max(
+                [tracemalloc.get_traced_memory()[1], _carried_peak, *peaks]
+            )
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+    def add(self, record: StageMetrics) -> StageMetrics:
+        self.records.append(record)
+        return record
+
+    @contextmanager
+    def stage(
+        self, name: str, output: Optional[PathLike] = None
+    ) -> Iterator[StageMetrics]:
+        """Time a stage, the caller fills its rows and bytes.
+
+        Stages must not be nested, the peak memory is reset at each start.
+        Calls of ``timed_peak`` within the stage are traced separately.
+
+        """
+        global _carried_peak
+        record = self.add(
+            StageMetrics(stage=name, output=None if output is None else str(output))
+        )
+        tracing = tracemalloc.is_tracing()
+        if tracing and hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+            _carried_peak = 0
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record.wall_time = time.perf_counter() - wall
+            record.cpu_time = time.process_time() - cpu
+            if tracing:
+                record.peak_memory = max(
+                    tracemalloc.get_traced_memory()[1], _carried_peak
+                )
+
+    def stages(self) -> Dict[str, StageMetrics]:
+        """Sum the records of each stage, the peak memory is the maximum."""
+        stages: Dict[str, StageMetrics] = {}
+        for record in self.records:
+            stage = stages.setdefault(record.stage, StageMetrics(stage=record.stage))
+            stage.wall_time += record.wall_time
+            stage.cpu_time += record.cpu_time
+            stage.rows += record.rows
+            stage.bytes_read += record.bytes_read
+            stage.bytes_written += record.bytes_written
+            if record.peak_memory is not None:
+                stage.peak_memory = max(stage.peak_memory or 0, record.peak_memory)
+        return stages
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total": asdict(self.total),
+            "stages": {name: asdict(stage) for name, stage in self.stages().items()},
+            "records": [asdict(record) for record in self.records],
+        }
+
+    def write_json(self, path: PathLike) -> None:
+        Path(path).write_text(json.dumps(self.to_dict(), indent=2) + "\n")
+
+    def log_summary(self, level: int = logging.INFO) -> None:
+        for stage in [*self.stages().values(), self.total]:
+            peak = (
+                ""
+                if stage.peak_memory is None
+                else f", {stage.peak_memory / 2**20:.1f} MiB"
+            )
+            lgr.log(
+                level,
+                f"{stage.stage}: {stage.wall_time:.3f} s wall, "
+                f"{stage.cpu_time:.3f} s CPU, {stage.rows} rows{peak}",
+            )
+
+
+@contextmanager
+def measure(
+    metrics: Optional[Metrics], name: str, output: Optional[PathLike] = None
+) -> Iterator[StageMetrics]:
+    """Time a stage with ``metrics``, or do nothing if it is None."""
+    if metrics is None:
+        yield StageMetrics(stage=name)
+        return
+    with metrics.stage(name, output) as record:
+        yield record
+
+
+@contextmanager
+def collect(
+    metrics_json: Optional[PathLike] = None, profile: Optional[PathLike] = None
+) -> Iterator[Optional[Metrics]]:
+    """Collect the metrics and the profile of a run.
+
+    Parameters
+    ----------
+    metrics_json : Optional[PathLike]
+        File where the metrics are written as JSON, None to not collect them
+    profile : Optional[PathLike]
+        File where the ``cProfile`` statistics are dumped, None to not
+        profile. Read it with ``python -m pstats`` or snakeviz.
+
+    Yields
+    ------
+    Optional[Metrics]
+        Metrics to fill, None if not collected
+
+    """
+    profiler = cProfile.Profile() if profile is not None else None
+    metrics = Metrics() if metrics_json is not None else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        if metrics is None:
+            yield None
+        else:
+            with metrics:
+                yield metrics
+    finally:
+        if profiler is not None and profile is not None:
+            profiler.disable()
+            profiler.dump_stats(str(profile))
+            lgr.info(f"Profile written to {profile}")
+        if metrics is not None and metrics_json is not None:
+            metrics.log_summary()
+            metrics.write_json(metrics_json)
+            lgr.info(f"Metrics written to {metrics_json}")
@@ -0,0 +1,36 @@
+"""Bits of the flag variables written by the quality control."""
+
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+
+QC_DTYPE = np.uint8
+QC_SUFFIX = "_qc"
+
+
+@dataclass(frozen=True)
+class Flag:
+    """Bit of a flag variable and its meaning."""
+
+    meaning: str
+    mask: int
+
+
+BELOW_VALID_MIN = Flag("below_valid_min", 1)
+ABOVE_VALID_MAX = Flag("above_valid_max", 2)
+STEP_TOO_LARGE = Flag("step_too_large", 4)
+FLAT_LINE = Flag("flat_line", 8)
+SPIKE = Flag("spike", 16)
+FLAGS: Tuple[Flag, ...] = (
+    BELOW_VALID_MIN,
+    ABOVE_VALID_MAX,
+    STEP_TOO_LARGE,
+    FLAT_LINE,
+    SPIKE,
+)
+
+
+def qc_name(name: str) -> str:
+    """Get the name of the flag variable of a variable."""
+    return f"{name}{QC_SUFFIX}"
@@ -0,0 +1,159 @@
+"""Quality control of the time series, recorded in CF flag variables.
+
+The flags of a variable ``name`` are the bits of a ``name_qc`` variable of
+type uint8, described by its ``flag_masks`` and ``flag_meanings``
+attributes, and linked from ``name`` by its ``ancillary_variables``
+attribute. A sample is good when its flags are 0.
+
+The range test flags the values below the ``valid_min`` or above the
+``valid_max`` of a variable in the configuration. Variables of the same type
+are stacked so that each comparison runs once over all of them. Missing
+values are not flagged. The temporal tests of ``qc.temporal`` then run on
+the variables with ``qc`` parameters in the configuration.
+
+"""
+
+import logging
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+import xarray as xr
+
+from ccres_weather_station.config.config import Config
+from ccres_weather_station.qc.flags import (
+    ABOVE_VALID_MAX,
+    BELOW_VALID_MIN,
+    FLAGS,
+    QC_DTYPE,
+    QC_SUFFIX,
+    qc_name,
+)
+from ccres_weather_station.qc.temporal import temporal_flags
+
+lgr = logging.getLogger(__name__)
+
+COUNTS_ATTR = "qc_flagged_samples"
+
+
+def is_flag_variable(var: xr.DataArray) -> bool:
+    return "flag_masks" in var.attrs
+
+
+def _flag_attrs(standard_name: Optional[str], name: str) -> Dict[str, Any]:
+    return {
+        "long_name": f"Quality flags of {name}",
+        "standard_name": (
+            f"{standard_name} status_flag" if standard_name else "status_flag"
+        ),
+        "flag_masks": np.array([flag.mask for flag in FLAGS], QC_DTYPE),
+        "flag_meanings": " ".join(flag.meaning for flag in FLAGS),
+    }
+
+
+def _merged_attrs(ds: xr.Dataset, config: Config, name: str) -> Dict[str, Any]:
+    return {**config.compile().variable_attrs.get(name, {}), **ds[name].attrs}
+
+
+def range_flags(ds: xr.Dataset, config: Config) -> Dict[str, Any]:
+    """Flag the values outside of the valid range of each variable.
+
+    Returns
+    -------
+    Dict[str, Any]
+        Flags of each variable with a ``valid_min`` or ``valid_max``, arrays
+        of ``QC_DTYPE`` along time, lazy if the dataset is
+
+    """
+    dim_time = config.compile().time_name
+    groups: Dict[np.dtype, List[Tuple[str, float, float]]] = {}
+    for name, var in ds.data_vars.items():
+        if var.dims != (dim_time,) or var.dtype.kind not in "fiu":
+            continue
+        attrs = _merged_attrs(ds, config, str(name))
+        if "valid_min" not in attrs and "valid_max" not in attrs:
+            continue
+        groups.setdefault(var.dtype, []).append(
+            (
+                str(name),
+                float(attrs.get("valid_min", -np.inf)),
+                float(attrs.get("valid_max", np.inf)),
+            )
+        )
+
+    flags = {}
+    for bounds in groups.values():
+        block = np.stack([ds[name].data for name, _, _ in bounds])
+        lows = np.array([[low] for _, low, _ in bounds])
+        highs = np.array([[high] for _, _, high in bounds])
+        flagged = (block < lows).astype(QC_DTYPE) * QC_DTYPE(BELOW_VALID_MIN.mask) | (
+            block > highs
+        ).astype(QC_DTYPE) * QC_DTYPE(ABOVE_VALID_MAX.mask)
+        for row, (name, _, _) in enumerate(bounds):
+            flags[name] = flagged[row]
+    return flags
+
+
+def add_flags(ds: xr.Dataset, config: Config, flags: Mapping[str, Any]) -> xr.Dataset:
+    """Add flags to the flag variables, created if needed."""
+    dim_time = config.compile().time_name
+    ds = ds.copy()
+    for name, values in flags.items():
+        flag_name = qc_name(name)
+        if flag_name in ds:
+            ds[flag_name] = ds[flag_name].copy(data=ds[flag_name].data | values)
+            continue
+        standard_name = _merged_attrs(ds, config, name).get("standard_name")
+        ds[flag_name] = xr.Variable(
+            (dim_time,), values, attrs=_flag_attrs(standard_name, name)
+        )
+        ds[name].attrs["ancillary_variables"] = flag_name
+    return ds
+
+
+def finish_flags(ds: xr.Dataset, mask: bool = False) -> xr.Dataset:
+    """Count the flagged samples of each variable, and mask them if asked.
+
+    The counts are logged and kept in the ``qc_flagged_samples`` global
+    attribute.
+
+    """
+    counts = {}
+    for name, var in ds.data_vars.items():
+        if not is_flag_variable(var) or not str(name).endswith(QC_SUFFIX):
+            continue
+        parent = str(name)[: -len(QC_SUFFIX)]
+        flagged = var != 0
+        counts[parent] = int(flagged.sum())
+        lgr.info(f"{counts[parent]} samples of {parent} flagged")
+        if mask and parent in ds:
+            ds[parent] = ds[parent].where(~flagged)
+    if counts:
+        ds.attrs[COUNTS_ATTR] = ", ".join(
+            f"{name}: {count}" for name, count in counts.items()
+        )
+    return ds
+
+
+def apply_qc(ds: xr.Dataset, config: Config, mask: bool = False) -> xr.Dataset:
+    """Flag the values outside of their valid range, then run the temporal tests.
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        Dataset read from the input files
+    config : Config
+        Configuration giving the ``valid_min`` and ``valid_max`` and the
+        ``qc`` parameters of the variables
+    mask : bool
+        Replace the flagged values with NaN
+
+    Returns
+    -------
+    xr.Dataset
+        Dataset with a flag variable for each variable with a valid range
+        or temporal tests
+
+    """
+    ds = add_flags(ds, config, range_flags(ds, config))
+    ds = add_flags(ds, config, temporal_flags(ds, config))
+    return finish_flags(ds, mask)
@@ -0,0 +1,224 @@
+"""Temporal quality control tests: steps, flat lines and spikes.
+
+The tests of a variable run when their parameters are set in the ``qc``
+section of the variable in the configuration:
+
+- ``max_step``: largest change between two consecutive valid samples, in
+  units of the variable per minute. The later sample of a larger step is
+  flagged ``step_too_large``.
+- ``flat_line_minutes``: shortest duration of a flat line, when the changes
+  between consecutive valid samples stay within ``flat_line_tolerance`` (0
+  by default). All the samples of a flat line are flagged ``flat_line``.
+- ``spike_window_minutes`` and ``spike_threshold``: the samples farther
+  from the median of the centred window than ``spike_threshold`` times the
+  scaled median absolute deviation (MAD) of the window, and than
+  ``spike_min_deviation``, are flagged ``spike``.
+
+The tests run on the whole concatenated time series, so they must run
+before resampling. Missing samples and samples already flagged, e.g. by the
+range test, are ignored. Steps and flat lines are found from the
+differences of consecutive samples and a cumulative sum of the changes, and
+the rolling medians of the spike test on a strided view of the samples, in
+blocks of ``BLOCK_SIZE`` windows to bound the memory.
+
+"""
+
+import logging
+from typing import Any, Dict
+
+import numpy as np
+import xarray as xr
+
+from ccres_weather_station.config.config import Config
+from ccres_weather_station.qc.flags import (
+    FLAT_LINE,
+    QC_DTYPE,
+    SPIKE,
+    STEP_TOO_LARGE,
+    qc_name,
+)
+
+lgr = logging.getLogger(__name__)
+
+BLOCK_SIZE = 2**16
+# Scale of the MAD to the standard deviation of a normal distribution
+MAD_SCALE = 1.4826
+NS_PER_MINUTE = 60 * 10**9
+
+
+def step_flags(minutes: np.ndarray, values: np.ndarray, max_step: float) -> np.ndarray:
+    """Flag the samples after a change larger than ``max_step`` per minute.
+
+    ``minutes`` and ``values`` are the times and values of the valid
+    samples only.
+
+    """
+    flagged = np.zeros(values.size, bool)
+    if values.size < 2:
+        return flagged
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = np.abs(np.diff(values)) / np.diff(minutes)
+    flagged[1:] = rate > max_step
+    return flagged
+
+
+def flat_line_flags(
+    minutes: np.ndarray, values: np.ndarray, duration: float, tolerance: float = 0.0
+) -> np.ndarray:
+    """Flag the samples of the flat lines lasting at least ``duration`` minutes.
+
+    ``minutes`` and ``values`` are the times and values of the valid
+    samples only.
+
+    """
+    if values.size == 0:
+        return np.zeros(0, bool)
+    changed = np.ones(values.size, bool)
+    changed[1:] = np.abs(np.diff(values)) > tolerance
+    run = np.cumsum(changed) - 1
+    starts = np.flatnonzero(changed)
+    ends = np.append(starts[1:], values.size) - 1
+    flat = (minutes[ends] - minutes[starts] >= duration) & (ends > starts)
+    return flat[run]
+
+
+def _rolling_median(values: np.ndarray, window: int) -> np.ndarray:
+    """Median of the centred windows of ``window`` samples, ignoring NaN.
+
+    The windows are sorted, NaN last, which is several times faster than
+    ``np.nanmedian`` on short windows.
+
+    """
+    half = window // 2
+    padded = np.pad(values, half, constant_values=np.nan)
+    median = np.empty(values.size, values.dtype)
+    for start in range(0, values.size, BLOCK_SIZE):
+        stop = min(start + BLOCK_SIZE, values.size)
+        ordered = np.sort(
+            np.lib.stride_tricks.sliding_window_view(
+                padded[start : stop + 2 * half], window
+            ),
+            axis=-1,
+        )
+        count = window - np.count_nonzero(np.isnan(ordered), axis=-1)
+        low = np.take_along_axis(ordered, np.maximum(count - 1, 0)[:, None] // 2, -1)
+        high = np.take_along_axis(
+            ordered, np.minimum(count, window - 1)[:, None] // 2, -1
+        )
+        median[start:stop] = (low[:, 0] + high[:, 0]) / 2
+    return median
+
+
+def spike_flags(
+    values: np.ndarray,
+    window: int,
+    threshold: float,
+    min_deviation: float = 0.0,
+) -> np.ndarray:
+    """Flag the samples far from the median of their window.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Samples, NaN when missing
+    window : int
+        Number of samples of the centred windows, made odd
+    threshold : float
+        Number of scaled MADs from the median above which a sample is a spike
+    min_deviation : float
+        Smallest distance from the median of a spike, so that a window
+        whose values are mostly equal does not turn every change into a
+        spike
+
+    """
+    window = max(3, window | 1)
+    deviation = np.abs(values - _rolling_median(values, window))
+    mad = _rolling_median(deviation, window) * MAD_SCALE
+    with np.errstate(invalid="ignore"):
+        return (deviation > threshold * mad) & (deviation > min_deviation)
+
+
+def _window_samples(minutes: np.ndarray, window_minutes: float) -> int:
+    """Get the number of samples in a window from the median sampling period."""
+    if minutes.size < 2:
+        return 1
+    step = float(np.median(np.diff(minutes)))
+    return int(round(window_minutes / step)) if step > 0 else 1
+
+
+def variable_flags(
+    minutes: np.ndarray, values: np.ndarray, params: Dict[str, Any]
+) -> np.ndarray:
+    """Run the temporal tests of a variable.
+
+    Parameters
+    ----------
+    minutes : np.ndarray
+        Sorted times of the samples, in minutes
+    values : np.ndarray
+        Samples, NaN when missing or already flagged
+    params : Dict[str, Any]
+        Parameters of the tests, the fields of ``VariableQC``
+
+    Returns
+    -------
+    np.ndarray
+        Flags of the samples
+
+    """
+    flags = np.zeros(values.size, QC_DTYPE)
+    valid = np.flatnonzero(np.isfinite(values))
+    valid_minutes, valid_values = minutes[valid], values[valid]
+
+    max_step = params.get("max_step")
+    if max_step is not None:
+        flagged = step_flags(valid_minutes, valid_values, max_step)
+        flags[valid[flagged]] |= STEP_TOO_LARGE.mask
+
+    duration = params.get("flat_line_minutes")
+    if duration is not None:
+        tolerance = params.get("flat_line_tolerance") or 0.0
+        flagged = flat_line_flags(valid_minutes, valid_values, duration, tolerance)
+        flags[valid[flagged]] |= FLAT_LINE.mask
+
+    window_minutes = params.get("spike_window_minutes")
+    threshold = params.get("spike_threshold")
+    if window_minutes is not None and threshold is not None:
+        window = _window_samples(minutes, window_minutes)
+        min_deviation = params.get("spike_min_deviation") or 0.0
+        flags[spike_flags(values, window, threshold, min_deviation)] |= SPIKE.mask
+    return flags
+
+
+def temporal_flags(ds: xr.Dataset, config: Config) -> Dict[str, np.ndarray]:
+    """Run the temporal tests of the variables with ``qc`` parameters.
+
+    The variables are loaded in memory, their flagged samples are ignored.
+
+    Returns
+    -------
+    Dict[str, np.ndarray]
+        Flags of each tested variable
+
+    """
+    compiled = config.compile()
+    dim_time = compiled.time_name
+    time = ds[dim_time].values
+    if time.size > 1 and np.any(time[1:] < time[:-1]):
+        raise ValueError("The temporal quality control needs a sorted time")
+    ns = time.astype("datetime64[ns]").astype(np.int64)
+    minutes = (ns - ns[:1]) / NS_PER_MINUTE
+
+    flags = {}
+    for name, params in compiled.variable_qc.items():
+        if not params or name not in ds or ds[name].dims != (dim_time,):
+            continue
+        values = ds[name].values.astype(np.float64)
+        if qc_name(name) in ds:
+            values[ds[qc_name(name)].values != 0] = np.nan
+        flags[name] = variable_flags(minutes, values, params)
+        lgr.debug(
+            f"{np.count_nonzero(flags[name])} samples of {name} "
+            "flagged by the temporal tests"
+        )
+    return flags
@@ -1,16 +1,110 @@
+import datetime as dt
+import inspect
 from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List, Optional, Tuple
 
+import numpy as np
 import xarray as xr
 
 from ccres_weather_station.config.config import Config
+from ccres_weather_station.metrics.metrics import Metrics
+from ccres_weather_station.readers.cache import ParsedCache
+from ccres_weather_station.readers.constants import DEFAULT_DUPLICATES
+from ccres_weather_station.readers.engines import (
+    DEFAULT_ENGINE,
+    check_engine,
+    count_rows,
+)
+from ccres_weather_station.readers.merge import check_duplicates, merge_dataset
 from ccres_weather_station.types import PathLike, PathsLike
 
 
 class BaseReader(ABC):
-    """Base reader to implement for registering readers."""
+    """Base reader to implement for registering readers.
 
-    def __init__(self, config: Config):
+    Parameters
+    ----------
+    config : Config
+        Configuration object
+    engine : str
+        Parse engine used by readers relying on
+        ``ccres_weather_station.readers.engines``
+    cache : Optional[ParsedCache]
+        Cache of the parsed files, None to always parse them
+
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        engine: str = DEFAULT_ENGINE,
+        cache: Optional[ParsedCache] = None,
+    ):
         self.config = config
+        self.engine = check_engine(engine)
+        self.cache = cache
+
+    def file_coverage(
+        self, file: PathLike
+    ) -> Optional[Tuple[dt.datetime, dt.datetime]]:
+        """Get the period covered by a file from its name only.
+
+        Returns
+        -------
+        Optional[Tuple[dt.datetime, dt.datetime]]
+            Start (included) and end (excluded) of the file, None if the
+            name does not tell it
+
+        """
+        return None
+
+    def file_extent(
+        self, file: PathLike
+    ) -> Optional[Tuple[np.datetime64, np.datetime64]]:
+        """Get the times of the first and last rows of a file without parsing it.
+
+        Returns
+        -------
+        Optional[Tuple[np.datetime64, np.datetime64]]
+            Times of the first and last rows, both included, None if the
+            reader cannot tell them
+
+        """
+        return None
+
+    def count_rows(self, file: PathLike) -> int:
+        """Count the rows of a file without parsing it.
+
+        By default every line is counted except the empty ones and the
+        ones starting with ``#``, readers knowing the layout of their files
+        count them more precisely.
+
+        """
+        return count_rows(file)
+
+    def select_files(
+        self,
+        files: PathsLike,
+        start_date: Optional[dt.datetime] = None,
+        end_date: Optional[dt.datetime] = None,
+    ) -> List[Path]:
+        """Keep the files whose coverage can intersect [start_date, end_date].
+
+        Files whose coverage is unknown are always kept.
+
+        """
+        selected = []
+        for file in files:
+            coverage = self.file_coverage(file)
+            if coverage is not None:
+                start, end = coverage
+                if start_date is not None and end <= start_date:
+                    continue
+                if end_date is not None and start > end_date:
+                    continue
+            selected.append(Path(file))
+        return selected
 
     @abstractmethod
     def read_file(self, file: PathLike) -> xr.Dataset:
@@ -18,4 +112,105 @@ class BaseReader(ABC):
 
     @abstractmethod
     def read_files(self, files: PathsLike) -> xr.Dataset:
+        """Read and concatenate files along time.
+
+        Readers may also accept the keyword options of ``read``, which then
+        passes them instead of applying them itself.
+
+        """
         pass
+
+    def read(
+        self,
+        files: PathsLike,
+        workers: Optional[int] = None,
+        start_date: Optional[dt.datetime] = None,
+        end_date: Optional[dt.datetime] = None,
+        metrics: Optional[Metrics] = None,
+        duplicates: Optional[str] = None,
+        regular: bool = False,
+    ) -> xr.Dataset:
+        """Read files into one dataset with the options of the CLI.
+
+        If ``read_files`` accepts all these options, they are passed to it.
+        Otherwise the files out of [start_date, end_date] are skipped, the
+        others are read with ``read_files`` and their rows are cropped and
+        merged here, while ``workers`` and ``metrics`` are ignored.
+
+        Parameters
+        ----------
+        files : PathsLike
+            Files to read, the output keeps their order unless merged
+        workers : Optional[int]
+            Number of processes parsing the files. ``None`` or 1 reads them
+            sequentially, 0 uses one process per CPU.
+        start_date : Optional[dt.datetime]
+            Date from which to keep the rows, included
+        end_date : Optional[dt.datetime]
+            Date from which to drop the rows, included as in ``apply_bounds``
+        metrics : Optional[Metrics]
+            Metrics where readers able to tell them add one "parse" record
+            per file
+        duplicates : Optional[str]
+            Merge the rows of the files by time and keep one row per time
+            with this policy, one of ``DUPLICATE_POLICIES``, see
+            ``ccres_weather_station.readers.merge``. None concatenates the
+            files as given.
+        regular : bool
+            Merge the rows, with the ``first`` policy by default, and
+            reindex them onto a regular grid at the sampling period
+
+        """
+        options = {
+            "workers": workers,
+            "start_date": start_date,
+            "end_date": end_date,
+            "metrics": metrics,
+            "duplicates": duplicates,
+            "regular": regular,
+        }
+        parameters = inspect.signature(self.read_files).parameters
+        if all(name in parameters for name in options) or any(
+            parameter.kind == inspect.Parameter.VAR_KEYWORD
+            for parameter in parameters.values()
+        ):
+            return self.read_files(files, **options)
+
+        if duplicates is not None:
+            check_duplicates(duplicates)
+        if start_date is not None or end_date is not None:
+            files = self.select_files(files, start_date, end_date)
+        ds = self.read_files(files)
+
+        dim_time = self.config.coords["time"].name
+        time = ds[dim_time].values
+        keep = np.ones(time.size, dtype=bool)
+        if start_date is not None:
+            keep &= time >= np.datetime64(start_date)
+        if end_date is not None:
+            keep &= time <= np.datetime64(end_date)
+        if not keep.all():
+            ds = ds.isel({dim_time: keep})
+        if duplicates is not None or regular:
+            ds = merge_dataset(ds, dim_time, duplicates or DEFAULT_DUPLICATES, regular)
+        return ds
+
+    def read_files_lazy(
+        self,
+        files: PathsLike,
+        workers: Optional[int] = None,
+        start_date: Optional[dt.datetime] = None,
+        end_date: Optional[dt.datetime] = None,
+    ) -> xr.Dataset:
+        """Read files into a dataset of dask arrays, one chunk per file.
+
+        Parameters are the ones of ``read``. The data is only parsed
+        when computed, so datasets larger than the memory can be written.
+
+        Raises
+        ------
+        NotImplementedError
+            If the reader cannot read lazily
+
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot read lazily")
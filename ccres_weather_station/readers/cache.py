@@ -0,0 +1,161 @@
+"""On-disk cache of parsed input files.
+
+Each parsed file is stored as an uncompressed ``.npz`` holding its numpy
+columns. The key is built from the path, size and modification time of the
+input file, plus a namespace describing the reader and its parse plan, so
+any change of the file or of the configuration misses the cache.
+
+The cache is bounded in size; the least recently used entries are removed
+first. Using an entry touches its modification time.
+
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from ccres_weather_station import __version__
+from ccres_weather_station.readers.constants import (
+    DEFAULT_CACHE_DIR,
+    DEFAULT_CACHE_SIZE,
+)
+from ccres_weather_station.readers.engines import ParsedColumns
+from ccres_weather_station.readers.sources import input_stat
+from ccres_weather_station.types import PathLike
+
+lgr = logging.getLogger(__name__)
+
+_TIME_KEY = "time"
+_VAR_PREFIX = "var_"
+
+
+class ParsedCache:
+    """Size-bounded LRU cache of :class:`ParsedColumns`.
+
+    Parameters
+    ----------
+    directory : PathLike
+        Directory of the cache, created if needed
+    max_bytes : int
+        Maximum size of the cache on disk
+
+    """
+
+    def __init__(
+        self,
+        directory: PathLike = DEFAULT_CACHE_DIR,
+        max_bytes: int = DEFAULT_CACHE_SIZE,
+    ):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None
+
+    def key(self, path: PathLike, namespace: str) -> str:
+        stat = input_stat(path)
+        path = Path(path).resolve()
+        identity = f"{__version__}|{namespace}|{path}|{stat.st_size}|{stat.st_mtime_ns}"
+        return hashlib.sha1(identity.encode()).hexdigest()
+
+    def _entry(self, path: PathLike, namespace: str) -> Path:
+        return self.directory / f"{self.key(path, namespace)}.npz"
+
+    def _touch(self, entry: Path) -> None:
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+
+    def count(self, path: PathLike, namespace: str) -> Optional[int]:
+        """Get the number of cached rows of a file without loading it."""
+        entry = self._entry(path, namespace)
+        try:
+            with zipfile.ZipFile(entry) as archive:
+                with archive.open(f"{_TIME_KEY}.npy") as f:
+                    if np.lib.format.read_magic(f) == (1, 0):
+                        shape, _, _ = np.lib.format.read_array_header_1_0(f)
+                    else:
+                        shape, _, _ = np.lib.format.read_array_header_2_0(f)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            return None
+        return int(shape[0])
+
+    def get(self, path: PathLike, namespace: str) -> Optional[ParsedColumns]:
+        entry = self._entry(path, namespace)
+        try:
+            with np.load(entry, allow_pickle=False) as npz:
+                parsed = ParsedColumns(
+                    time=npz[_TIME_KEY],
+                    variables={
+                        key[len(_VAR_PREFIX) :]: npz[key]
+                        for key in npz.files
+                        if key.startswith(_VAR_PREFIX)
+                    },
+                )
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            lgr.warning(f"Removing corrupted cache entry {entry}")
+            entry.unlink(missing_ok=True)
+            return None
+        self._touch(entry)
+        return parsed
+
+    def put(self, path: PathLike, namespace: str, parsed: ParsedColumns) -> None:
+        entry = self._entry(path, namespace)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        arrays = {_TIME_KEY: parsed.time}
+        for name, values in parsed.variables.items():
+            arrays[f"{_VAR_PREFIX}{name}"] = values
+
+        # Write then rename so concurrent readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, **arrays)
+            try:
+                replaced = entry.stat().st_size
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp, entry)
+        except OSError as err:
+            lgr.warning(f"Cannot write cache entry {entry}: {err}")
+            Path(tmp).unlink(missing_ok=True)
+            return
+
+        if self._size is not None:
+            self._size += entry.stat().st_size - replaced
+        self.evict()
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        entries = []
+        for entry in self.directory.glob("*.npz"):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        return entries
+
+    def evict(self) -> None:
+        """Remove the least recently used entries above ``max_bytes``."""
+        if self._size is not None and self._size <= self.max_bytes:
+            return
+        entries = self._entries()
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if self._size <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            self._size -= size
+            lgr.debug(f"Evicted cache entry {entry}")
+
+    def clear(self) -> None:
+        for _, _, entry in self._entries():
+            entry.unlink(missing_ok=True)
+        self._size = 0
@@ -0,0 +1,391 @@
+"""Readers whose files are parsed into numpy columns.
+
+A columnar reader only has to describe the layout of its files with a
+:class:`ParsePlan`. Parsing one or many files, possibly in a process pool,
+is handled here. Files may be compressed or members of archives, see
+``ccres_weather_station.readers.sources``.
+
+"""
+
+import datetime as dt
+import logging
+import os
+import tracemalloc
+from abc import abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from functools import partial
+from typing import ClassVar, Dict, Iterator, Optional, Tuple, Type
+
+import numpy as np
+import xarray as xr
+
+from ccres_weather_station.config.config import CompiledConfig, Config
+from ccres_weather_station.metrics.metrics import (
+    Metrics,
+    StageMetrics,
+    timed_peak,
+)
+from ccres_weather_station.readers.base import BaseReader
+from ccres_weather_station.readers.cache import ParsedCache
+from ccres_weather_station.readers.constants import DEFAULT_DUPLICATES
+from ccres_weather_station.readers.dataset import dataset_from_columns
+from ccres_weather_station.readers.engines import (
+    DEFAULT_ENGINE,
+    ParsedColumns,
+    ParsePlan,
+    concat_columns,
+    count_rows,
+    line_time,
+    parse,
+    parse_bytes,
+    read_edge_lines,
+    select_engine,
+    skip_header,
+)
+from ccres_weather_station.readers.merge import merge_runs
+from ccres_weather_station.readers.sources import (
+    expand_archives,
+    input_size,
+    is_plain,
+    iter_inputs,
+    prefetch,
+)
+from ccres_weather_station.types import PathLike, PathsLike
+
+lgr = logging.getLogger(__name__)
+
+# Reader of the current worker process, set once by the pool initializer
+_WORKER_READER: Optional["ColumnarReader"] = None
+
+
+def _init_worker(reader: "ColumnarReader") -> None:
+    global _WORKER_READER
+    _WORKER_READER = reader
+    # The parses of the workers are not traced, see Metrics
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def _parse_in_worker(
+    path: PathLike,
+    start_date: Optional[dt.datetime] = None,
+    end_date: Optional[dt.datetime] = None,
+) -> Tuple[ParsedColumns, float, float, Optional[int]]:
+    assert _WORKER_READER is not None
+    return _WORKER_READER._parse_timed(path, start_date, end_date)
+
+
+def _record_parse(
+    metrics: Optional[Metrics],
+    file: PathLike,
+    rows: int,
+    wall: float,
+    cpu: float,
+    peak: Optional[int],
+) -> None:
+    if metrics is not None:
+        metrics.add(
+            StageMetrics(
+                stage="parse",
+                input_file=str(file),
+                wall_time=wall,
+                cpu_time=cpu,
+                rows=rows,
+                bytes_read=input_size(file),
+                peak_memory=peak,
+            )
+        )
+
+
+def get_workers(workers: Optional[int]) -> int:
+    """Get the number of worker processes.
+
+    ``None`` or 1 means no pool, 0 means one worker per CPU.
+
+    """
+    if workers is None:
+        return 1
+    if workers < 0:
+        raise ValueError("The number of workers must be positive")
+    if workers == 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+class ColumnarReader(BaseReader):
+    """Reader parsing each file into numpy columns following a plan.
+
+    Plans only depend on the reader class and the configuration, they are
+    built once per compiled configuration.
+
+    """
+
+    _plans: ClassVar[Dict[Tuple[Type["ColumnarReader"], CompiledConfig], ParsePlan]] = (
+        {}
+    )
+
+    def __init__(
+        self,
+        config: Config,
+        engine: str = DEFAULT_ENGINE,
+        cache: Optional[ParsedCache] = None,
+    ):
+        super().__init__(config, engine, cache)
+        key = (type(self), config.compile())
+        if key not in self._plans:
+            self._plans[key] = self.get_plan()
+        self.plan = self._plans[key]
+        self.engine = select_engine(self.plan, self.engine)
+        self.cache_namespace = f"{type(self).__qualname__}|{self.plan!r}"
+
+    @abstractmethod
+    def get_plan(self) -> ParsePlan:
+        pass
+
+    @property
+    def time_name(self) -> str:
+        return self.plan.time_name
+
+    def parse_file(self, path: PathLike, data: Optional[bytes] = None) -> ParsedColumns:
+        """Parse a file, or its ``data`` already read and decompressed."""
+
+        def _parse() -> ParsedColumns:
+            if data is None:
+                return parse(path, self.plan, self.engine)
+            return parse_bytes(
+                skip_header(data, self.plan), self.plan, self.engine, str(path)
+            )
+
+        if self.cache is None:
+            return _parse()
+
+        parsed = self.cache.get(path, self.cache_namespace)
+        if parsed is None:
+            parsed = _parse()
+            self.cache.put(path, self.cache_namespace, parsed)
+        return parsed
+
+    def parse_time(self, path: PathLike) -> ParsedColumns:
+        """Parse only the time column of a file, without any variable.
+
+        The variables are kept if the file is in the cache, as they are
+        already parsed.
+
+        """
+        if self._is_cached(path):
+            return self.parse_file(path)
+        plan = replace(self.plan, variables=(), spans=self.plan.spans[:1])
+        return parse(path, plan, self.engine)
+
+    def _is_cached(self, path: PathLike) -> bool:
+        return (
+            self.cache is not None
+            and self.cache.count(path, self.cache_namespace) is not None
+        )
+
+    def parse_lines(
+        self, data: bytes, name: str = "<bytes>", header: bool = False
+    ) -> ParsedColumns:
+        """Parse complete lines of a file, never cached.
+
+        ``header`` tells that the lines start at the beginning of the file,
+        with the header rows of the plan.
+
+        """
+        if header:
+            data = skip_header(data, self.plan)
+        return parse_bytes(data, self.plan, self.engine, name)
+
+    def count_rows(self, path: PathLike) -> int:
+        """Get an upper bound of the rows of a file without parsing it."""
+        if self.cache is not None:
+            cached = self.cache.count(path, self.cache_namespace)
+            if cached is not None:
+                return cached
+        return count_rows(path, self.plan.comment, self.plan.skip_rows)
+
+    def file_extent(
+        self, file: PathLike
+    ) -> Optional[Tuple[np.datetime64, np.datetime64]]:
+        if self.plan.spans:
+            return None
+        lines = read_edge_lines(file, self.plan.comment, self.plan.skip_rows)
+        if lines is None:
+            return None
+        return line_time(lines[0], self.plan), line_time(lines[1], self.plan)
+
+    def _to_dataset(self, parsed: ParsedColumns) -> xr.Dataset:
+        return dataset_from_columns(parsed.time, parsed.variables, self.time_name)
+
+    def _parse_timed(
+        self,
+        path: PathLike,
+        start_date: Optional[dt.datetime] = None,
+        end_date: Optional[dt.datetime] = None,
+        data: Optional[bytes] = None,
+    ) -> Tuple[ParsedColumns, float, float, Optional[int]]:
+        parsed, wall, cpu, peak = timed_peak(self.parse_file, path, data)
+        return parsed.between(start_date, end_date), wall, cpu, peak
+
+    def _iter_timed(
+        self,
+        files: PathsLike,
+        workers: Optional[int] = None,
+        start_date: Optional[dt.datetime] = None,
+        end_date: Optional[dt.datetime] = None,
+    ) -> Iterator[Tuple[ParsedColumns, float, float, Optional[int]]]:
+        n_workers = min(get_workers(workers), len(files))
+        if n_workers <= 1:
+            # The next files are read and decompressed while one is parsed
+            inputs = prefetch(iter_inputs(files, skip=self._is_cached))
+            for file, data in zip(files, inputs):
+                yield self._parse_timed(file, start_date, end_date, data)
+            return
+
+        lgr.debug(f"Parse {len(files)} files with {n_workers} processes")
+        chunksize = max(1, len(files) // (n_workers * 4))
+        with ProcessPoolExecutor(
+            max_workers=n_workers, initializer=_init_worker, initargs=(self,)
+        ) as pool:
+            yield from pool.map(
+                partial(_parse_in_worker, start_date=start_date, end_date=end_date),
+                files,
+                chunksize=chunksize,
+            )
+
+    def iter_parsed(
+        self,
+        files: PathsLike,
+        workers: Optional[int] = None,
+        start_date: Optional[dt.datetime] = None,
+        end_date: Optional[dt.datetime] = None,
+    ) -> Iterator[ParsedColumns]:
+        """Parse files, in a process pool if more than one worker.
+
+        Results are yielded in the order of ``files``. Workers send back
+        the numpy buffers of :class:`ParsedColumns`, not xarray objects,
+        with only the rows from start_date to end_date.
+
+        """
+        for parsed, _, _, _ in self._iter_timed(files, workers, start_date, end_date):
+            yield parsed
+
+    def read_file(self, path: PathLike) -> xr.Dataset:
+        return self._to_dataset(self.parse_file(path))
+
+    def read_files(
+        self,
+        files: PathsLike,
+        workers: Optional[int] = None,
+        start_date: Optional[dt.datetime] = None,
+        end_date: Optional[dt.datetime] = None,
+        metrics: Optional[Metrics] = None,
+        duplicates: Optional[str] = None,
+        regular: bool = False,
+    ) -> xr.Dataset:
+        """Read files into one dataset in a single pass.
+
+        The options are the ones of ``BaseReader.read``, which passes them.
+
+        Files whose name tells they are outside [start_date, end_date] are
+        not opened, and the rows outside are dropped file by file. Archives
+        are replaced with their members.
+
+        The rows are counted first so the final arrays are allocated once
+        and filled in place while the files are parsed. The peak memory is
+        the final dataset plus the files being parsed. Compressed files and
+        members of archives are not counted, to decompress them once: their
+        rows are concatenated at the end, which needs twice the memory of
+        the dataset.
+
+        With ``metrics``, a "parse" record per file holds its size, its rows
+        kept and the times spent parsing it, in a worker or not.
+
+        With ``duplicates`` or ``regular``, the rows of the files are then
+        merged as sorted runs, see ``merge_runs``.
+
+        """
+        files = expand_archives(files)
+        if start_date is not None or end_date is not None:
+            selected = self.select_files(files, start_date, end_date)
+            lgr.debug(f"{len(selected)} of {len(files)} files in the date range")
+            files = selected
+        if not all(is_plain(file) or self._is_cached(file) for file in files):
+            return self._read_streams(
+                files, workers, start_date, end_date, metrics, duplicates, regular
+            )
+        total = sum(self.count_rows(file) for file in files)
+        time = np.empty(total, dtype="datetime64[ns]")
+        variables: Dict[str, np.ndarray] = {}
+
+        offset = 0
+        timed_files = self._iter_timed(files, workers, start_date, end_date)
+        for file, (parsed, wall, cpu, peak) in zip(files, timed_files):
+            size = len(parsed)
+            _record_parse(metrics, file, size, wall, cpu, peak)
+            if offset + size > total:
+                raise ValueError("More rows parsed than counted in the files")
+            if not variables:
+                variables = {
+                    name: np.empty(total, dtype=values.dtype)
+                    for name, values in parsed.variables.items()
+                }
+            time[offset : offset + size] = parsed.time
+            for name, values in parsed.variables.items():
+                variables[name][offset : offset + size] = values
+            offset += size
+
+        if not variables:
+            variables = {
+                name: np.empty(0, dtype=self.plan.dtype)
+                for name, _ in self.plan.variables
+            }
+        # Counts are upper bounds, views drop the unused tail without a copy
+        # unless most of the buffers are unused, e.g. when cropped by dates
+        trimmed = ParsedColumns(
+            time=time[:offset],
+            variables={name: values[:offset] for name, values in variables.items()},
+        )
+        if offset < total // 2:
+            trimmed = ParsedColumns(
+                time=trimmed.time.copy(),
+                variables={
+                    name: values.copy() for name, values in trimmed.variables.items()
+                },
+            )
+        if duplicates is not None or regular:
+            trimmed = merge_runs(trimmed, duplicates or DEFAULT_DUPLICATES, regular)
+        return self._to_dataset(trimmed)
+
+    def _read_streams(
+        self,
+        files: PathsLike,
+        workers: Optional[int],
+        start_date: Optional[dt.datetime],
+        end_date: Optional[dt.datetime],
+        metrics: Optional[Metrics],
+        duplicates: Optional[str],
+        regular: bool,
+    ) -> xr.Dataset:
+        """Read files without counting their rows first, then concatenate them."""
+        parts = []
+        timed_files = self._iter_timed(files, workers, start_date, end_date)
+        for file, (parsed, wall, cpu, peak) in zip(files, timed_files):
+            _record_parse(metrics, file, len(parsed), wall, cpu, peak)
+            parts.append(parsed)
+        merged = concat_columns(parts, self.plan)
+        if duplicates is not None or regular:
+            merged = merge_runs(merged, duplicates or DEFAULT_DUPLICATES, regular)
+        return self._to_dataset(merged)
+
+    def read_files_lazy(
+        self,
+        files: PathsLike,
+        workers: Optional[int] = None,
+        start_date: Optional[dt.datetime] = None,
+        end_date: Optional[dt.datetime] = None,
+    ) -> xr.Dataset:
+        from ccres_weather_station.readers.lazy import read_lazy
+
+        return read_lazy(self, files, workers, start_date, end_date)
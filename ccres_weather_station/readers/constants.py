@@ -0,0 +1,24 @@
+"""Constants of the readers, importable without numpy, pandas or xarray."""
+
+import os
+from pathlib import Path
+
+ENGINES = ("pandas", "pyarrow", "numpy")
+DEFAULT_ENGINE = "pandas"
+# Fastest engine able to parse the layout of the files
+AUTO_ENGINE = "auto"
+
+DEFAULT_CACHE_DIR = (
+    Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+    / "ccres_weather_station"
+)
+DEFAULT_CACHE_SIZE = 2 * 1024**3
+
+SCHEDULERS = ("threads", "processes")
+DEFAULT_SCHEDULER = "threads"
+DEFAULT_MEMORY_BUDGET = 1024**3
+
+DUPLICATE_POLICIES = ("first", "last", "first_valid")
+DEFAULT_DUPLICATES = "first"
+
+LAYOUTS = ("whitespace", "delimited", "fixed_width")
@@ -0,0 +1,73 @@
+"""Build datasets from parsed numpy columns.
+
+Readers parsing their files into numpy arrays should build their dataset
+with :func:`dataset_from_columns` instead of going through a
+``pd.DataFrame``: ``set_index`` and ``to_xarray`` each copy every column,
+while here the arrays become the data of the dataset as they are.
+
+"""
+
+from typing import Any, Dict, Mapping, Optional
+
+import numpy as np
+import xarray as xr
+
+TIME_DTYPE = np.dtype("datetime64[ns]")
+
+
+def dataset_from_columns(
+    time: np.ndarray,
+    variables: Mapping[str, np.ndarray],
+    time_name: str,
+    attrs: Optional[Dict[str, Any]] = None,
+) -> xr.Dataset:
+    """Build a dataset of time series sharing the memory of the columns.
+
+    Parameters
+    ----------
+    time : np.ndarray
+        Times of the rows. ``datetime64[ns]`` arrays are used as is, other
+        datetime64 units are converted, which copies them.
+    variables : Mapping[str, np.ndarray]
+        One-dimensional column of each variable, as long as ``time``.
+        Duck arrays such as dask arrays are kept as they are.
+    time_name : str
+        Name of the time dimension and coordinate
+    attrs : Optional[Dict[str, Any]]
+        Global attributes of the dataset
+
+    Returns
+    -------
+    xr.Dataset
+        Dataset whose variables are views of the given columns
+
+    Raises
+    ------
+    ValueError
+        If a column is not one-dimensional or not as long as ``time``
+
+    """
+    time = np.asarray(time)
+    if time.dtype != TIME_DTYPE:
+        if time.dtype.kind != "M":
+            raise ValueError(f"Time must be datetime64, not {time.dtype}")
+        time = time.astype(TIME_DTYPE)
+    if time.ndim != 1:
+        raise ValueError("Time must be one-dimensional")
+
+    dims = (time_name,)
+    data_vars = {}
+    for name, values in variables.items():
+        if not hasattr(values, "__array_function__"):
+            values = np.asarray(values)
+        if values.shape != time.shape:
+            raise ValueError(
+                f"Column {name} has shape {values.shape}, expected {time.shape}"
+            )
+        # Checked above, so xarray does not need to inspect the arrays again
+        data_vars[name] = xr.Variable(dims, values, fastpath=True)
+    return xr.Dataset(
+        data_vars,
+        coords={time_name: xr.IndexVariable(dims, time, fastpath=True)},
+        attrs=attrs,
+    )
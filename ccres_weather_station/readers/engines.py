@@ -0,0 +1,614 @@
+"""Parse engines turning station text files into numpy column buffers.
+
+Every engine takes a :class:`ParsePlan` describing where the time and the
+variables are, and returns a :class:`ParsedColumns` holding one
+``datetime64[ns]`` time array and one array per variable.
+
+- ``pandas``: ``pd.read_csv`` based, the most permissive one.
+- ``pyarrow``: ``pyarrow.csv`` based, needs the optional ``pyarrow`` package.
+- ``numpy``: works directly on the file bytes, the timestamps are decoded
+  from a ``(n, 20)`` byte matrix without creating any Python string per row.
+
+Not every engine can parse every layout, ``supported_engines`` lists the
+ones able to parse a plan from the fastest to the slowest and
+``select_engine`` picks one, the fastest for ``auto``.
+
+"""
+
+import datetime as dt
+import importlib.util
+import os
+import re
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ccres_weather_station.readers.constants import (
+    AUTO_ENGINE,
+    DEFAULT_ENGINE,
+    ENGINES,
+)
+from ccres_weather_station.readers.sources import is_plain, open_input, read_input
+from ccres_weather_station.types import PathLike
+
+ISO8601_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+ISO8601_WIDTH = 20
+
+_ISO8601_SEPARATORS = {4: "-", 7: "-", 10: "T", 13: ":", 16: ":", 19: "Z"}
+
+
+@dataclass(frozen=True)
+class ParsePlan:
+    """Layout of a whitespace separated, delimited or fixed-width file.
+
+    Positions are the 0-based column indexes in the file. Columns are
+    separated by whitespaces, or by ``delimiter`` when set. When ``spans``
+    is set, the file is fixed-width: it holds the ``[start, stop)``
+    character span of each column of ``names``, and positions are ignored.
+
+    The values of ``missing_values`` are read as NaN, and the first
+    ``skip_rows`` lines of a file are a header that is not parsed.
+
+    """
+
+    time_name: str
+    time_position: int
+    variables: Tuple[Tuple[str, int], ...]
+    dtype: str = "float32"
+    comment: str = "#"
+    delimiter: Optional[str] = None
+    spans: Tuple[Tuple[int, int], ...] = ()
+    time_format: str = ISO8601_FORMAT
+    missing_values: Tuple[str, ...] = ()
+    skip_rows: int = 0
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        return (self.time_name,) + tuple(name for name, _ in self.variables)
+
+    @property
+    def positions(self) -> Tuple[int, ...]:
+        return (self.time_position,) + tuple(pos for _, pos in self.variables)
+
+    @property
+    def missing_numbers(self) -> Tuple[float, ...]:
+        """Missing values that are numbers."""
+        numbers = []
+        for value in self.missing_values:
+            try:
+                numbers.append(float(value))
+            except ValueError:
+                continue
+        return tuple(numbers)
+
+
+@dataclass
+class ParsedColumns:
+    """Columns parsed from one file."""
+
+    time: np.ndarray
+    variables: Dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return int(self.time.size)
+
+    def between(
+        self,
+        start_date: Optional[dt.datetime] = None,
+        end_date: Optional[dt.datetime] = None,
+    ) -> "ParsedColumns":
+        """Keep the rows from start_date to end_date, both included.
+
+        The columns are returned as is when all the rows are kept.
+
+        """
+        keep = np.ones(self.time.size, dtype=bool)
+        if start_date is not None:
+            keep &= self.time >= np.datetime64(start_date, "ns")
+        if end_date is not None:
+            keep &= self.time <= np.datetime64(end_date, "ns")
+        if keep.all():
+            return self
+        return ParsedColumns(
+            time=self.time[keep],
+            variables={name: values[keep] for name, values in self.variables.items()},
+        )
+
+
+def concat_columns(parts: List[ParsedColumns], plan: ParsePlan) -> ParsedColumns:
+    """Concatenate the columns of many files, empty columns if there is none."""
+    if not parts:
+        return ParsedColumns(
+            time=np.array([], dtype="datetime64[ns]"),
+            variables={
+                var: np.array([], dtype=plan.dtype) for var, _ in plan.variables
+            },
+        )
+    if len(parts) == 1:
+        return parts[0]
+    return ParsedColumns(
+        time=np.concatenate([part.time for part in parts]),
+        variables={
+            name: np.concatenate([part.variables[name] for part in parts])
+            for name in parts[0].variables
+        },
+    )
+
+
+def check_engine(engine: str) -> str:
+    if engine not in ENGINES and engine != AUTO_ENGINE:
+        raise ValueError(f"Unknown engine {engine}. Available engines are {ENGINES}")
+    return engine
+
+
+def supported_engines(plan: ParsePlan) -> Tuple[str, ...]:
+    """List the installed engines able to parse a plan, the fastest first."""
+    engines = []
+    numbers_only = len(plan.missing_numbers) == len(plan.missing_values)
+    # numpy splits the lines on whitespaces, an empty delimited field would
+    # shift the next ones instead of being read as NaN
+    if (
+        not plan.spans
+        and plan.delimiter is None
+        and numbers_only
+        and plan.time_position == 0
+        and plan.time_format == ISO8601_FORMAT
+    ):
+        engines.append("numpy")
+    if (
+        not plan.spans
+        and numbers_only
+        and importlib.util.find_spec("pyarrow") is not None
+    ):
+        # pyarrow parses delimited files as is, whitespace aligned ones are
+        # normalized first which makes it slower than numpy
+        if plan.delimiter is None:
+            engines.append("pyarrow")
+        else:
+            engines.insert(0, "pyarrow")
+    engines.append("pandas")
+    return tuple(engines)
+
+
+def select_engine(plan: ParsePlan, engine: str = AUTO_ENGINE) -> str:
+    """Check that an engine can parse a plan, or pick the fastest for ``auto``.
+
+    Raises
+    ------
+    ValueError
+        If the engine is unknown or cannot parse the layout of the plan
+
+    """
+    supported = supported_engines(plan)
+    if check_engine(engine) == AUTO_ENGINE:
+        return supported[0]
+    if engine not in supported:
+        raise ValueError(
+            f"The {engine} engine cannot parse this layout, " f"use one of {supported}"
+        )
+    return engine
+
+
+def skip_header(data: bytes, plan: ParsePlan) -> bytes:
+    """Drop the ``skip_rows`` header lines from the content of a file."""
+    start = 0
+    for _ in range(plan.skip_rows):
+        start = data.find(b"\n", start) + 1
+        if start == 0:
+            return b""
+    return data[start:]
+
+
+def _mask_missing(parsed: ParsedColumns, plan: ParsePlan) -> ParsedColumns:
+    """Replace the missing values that are numbers with NaN."""
+    numbers = plan.missing_numbers
+    if not numbers:
+        return parsed
+    for name, values in list(parsed.variables.items()):
+        missing = np.isin(values, np.array(numbers, dtype=values.dtype))
+        if missing.any():
+            # pyarrow buffers are read-only
+            values = values if values.flags.writeable else values.copy()
+            values[missing] = np.nan
+            parsed.variables[name] = values
+    return parsed
+
+
+def _digits(stamps: np.ndarray, start: int, stop: int) -> np.ndarray:
+    number = np.zeros(stamps.shape[0], dtype=np.int64)
+    for col in range(start, stop):
+        number = number * 10 + stamps[:, col]
+    return number
+
+
+def decode_iso8601(stamps: np.ndarray) -> np.ndarray:
+    """Decode fixed-format ``%Y-%m-%dT%H:%M:%SZ`` timestamps.
+
+    Parameters
+    ----------
+    stamps : np.ndarray
+        Either a ``(n, 20)`` uint8 matrix or a ``S20`` bytes array
+
+    Returns
+    -------
+    np.ndarray
+        ``datetime64[ns]`` array of size n
+
+    Raises
+    ------
+    ValueError
+        If one of the timestamps does not follow the format
+
+    """
+    stamps = np.asarray(stamps)
+    if stamps.dtype.kind == "S":
+        if stamps.dtype.itemsize != ISO8601_WIDTH:
+            raise ValueError(f"Timestamps must be {ISO8601_WIDTH} bytes long")
+        stamps = np.ascontiguousarray(stamps).view(np.uint8)
+    stamps = stamps.reshape(-1, ISO8601_WIDTH)
+
+    for col, sep in _ISO8601_SEPARATORS.items():
+        if np.any(stamps[:, col] != ord(sep)):
+            raise ValueError(f"Timestamps do not match {ISO8601_FORMAT}")
+    digit_cols = [c for c in range(ISO8601_WIDTH) if c not in _ISO8601_SEPARATORS]
+    digits = stamps[:, digit_cols].astype(np.int64) - ord("0")
+    if np.any((digits < 0) | (digits > 9)):
+        raise ValueError(f"Timestamps do not match {ISO8601_FORMAT}")
+
+    # Columns of digits: YYYY MM DD HH MM SS
+    year = _digits(digits, 0, 4)
+    month = _digits(digits, 4, 6)
+    day = _digits(digits, 6, 8)
+    hour = _digits(digits, 8, 10)
+    minute = _digits(digits, 10, 12)
+    second = _digits(digits, 12, 14)
+    if (
+        np.any((month < 1) | (month > 12))
+        or np.any(day < 1)
+        or np.any(hour > 23)
+        or np.any(minute > 59)
+        or np.any(second > 60)
+    ):
+        raise ValueError(f"Timestamps out of range for {ISO8601_FORMAT}")
+
+    months = ((year - 1970) * 12 + month - 1).astype("datetime64[M]")
+    days = months.astype("datetime64[D]") + (day - 1).astype("timedelta64[D]")
+    if np.any(days.astype("datetime64[M]") != months):
+        raise ValueError("Timestamps contain a day not existing in the month")
+    seconds = (hour * 3600 + minute * 60 + second).astype("timedelta64[s]")
+    return (days + seconds).astype("datetime64[ns]")
+
+
+def count_rows(
+    path: PathLike, comment: str = "#", skip_rows: int = 0, block_size: int = 2**20
+) -> int:
+    """Count the maximum number of rows of a file without parsing it.
+
+    Every line after the ``skip_rows`` header lines is counted except the
+    empty ones and the ones starting with the comment char, so it is an
+    upper bound of the parsed rows. The file is scanned block by block.
+
+    """
+    rows = 0
+    rest = b""
+    with open_input(path) as f:
+        for _ in range(skip_rows):
+            if not f.readline():
+                return 0
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            block = rest + block
+            end = block.rfind(b"\n") + 1
+            rows += count_data_lines(block[:end], comment)
+            rest = block[end:]
+    return rows + count_data_lines(rest, comment)
+
+
+def count_data_lines(data: bytes, comment: str = "#") -> int:
+    """Count the lines of ``data`` neither empty nor starting with a comment."""
+    if not data:
+        return 0
+    prefix = comment.encode()
+    lines = data.count(b"\n") + (not data.endswith(b"\n"))
+    comments = data.count(b"\n" + prefix) + data.startswith(prefix)
+    empty = data.count(b"\n\n") + data.startswith(b"\n")
+    return lines - comments - empty
+
+
+def read_edge_lines(
+    path: PathLike, comment: str = "#", skip_rows: int = 0, block_size: int = 65536
+) -> Optional[Tuple[bytes, bytes]]:
+    """Read the first and last data lines of a file without reading it all.
+
+    The beginning of the file is read line by line after the ``skip_rows``
+    header lines and its end block by block from the last byte, so only a
+    few kilobytes are read whatever the size of the file. Compressed inputs
+    and members of archives are read entirely.
+
+    Returns
+    -------
+    Optional[Tuple[bytes, bytes]]
+        First and last data lines without comment, None if the file has no
+        data line
+
+    """
+    prefix = comment.encode()
+
+    def _data(line: bytes) -> bytes:
+        return line.split(prefix, 1)[0].strip()
+
+    if not is_plain(path):
+        lines = read_input(path).split(b"\n")[skip_rows:]
+        lines = [data for data in map(_data, lines) if data]
+        return (lines[0], lines[-1]) if lines else None
+
+    with open(path, "rb") as f:
+        for _ in range(skip_rows):
+            f.readline()
+        header_end = f.tell()
+        first = next((_data(line) for line in f if _data(line)), None)
+        if first is None:
+            return None
+
+        position = f.seek(0, os.SEEK_END)
+        partial = b""
+        while position > header_end:
+            size = min(block_size, position - header_end)
+            position -= size
+            f.seek(position)
+            lines = (f.read(size) + partial).split(b"\n")
+            # The first piece may be the end of a line starting before
+            partial = lines.pop(0) if position > header_end else b""
+            for line in reversed(lines):
+                if _data(line):
+                    return first, _data(line)
+        return first, first
+
+
+def line_time(line: bytes, plan: ParsePlan) -> np.datetime64:
+    """Decode the time of one data line, not of fixed-width files."""
+    tokens = line.split(None if plan.delimiter is None else plan.delimiter.encode())
+    if len(tokens) <= plan.time_position:
+        raise ValueError(f"No time column in {line!r}")
+    token = tokens[plan.time_position].strip()
+    if plan.time_format != ISO8601_FORMAT:
+        parsed = dt.datetime.strptime(token.decode(), plan.time_format)
+        return np.datetime64(parsed, "ns")
+    stamp = np.frombuffer(token, dtype=np.uint8)
+    if stamp.size != ISO8601_WIDTH:
+        raise ValueError(f"Timestamp of {line!r} does not match {ISO8601_FORMAT}")
+    return decode_iso8601(stamp)[0]
+
+
+def _parse_pandas(data: bytes, plan: ParsePlan, name: str) -> ParsedColumns:
+    columns_type: Dict[str, Any] = {plan.time_name: str}
+    for var, _ in plan.variables:
+        columns_type[var] = plan.dtype
+
+    options: Dict[str, Any] = dict(
+        dtype=columns_type,
+        comment=plan.comment,
+        na_values=list(plan.missing_values) or None,
+        encoding="utf-8",
+    )
+    try:
+        if plan.spans:
+            df = pd.read_fwf(
+                BytesIO(data), colspecs=list(plan.spans), names=plan.names, **options
+            )
+        else:
+            # usecols are sorted by pandas, names must follow the same order
+            ordered = sorted(zip(plan.positions, plan.names))
+            separator: Dict[str, Any] = (
+                {"delim_whitespace": True}
+                if plan.delimiter is None
+                else {"sep": plan.delimiter}
+            )
+            df = pd.read_csv(
+                BytesIO(data),
+                names=[var for _, var in ordered],
+                usecols=[pos for pos, _ in ordered],
+                **separator,
+                **options,
+            )
+        time = pd.to_datetime(df[plan.time_name].str.strip(), format=plan.time_format)
+    except ValueError as err:
+        raise ValueError(f"Cannot parse {name}: {err}") from err
+    return ParsedColumns(
+        time=time.to_numpy(dtype="datetime64[ns]"),
+        variables={var: df[var].to_numpy() for var, _ in plan.variables},
+    )
+
+
+def _normalize_whitespaces(data: bytes, comment: str) -> bytes:
+    """Turn a whitespace aligned file into a single space separated one."""
+    data = re.sub(re.escape(comment.encode()) + rb"[^\n]*", b"", data)
+    data = re.sub(rb"[ \t\r\v\f]+", b" ", data)
+    data = re.sub(rb"(?m)^ | $", b"", data)
+    return data
+
+
+def _parse_pyarrow(data: bytes, plan: ParsePlan, name: str) -> ParsedColumns:
+    try:
+        import pyarrow as pa
+        from pyarrow import csv
+    except ImportError as err:
+        raise ImportError(
+            "The pyarrow engine needs pyarrow. Install it with `pip install pyarrow`"
+        ) from err
+
+    if plan.delimiter is None:
+        data = _normalize_whitespaces(data, plan.comment)
+        delimiter = " "
+    else:
+        data = re.sub(re.escape(plan.comment.encode()) + rb"[^\n]*", b"", data)
+        delimiter = plan.delimiter
+    columns = {f"f{pos}": var for pos, var in zip(plan.positions, plan.names)}
+    column_types = {f"f{plan.time_position}": pa.timestamp("ns")}
+    for _, pos in plan.variables:
+        column_types[f"f{pos}"] = pa.from_numpy_dtype(np.dtype(plan.dtype))
+
+    table = csv.read_csv(
+        BytesIO(data),
+        read_options=csv.ReadOptions(autogenerate_column_names=True),
+        parse_options=csv.ParseOptions(delimiter=delimiter),
+        convert_options=csv.ConvertOptions(
+            column_types=column_types,
+            include_columns=list(columns),
+            timestamp_parsers=[plan.time_format],
+        ),
+    )
+    arrays = {columns[col]: table.column(col).to_numpy() for col in table.column_names}
+    return ParsedColumns(
+        time=arrays[plan.time_name].astype("datetime64[ns]", copy=False),
+        variables={
+            var: arrays[var].astype(plan.dtype, copy=False) for var, _ in plan.variables
+        },
+    )
+
+
+def _line_bounds(buf: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    newlines = np.flatnonzero(buf == ord("\n"))
+    starts = np.concatenate(([0], newlines + 1))
+    ends = np.concatenate((newlines, [buf.size]))
+    if starts[-1] == buf.size:
+        starts, ends = starts[:-1], ends[:-1]
+    return starts, ends
+
+
+def _blank_comments(
+    text: np.ndarray, starts: np.ndarray, ends: np.ndarray, comment: str
+) -> None:
+    """Replace in place everything after the comment char by spaces."""
+    hashes = np.flatnonzero(text == ord(comment))
+    if hashes.size == 0:
+        return
+    lines = np.searchsorted(starts, hashes, side="right") - 1
+    lines, first = np.unique(lines, return_index=True)
+    delta = np.zeros(text.size + 1, dtype=np.int8)
+    np.add.at(delta, hashes[first], 1)
+    np.add.at(delta, ends[lines], -1)
+    # Comments never overlap so the running sum is either 0 or 1
+    text[np.cumsum(delta[:-1], dtype=np.int8) > 0] = ord(" ")
+
+
+def _parse_numpy(data: bytes, plan: ParsePlan, name: str) -> ParsedColumns:
+    if plan.time_position != 0:
+        raise ValueError("The numpy engine needs the time as the first column")
+
+    text = np.frombuffer(data, dtype=np.uint8).copy()
+    starts, ends = _line_bounds(text)
+    _blank_comments(text, starts, ends, plan.comment)
+
+    # Count the tokens of each line with cumulative sums.
+    # All ASCII whitespaces are below the space char.
+    filled = text > ord(" ")
+    token_start = filled.copy()
+    token_start[1:] &= ~filled[:-1]
+    cum_tokens = np.concatenate(([0], np.cumsum(token_start, dtype=np.int32)))
+    n_tokens = cum_tokens[ends] - cum_tokens[starts]
+
+    data_lines = n_tokens > 0
+    starts, n_tokens = starts[data_lines], n_tokens[data_lines]
+    if starts.size == 0:
+        return ParsedColumns(
+            time=np.array([], dtype="datetime64[ns]"),
+            variables={var: np.array([], dtype=plan.dtype) for var in plan.names[1:]},
+        )
+    n_columns = int(n_tokens[0])
+    if np.any(n_tokens != n_columns):
+        raise ValueError(f"{name} has an inconsistent number of columns")
+    if n_columns <= max(plan.positions):
+        raise ValueError(f"{name} has only {n_columns} columns")
+
+    # Time token must span exactly the first bytes of the line
+    ends = ends[data_lines]
+    if np.any(ends - starts < ISO8601_WIDTH) or np.any(
+        (ends - starts > ISO8601_WIDTH)
+        & filled[np.minimum(starts + ISO8601_WIDTH, text.size - 1)]
+    ):
+        raise ValueError(f"Timestamps of {name} do not match {ISO8601_FORMAT}")
+    stamp_index = starts[:, np.newaxis] + np.arange(ISO8601_WIDTH)
+    time = decode_iso8601(text[stamp_index])
+    if not plan.variables:
+        return ParsedColumns(time=time, variables={})
+
+    # Parse all remaining numbers at once
+    text[stamp_index] = ord(" ")
+    values = np.fromstring(text.tobytes(), dtype=plan.dtype, sep=" ")
+    if values.size != starts.size * (n_columns - 1):
+        raise ValueError(f"{name} contains values that are not numbers")
+    values = values.reshape(starts.size, n_columns - 1)
+
+    return ParsedColumns(
+        time=time,
+        variables={
+            var: np.ascontiguousarray(values[:, pos - 1]) for var, pos in plan.variables
+        },
+    )
+
+
+_PARSERS = {
+    "pandas": _parse_pandas,
+    "pyarrow": _parse_pyarrow,
+    "numpy": _parse_numpy,
+}
+
+
+def parse(
+    path: PathLike, plan: ParsePlan, engine: str = DEFAULT_ENGINE
+) -> ParsedColumns:
+    """Parse a file into numpy columns with the chosen engine.
+
+    Parameters
+    ----------
+    path : PathLike
+        Path of the file, possibly compressed or a member of an archive, see
+        ``ccres_weather_station.readers.sources``
+    plan : ParsePlan
+        Layout of the file
+    engine : str
+        One of ``ENGINES`` able to parse the plan, or ``auto``
+
+    Returns
+    -------
+    ParsedColumns
+        Time and variables columns
+
+    """
+    data = skip_header(read_input(path), plan)
+    return parse_bytes(data, plan, engine, str(path))
+
+
+def parse_bytes(
+    data: bytes, plan: ParsePlan, engine: str = DEFAULT_ENGINE, name: str = "<bytes>"
+) -> ParsedColumns:
+    """Parse the content of a file, or complete lines of it, into columns.
+
+    Parameters
+    ----------
+    data : bytes
+        Lines to parse, e.g. the lines appended to a file since it was last
+        read, without the header. Comment lines are allowed anywhere.
+    plan : ParsePlan
+        Layout of the lines
+    engine : str
+        One of ``ENGINES`` able to parse the plan, or ``auto``
+    name : str
+        Name of the data in the error messages
+
+    Returns
+    -------
+    ParsedColumns
+        Time and variables columns
+
+    """
+    engine = select_engine(plan, engine)
+    if count_data_lines(data, plan.comment) == 0:
+        return concat_columns([], plan)
+    return _mask_missing(_PARSERS[engine](data, plan, name), plan)
@@ -0,0 +1,179 @@
+r"""Reader of text files whose layout is declared in the configuration.
+
+The ``[reader]`` section of a station TOML file describes its files, so that
+a new station needs no Python code::
+
+    [reader]
+    layout = "delimited"            # or "whitespace", "fixed_width"
+    delimiter = ";"
+    time_column = 0                 # [start, stop] span for fixed_width
+    time_format = "%d/%m/%Y %H:%M"  # ISO 8601 "%Y-%m-%dT%H:%M:%SZ" by default
+    comment = "#"
+    skip_rows = 1                   # header lines
+    dtype = "float32"
+    missing_values = ["-999", "NA"]
+    file_pattern = "_(\\d{8})\\.csv$"  # first group is the start of the file
+    file_date_format = "%Y%m%d"
+    file_period = "1D"
+
+    [reader.columns]                # configuration variable = column
+    air_temperature = 2
+    wind_speed = 3
+
+The layout is compiled once per configuration into a :class:`ParsePlan`,
+parsed by the fastest engine able to parse it with the ``auto`` engine:
+``pyarrow`` when installed for delimited files, ``numpy`` for whitespace
+aligned files with the time first in ISO 8601, and ``pandas`` otherwise,
+e.g. for fixed-width files, missing values that are not numbers or delimited
+files without pyarrow.
+
+"""
+
+import datetime as dt
+import re
+from pathlib import Path
+from typing import Any, Dict, Optional, Pattern, Tuple
+
+import pandas as pd
+
+from ccres_weather_station.config.config import CompiledConfig, Config
+from ccres_weather_station.readers.cache import ParsedCache
+from ccres_weather_station.readers.columnar import ColumnarReader
+from ccres_weather_station.readers.constants import AUTO_ENGINE, LAYOUTS
+from ccres_weather_station.readers.engines import ISO8601_FORMAT, ParsePlan
+from ccres_weather_station.types import PathLike
+
+FileNaming = Tuple[Pattern, str, dt.timedelta]
+
+
+def _position(layout: str, name: str, column: Any) -> Any:
+    """Check the column of a variable, a span for fixed-width files."""
+    if layout == "fixed_width":
+        if (
+            not isinstance(column, (list, tuple))
+            or len(column) != 2
+            or not all(isinstance(bound, int) for bound in column)
+            or not 0 <= column[0] < column[1]
+        ):
+            raise ValueError(
+                f"The column of {name} must be a [start, stop] span "
+                f"in a fixed_width layout, not {column!r}"
+            )
+        return tuple(column)
+    if not isinstance(column, int) or isinstance(column, bool) or column < 0:
+        raise ValueError(f"The column of {name} must be a positive index")
+    return column
+
+
+def _layout(compiled: CompiledConfig) -> Dict[str, Any]:
+    layout = compiled.reader_layout
+    if layout is None:
+        raise ValueError(
+            "The configuration has no [reader] section describing the input files"
+        )
+    return layout
+
+
+def compile_plan(compiled: CompiledConfig) -> ParsePlan:
+    """Compile the ``[reader]`` section of a configuration into a parse plan.
+
+    Raises
+    ------
+    ValueError
+        If there is no ``[reader]`` section or it is not a valid layout
+
+    """
+    layout = _layout(compiled)
+    kind = layout.get("layout", LAYOUTS[0])
+    if kind not in LAYOUTS:
+        raise ValueError(f"Unknown layout {kind}. Available layouts are {LAYOUTS}")
+    delimiter = layout.get("delimiter")
+    if (kind == "delimited") != (delimiter is not None):
+        raise ValueError("A delimiter must be set for, and only for, delimited files")
+
+    columns = layout["columns"]
+    if not columns:
+        raise ValueError("The [reader.columns] section has no variable")
+    unknown = set(columns) - set(compiled.variable_names)
+    if unknown:
+        raise ValueError(f"Columns of unknown variables {sorted(unknown)}")
+    time = _position(kind, "time", layout.get("time_column", 0))
+    variables = [
+        (compiled.variable_names[var], _position(kind, var, column))
+        for var, column in columns.items()
+    ]
+
+    spans: Tuple[Tuple[int, int], ...] = ()
+    if kind == "fixed_width":
+        spans = (time,) + tuple(span for _, span in variables)
+        # Positions only index the spans
+        time = 0
+        variables = [(name, i) for i, (name, _) in enumerate(variables, start=1)]
+
+    return ParsePlan(
+        time_name=compiled.time_name,
+        time_position=time,
+        variables=tuple(variables),
+        dtype=layout.get("dtype", "float32"),
+        comment=layout.get("comment", "#"),
+        delimiter=delimiter,
+        spans=spans,
+        time_format=layout.get("time_format", ISO8601_FORMAT),
+        missing_values=layout.get("missing_values", ()),
+        skip_rows=layout.get("skip_rows", 0),
+    )
+
+
+def file_naming(compiled: CompiledConfig) -> Optional[FileNaming]:
+    """Get how the start of a file is written in its name, None if it is not.
+
+    Raises
+    ------
+    ValueError
+        If ``file_pattern`` is set without one group, ``file_date_format``
+        or ``file_period``
+
+    """
+    layout = _layout(compiled)
+    if layout.get("file_pattern") is None:
+        return None
+    pattern = re.compile(layout["file_pattern"])
+    if pattern.groups < 1:
+        raise ValueError("file_pattern must have a group matching the date")
+    if "file_date_format" not in layout or "file_period" not in layout:
+        raise ValueError("file_pattern needs file_date_format and file_period")
+    period = pd.to_timedelta(layout["file_period"]).to_pytimedelta()
+    return pattern, layout["file_date_format"], period
+
+
+class GenericReader(ColumnarReader):
+    """Reader of the files described by the ``[reader]`` configuration section.
+
+    By default the files are parsed by the fastest engine able to parse
+    their layout.
+
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        engine: str = AUTO_ENGINE,
+        cache: Optional[ParsedCache] = None,
+    ):
+        super().__init__(config, engine, cache)
+        self.naming = file_naming(config.compile())
+
+    def get_plan(self) -> ParsePlan:
+        return compile_plan(self.config.compile())
+
+    def file_coverage(
+        self, file: PathLike
+    ) -> Optional[Tuple[dt.datetime, dt.datetime]]:
+        if self.naming is None:
+            return None
+        pattern, date_format, period = self.naming
+        match = pattern.search(Path(file).name)
+        if match is None:
+            return None
+        start = dt.datetime.strptime(match[1], date_format)
+        return start, start + period
@@ -0,0 +1,241 @@
+"""Lazy reading of columnar files with dask.
+
+Each input file becomes one dask chunk along time. Only the time column of
+the files is parsed upfront, as it is needed to index the dataset and to
+apply the date bounds; the variables of a file are parsed when its chunk is
+computed, e.g. while writing the output, and dropped once written. With the
+cache of parsed files enabled, the time of a cached file is read from its
+cache entry.
+
+The memory is bounded by the number of files parsed at once, derived from a
+memory budget and from the size of the largest file.
+
+The chunks are always computed by dask's threaded scheduler: NetCDF files
+are written through handles and locks that cannot leave the main process,
+so dask's process scheduler cannot write them. With the ``processes``
+scheduler, each thread hands the parsing of its file to a pool of processes
+and writes the result itself.
+
+"""
+
+import datetime as dt
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import xarray as xr
+
+from ccres_weather_station.readers.constants import (
+    DEFAULT_MEMORY_BUDGET,
+    DEFAULT_SCHEDULER,
+    SCHEDULERS,
+)
+from ccres_weather_station.readers.dataset import dataset_from_columns
+from ccres_weather_station.readers.engines import ParsedColumns
+from ccres_weather_station.readers.sources import expand_archives, input_size
+from ccres_weather_station.types import PathLike, PathsLike
+
+if TYPE_CHECKING:
+    from ccres_weather_station.readers.columnar import ColumnarReader
+
+lgr = logging.getLogger(__name__)
+
+# Peak memory of parsing a file, relative to its size on disk. The numpy
+# engine holds a copy of the bytes plus a few masks and the columns.
+PARSE_MEMORY_FACTOR = 10
+
+# Pool parsing the chunks, set by lazy_scheduler with the processes scheduler
+_PARSE_POOL: Optional[ProcessPoolExecutor] = None
+
+
+def _import_dask() -> Any:
+    try:
+        import dask
+        import dask.array  # noqa: F401
+    except ImportError as err:
+        raise ImportError(
+            "The lazy mode needs dask. Install it with `pip install dask[array]`"
+        ) from err
+    return dask
+
+
+def _parse_file(
+    reader: "ColumnarReader",
+    path: PathLike,
+    start_date: Optional[dt.datetime],
+    end_date: Optional[dt.datetime],
+) -> ParsedColumns:
+    return reader.parse_file(path).between(start_date, end_date)
+
+
+def _parse_time(
+    reader: "ColumnarReader",
+    start_date: Optional[dt.datetime],
+    end_date: Optional[dt.datetime],
+    path: PathLike,
+) -> np.ndarray:
+    return reader.parse_time(path).between(start_date, end_date).time
+
+
+def _parse_chunk(
+    reader: "ColumnarReader",
+    path: PathLike,
+    start_date: Optional[dt.datetime],
+    end_date: Optional[dt.datetime],
+) -> ParsedColumns:
+    pool = _PARSE_POOL
+    if pool is None:
+        return _parse_file(reader, path, start_date, end_date)
+    return pool.submit(_parse_file, reader, path, start_date, end_date).result()
+
+
+def _column(parsed: ParsedColumns, name: str, size: int) -> np.ndarray:
+    values = parsed.variables[name]
+    if values.size != size:
+        raise ValueError("The input files changed while being read lazily")
+    return values
+
+
+def read_lazy(
+    reader: "ColumnarReader",
+    files: PathsLike,
+    workers: Optional[int] = None,
+    start_date: Optional[dt.datetime] = None,
+    end_date: Optional[dt.datetime] = None,
+) -> xr.Dataset:
+    """Read files into a dataset of dask arrays, one chunk per file.
+
+    Parameters
+    ----------
+    reader : ColumnarReader
+        Reader parsing the files
+    files : PathsLike
+        Files to read, the output keeps their order
+    workers : Optional[int]
+        Number of processes reading the times of the files
+    start_date : Optional[dt.datetime]
+        Date from which to keep the rows, included
+    end_date : Optional[dt.datetime]
+        Date from which to drop the rows, included
+
+    Returns
+    -------
+    xr.Dataset
+        Dataset whose time coordinate is in memory and whose variables are
+        dask arrays
+
+    Raises
+    ------
+    ImportError
+        If dask is not installed
+
+    """
+    from ccres_weather_station.readers.columnar import get_workers
+
+    dask = _import_dask()
+    import dask.array as da
+
+    files = expand_archives(files)
+    if start_date is not None or end_date is not None:
+        files = reader.select_files(files, start_date, end_date)
+
+    parse_time = partial(_parse_time, reader, start_date, end_date)
+    n_workers = min(get_workers(workers), len(files))
+    if n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            times = list(pool.map(parse_time, files))
+    else:
+        times = [parse_time(file) for file in files]
+    time = np.concatenate(times) if times else np.array([], dtype="datetime64[ns]")
+
+    dtype = np.dtype(reader.plan.dtype)
+    chunks: Dict[str, List[Any]] = {name: [] for name, _ in reader.plan.variables}
+    for file, file_time in zip(files, times):
+        if file_time.size == 0:
+            continue
+        parsed = dask.delayed(_parse_chunk, pure=True)(
+            reader, str(file), start_date, end_date
+        )
+        for name in chunks:
+            column = dask.delayed(_column, pure=True)(parsed, name, file_time.size)
+            chunks[name].append(
+                da.from_delayed(column, shape=(file_time.size,), dtype=dtype)
+            )
+
+    variables = {
+        name: (da.concatenate(arrays) if arrays else da.empty((0,), dtype=dtype))
+        for name, arrays in chunks.items()
+    }
+    lgr.debug(f"{len(times)} files read lazily, {time.size} rows")
+    return dataset_from_columns(time, variables, reader.time_name)
+
+
+def lazy_workers(
+    files: PathsLike,
+    memory_budget: int = DEFAULT_MEMORY_BUDGET,
+    max_workers: Optional[int] = None,
+) -> int:
+    """Get the number of files that can be parsed at once within a budget.
+
+    Parameters
+    ----------
+    files : PathsLike
+        Input files, the largest one sets the memory of a parse
+    memory_budget : int
+        Memory in bytes allowed for the files being parsed
+    max_workers : Optional[int]
+        Maximum number of workers, the number of CPUs by default
+
+    Returns
+    -------
+    int
+        Number of workers, at least 1 even if one file exceeds the budget
+
+    """
+    largest = max((input_size(file) for file in files), default=0)
+    per_file = max(1, largest * PARSE_MEMORY_FACTOR)
+    if per_file > memory_budget:
+        lgr.warning(
+            f"Parsing one file needs about {per_file / 2**20:.0f} MiB, "
+            f"above the memory budget of {memory_budget / 2**20:.0f} MiB"
+        )
+    limit = max_workers or os.cpu_count() or 1
+    return max(1, min(limit, memory_budget // per_file))
+
+
+@contextmanager
+def lazy_scheduler(
+    num_workers: int, scheduler: str = DEFAULT_SCHEDULER
+) -> Iterator[None]:
+    """Compute the lazy datasets with ``num_workers`` files parsed at once.
+
+    Parameters
+    ----------
+    num_workers : int
+        Number of files parsed at once
+    scheduler : str
+        One of ``SCHEDULERS``, where the files are parsed: in the threads of
+        dask, or in a pool of processes
+
+    """
+    global _PARSE_POOL
+    if scheduler not in SCHEDULERS:
+        raise ValueError(
+            f"Unknown scheduler {scheduler}. Available schedulers are {SCHEDULERS}"
+        )
+    dask = _import_dask()
+    lgr.debug(f"Parse chunks with {num_workers} {scheduler}")
+    with dask.config.set(scheduler="threads", num_workers=num_workers):
+        if scheduler == "threads":
+            yield
+            return
+        with ProcessPoolExecutor(max_workers=num_workers) as pool:
+            _PARSE_POOL = pool
+            try:
+                yield
+            finally:
+                _PARSE_POOL = None
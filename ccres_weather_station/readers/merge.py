@@ -0,0 +1,198 @@
+"""Merge the rows of many files into one sorted time series.
+
+The rows of each file are a sorted run. The runs are merged by time with
+numpy's stable sort, a timsort that merges the existing runs, so the merge
+takes linear time when the files are given in order and ``O(n log k)`` for
+``k`` files in any order. Already sorted rows are not copied.
+
+Rows with the same time are resolved with a duplicate policy:
+
+- ``first``: keep the row of the first file given, the default.
+- ``last``: keep the row of the last file given, e.g. a re-delivered file.
+- ``first_valid``: keep, variable by variable, the first value that is not
+  NaN, so that two partial deliveries complete each other.
+
+The merged rows can then be reindexed onto a regular grid at the detected
+sampling period, from the first to the last time, with NaN where there is
+no row. Rows off the grid are dropped.
+
+Readers building their dataset without numpy columns are merged with
+:func:`merge_dataset`, which goes through the same functions.
+
+"""
+
+import logging
+from typing import Optional
+
+import numpy as np
+import xarray as xr
+
+from ccres_weather_station.readers.constants import DUPLICATE_POLICIES
+from ccres_weather_station.readers.dataset import dataset_from_columns
+from ccres_weather_station.readers.engines import ParsedColumns
+
+lgr = logging.getLogger(__name__)
+
+
+def check_duplicates(duplicates: str) -> str:
+    if duplicates not in DUPLICATE_POLICIES:
+        raise ValueError(
+            f"Unknown duplicate policy {duplicates}. "
+            f"Available policies are {DUPLICATE_POLICIES}"
+        )
+    return duplicates
+
+
+def _take(parsed: ParsedColumns, index: np.ndarray) -> ParsedColumns:
+    return ParsedColumns(
+        time=parsed.time[index],
+        variables={name: values[index] for name, values in parsed.variables.items()},
+    )
+
+
+def sort_runs(parsed: ParsedColumns) -> ParsedColumns:
+    """Sort rows made of sorted runs by time, keeping the order of equal times."""
+    time = parsed.time
+    if time.size < 2 or not np.any(time[1:] < time[:-1]):
+        return parsed
+    return _take(parsed, np.argsort(time, kind="stable"))
+
+
+def drop_duplicates(parsed: ParsedColumns, duplicates: str = "first") -> ParsedColumns:
+    """Keep one row per time of sorted rows, following a duplicate policy."""
+    check_duplicates(duplicates)
+    time = parsed.time
+    size = time.size
+    new = np.ones(size, dtype=bool)
+    new[1:] = time[1:] != time[:-1]
+    starts = np.flatnonzero(new)
+    if starts.size == size:
+        return parsed
+    lgr.info(f"Resolving {size - starts.size} duplicated times, keep {duplicates}")
+
+    if duplicates == "first":
+        return _take(parsed, starts)
+    if duplicates == "last":
+        return _take(parsed, np.append(starts[1:], size) - 1)
+
+    rows = np.arange(size)
+    variables = {}
+    for name, values in parsed.variables.items():
+        first_valid = np.minimum.reduceat(
+            np.where(np.isnan(values), size, rows), starts
+        )
+        variables[name] = values[np.where(first_valid < size, first_valid, starts)]
+    return ParsedColumns(time=time[starts], variables=variables)
+
+
+def sampling_period(time: np.ndarray) -> Optional[np.timedelta64]:
+    """Get the median step of sorted unique times, None if there are fewer than 2."""
+    if time.size < 2:
+        return None
+    return np.median(np.diff(time)).astype("timedelta64[ns]")
+
+
+def regular_grid(
+    parsed: ParsedColumns, period: Optional[np.timedelta64] = None
+) -> ParsedColumns:
+    """Reindex sorted unique rows onto a regular grid, filling with NaN.
+
+    Parameters
+    ----------
+    parsed : ParsedColumns
+        Rows sorted by time without duplicates
+    period : Optional[np.timedelta64]
+        Step of the grid, the detected sampling period by default
+
+    """
+    time = parsed.time
+    if period is None:
+        period = sampling_period(time)
+    if period is None or period <= np.timedelta64(0, "ns"):
+        return parsed
+
+    offsets = (time - time[0]).astype(np.int64)
+    step = int(period.astype("timedelta64[ns]").astype(np.int64))
+    on_grid = offsets % step == 0
+    if not on_grid.all():
+        lgr.warning(
+            f"Dropping {np.count_nonzero(~on_grid)} rows off the grid of {period}"
+        )
+    index = offsets[on_grid] // step
+    size = int(offsets[-1] // step) + 1
+    if index.size == size == time.size:
+        return parsed
+
+    variables = {}
+    for name, values in parsed.variables.items():
+        grid = np.full(size, np.nan, dtype=np.result_type(values.dtype, np.float32))
+        grid[index] = values[on_grid]
+        variables[name] = grid
+    return ParsedColumns(
+        time=time[0] + np.arange(size) * np.timedelta64(step, "ns"),
+        variables=variables,
+    )
+
+
+def merge_runs(
+    parsed: ParsedColumns, duplicates: str = "first", regular: bool = False
+) -> ParsedColumns:
+    """Merge the sorted runs of rows by time and resolve the duplicates.
+
+    Parameters
+    ----------
+    parsed : ParsedColumns
+        Rows of the files one after the other, each file sorted by time
+    duplicates : str
+        Policy of the rows with the same time, one of ``DUPLICATE_POLICIES``
+    regular : bool
+        Reindex the rows onto a regular grid at the sampling period
+
+    """
+    merged = drop_duplicates(sort_runs(parsed), duplicates)
+    if regular:
+        merged = regular_grid(merged)
+    return merged
+
+
+def merge_dataset(
+    ds: xr.Dataset, dim_time: str, duplicates: str = "first", regular: bool = False
+) -> xr.Dataset:
+    """Merge the rows of a dataset by time, see ``merge_runs``.
+
+    Only the time series are merged, the other variables along time are
+    dropped. The attributes are kept.
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        Rows of the files one after the other
+    dim_time : str
+        Name of the time dimension
+    duplicates : str
+        Policy of the rows with the same time, one of ``DUPLICATE_POLICIES``
+    regular : bool
+        Reindex the rows onto a regular grid at the sampling period
+
+    """
+    series = [name for name, var in ds.data_vars.items() if var.dims == (dim_time,)]
+    dropped = [
+        name
+        for name, var in ds.data_vars.items()
+        if dim_time in var.dims and name not in series
+    ]
+    if dropped:
+        lgr.warning(f"Variables {dropped} are not time series, not merged")
+
+    merged = merge_runs(
+        ParsedColumns(
+            time=ds[dim_time].values,
+            variables={name: ds[name].values for name in series},
+        ),
+        duplicates,
+        regular,
+    )
+    result = dataset_from_columns(merged.time, merged.variables, dim_time, ds.attrs)
+    for name in [dim_time, *series]:
+        result[name].attrs = ds[name].attrs
+    return result.merge(ds.drop_dims(dim_time))
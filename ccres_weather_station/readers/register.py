@@ -1,24 +1,101 @@
-from typing import Dict, Type
+"""Registry of the readers, by station name.
 
+Readers are registered with ``register_reader`` or declared by any installed
+package as an entry point of the ``ccres_weather_station.readers`` group,
+named after the station::
+
+    [project.entry-points."ccres_weather_station.readers"]
+    mystation = "my_package.readers:MyStationReader"
+
+The module of a declared reader is only imported when ``get_reader_class``
+asks for its station, so the import time does not grow with the number of
+installed readers.
+
+"""
+
+import importlib.metadata
+import sys
+from typing import Dict, List, Type
+
+from ccres_weather_station.config.config import Config
 from ccres_weather_station.readers.base import BaseReader
-from ccres_weather_station.readers.sirta import SirtaReader
+
+ENTRY_POINT_GROUP = "ccres_weather_station.readers"
+
+# Declared here too so that they are found when the package is not installed
+BUILTIN_READERS = {
+    "generic": "ccres_weather_station.readers.generic:GenericReader",
+    "sirta": "ccres_weather_station.readers.sirta:SirtaReader",
+}
+# Reader of the stations whose configuration declares the layout of the files
+GENERIC_READER = "generic"
 
 READERS: Dict[str, Type[BaseReader]] = {}
+_DECLARED: Dict[str, importlib.metadata.EntryPoint] = {}
 
 
 def register_reader(reader: Type[BaseReader], name: str) -> None:
-    if not issubclass(reader, BaseReader) or reader.__abstractmethods__ != frozenset():
-        raise TypeError(f"Reader {reader.__name__} is not implementing BaseReader")
+    if (
+        not isinstance(reader, type)
+        or not issubclass(reader, BaseReader)
+        or reader.__abstractmethods__ != frozenset()
+    ):
+        label = getattr(reader, "__name__", repr(reader))
+        raise TypeError(f"Reader {label} is not implementing BaseReader")
     READERS[name.lower()] = reader
 
 
+def declared_readers() -> Dict[str, importlib.metadata.EntryPoint]:
+    """Get the readers declared as entry points, without importing them."""
+    if not _DECLARED:
+        for name, value in BUILTIN_READERS.items():
+            _DECLARED[name] = importlib.metadata.EntryPoint(
+                name, value, ENTRY_POINT_GROUP
+            )
+        if sys.version_info >= (3, 10):
+            group = importlib.metadata.entry_points(group=ENTRY_POINT_GROUP)
+        else:
+            group = importlib.metadata.entry_points().get(ENTRY_POINT_GROUP, [])
+        for entry_point in group:
+            _DECLARED[entry_point.name.lower()] = entry_point
+    return _DECLARED
+
+
+def available_readers() -> List[str]:
+    """List the station names of the registered and declared readers."""
+    return sorted({*READERS, *declared_readers()})
+
+
 def get_reader_class(station_name: str) -> Type[BaseReader]:
-    if station_name.lower() not in READERS.keys():
-        raise ValueError(
-            f"{station_name} reader not found. "
-            f"Available readers are {list(READERS.keys())}"
-        )
-    return READERS[station_name.lower()]
+    """Get the reader of a station, importing it if it is only declared.
+
+    Raises
+    ------
+    ValueError
+        If no reader is registered or declared for the station
+    TypeError
+        If the declared reader does not implement ``BaseReader``
+
+    """
+    name = station_name.lower()
+    if name not in READERS:
+        entry_point = declared_readers().get(name)
+        if entry_point is None:
+            raise ValueError(
+                f"{station_name} reader not found. "
+                f"Available readers are {available_readers()}"
+            )
+        register_reader(entry_point.load(), name)
+    return READERS[name]
+
+
+def get_station_reader_class(station_name: str, config: Config) -> Type[BaseReader]:
+    """Get the reader of a station, the generic one if ``config`` has a layout.
 
+    A ``[reader]`` section in the configuration declares the layout of the
+    files, read by ``GenericReader`` whatever the station.
 
-register_reader(SirtaReader, "sirta")
+    """
+    if config.reader is not None:
+        return get_reader_class(GENERIC_READER)
+    return get_reader_class(station_name)
@@ -0,0 +1,280 @@
+"""Input files that are compressed or members of archives.
+
+An input is a plain file, a file compressed with gzip (``.gz``), xz
+(``.xz``) or bzip2 (``.bz2``), or a member of a zip or tar archive. A member
+is named ``<archive>::<member>``, e.g. ``2020-10.zip::sirta_20201010.asc``;
+the members are listed from the archives by ``expand_archives`` and read
+from the archive without being extracted. Compressed members, e.g. the
+``.asc.gz`` files of a ``.tar``, are decompressed as well.
+
+Inputs are decompressed in memory. ``iter_inputs`` reads inputs in order,
+keeping an archive open while its members follow each other, so the members
+of a compressed tar are read in one pass when they are given in the order
+of the archive. ``prefetch`` runs such an iterator in a thread so that
+reading and decompressing the next inputs, which release the GIL, overlap
+with parsing the current one.
+
+Only the standard library is imported here.
+
+"""
+
+import bz2
+import gzip
+import lzma
+import os
+import queue
+import struct
+import tarfile
+import threading
+import zipfile
+from contextlib import ExitStack, contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import (
+    IO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from ccres_weather_station.types import PathLike, PathsLike
+
+MEMBER_SEPARATOR = "::"
+
+
+def _gunzip(f: IO[bytes]) -> IO[bytes]:
+    return gzip.GzipFile(fileobj=f)  # type: ignore[return-value]
+
+
+COMPRESSIONS: Dict[str, Callable[[IO[bytes]], IO[bytes]]] = {
+    ".gz": _gunzip,
+    ".xz": lzma.LZMAFile,
+    ".bz2": bz2.BZ2File,
+}
+ZIP_SUFFIXES = (".zip",)
+TAR_SUFFIXES = (".tar", ".tgz", ".tar.gz", ".tar.xz", ".txz", ".tar.bz2", ".tbz2")
+DEFAULT_PREFETCH = 2
+
+Archive = Union[zipfile.ZipFile, tarfile.TarFile]
+
+
+def split_member(path: PathLike) -> Tuple[Path, Optional[str]]:
+    """Split an input into its file and its member name, None if not a member."""
+    name = os.fspath(path)
+    if MEMBER_SEPARATOR not in name:
+        return Path(name), None
+    container, member = name.split(MEMBER_SEPARATOR, 1)
+    return Path(container), member
+
+
+def _suffix(name: str) -> str:
+    return Path(name).suffix.lower()
+
+
+def _is_tar(name: str) -> bool:
+    return name.lower().endswith(TAR_SUFFIXES)
+
+
+def is_archive(path: PathLike) -> bool:
+    """Tell whether a file is a zip or tar archive, from its name."""
+    name = os.fspath(path)
+    return MEMBER_SEPARATOR not in name and (
+        _suffix(name) in ZIP_SUFFIXES or _is_tar(name)
+    )
+
+
+def is_plain(path: PathLike) -> bool:
+    """Tell whether an input is a file read as is, neither compressed nor a member."""
+    container, member = split_member(path)
+    return member is None and _suffix(container.name) not in COMPRESSIONS
+
+
+def archive_members(path: PathLike) -> List[Path]:
+    """List the regular files of an archive, in the order of the archive."""
+    if _suffix(os.fspath(path)) in ZIP_SUFFIXES:
+        with zipfile.ZipFile(path) as archive:
+            names = [info.filename for info in archive.infolist() if not info.is_dir()]
+    else:
+        with tarfile.open(path) as archive:
+            names = [info.name for info in archive.getmembers() if info.isfile()]
+    return [Path(f"{os.fspath(path)}{MEMBER_SEPARATOR}{name}") for name in names]
+
+
+def expand_archives(files: PathsLike) -> List[Path]:
+    """Replace the archives of a list of inputs with their members."""
+    expanded: List[Path] = []
+    for file in files:
+        if is_archive(file):
+            expanded.extend(archive_members(file))
+        else:
+            expanded.append(Path(file))
+    return expanded
+
+
+def _decompress(name: str, stream: IO[bytes]) -> IO[bytes]:
+    opener = COMPRESSIONS.get(_suffix(name))
+    return stream if opener is None else opener(stream)
+
+
+def _open_member(archive: Archive, member: str) -> IO[bytes]:
+    if isinstance(archive, zipfile.ZipFile):
+        return archive.open(member)
+    stream = archive.extractfile(member)
+    if stream is None:
+        raise ValueError(f"{member} is not a regular file of {archive.name!r}")
+    return stream
+
+
+def _open_archive(container: Path) -> Archive:
+    if _suffix(container.name) in ZIP_SUFFIXES:
+        return zipfile.ZipFile(container)
+    return tarfile.open(container)
+
+
+@contextmanager
+def open_input(path: PathLike) -> Iterator[IO[bytes]]:
+    """Open an input as a stream of its decompressed bytes."""
+    container, member = split_member(path)
+    with ExitStack() as stack:
+        if member is None:
+            raw: IO[bytes] = stack.enter_context(open(container, "rb"))
+            yield stack.enter_context(_decompress(container.name, raw))
+            return
+        archive = _open_archive(container)
+        stack.callback(archive.close)
+        raw = stack.enter_context(_open_member(archive, member))
+        yield stack.enter_context(_decompress(member, raw))
+
+
+def read_input(path: PathLike) -> bytes:
+    """Read the decompressed bytes of an input."""
+    with open_input(path) as f:
+        return f.read()
+
+
+def iter_inputs(
+    files: Iterable[PathLike], skip: Optional[Callable[[Path], bool]] = None
+) -> Iterator[Optional[bytes]]:
+    """Read inputs in order, keeping each archive open for its next members.
+
+    Parameters
+    ----------
+    files : Iterable[PathLike]
+        Inputs to read
+    skip : Optional[Callable[[Path], bool]]
+        Tell the inputs not to read, e.g. the ones already in a cache
+
+    Yields
+    ------
+    Optional[bytes]
+        Decompressed bytes of each input, None for the skipped ones
+
+    """
+    current: Optional[Tuple[Path, Archive]] = None
+    try:
+        for file in files:
+            file = Path(file)
+            if skip is not None and skip(file):
+                yield None
+                continue
+            container, member = split_member(file)
+            if member is None:
+                yield read_input(file)
+                continue
+            if current is None or current[0] != container:
+                if current is not None:
+                    current[1].close()
+                current = (container, _open_archive(container))
+            with _open_member(current[1], member) as raw:
+                with _decompress(member, raw) as stream:
+                    yield stream.read()
+    finally:
+        if current is not None:
+            current[1].close()
+
+
+_DONE = object()
+
+
+def prefetch(
+    items: Iterator[Optional[bytes]], ahead: int = DEFAULT_PREFETCH
+) -> Iterator[Optional[bytes]]:
+    """Run an iterator in a thread, up to ``ahead`` items before the consumer.
+
+    Exceptions of the iterator are raised to the consumer at the item that
+    failed.
+
+    """
+    results: "queue.Queue[object]" = queue.Queue(maxsize=max(1, ahead))
+    stop = threading.Event()
+
+    def _put(item: object) -> bool:
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce() -> None:
+        try:
+            for item in items:
+                if not _put(item):
+                    return
+            _put(_DONE)
+        except BaseException as err:
+            _put(err)
+
+    thread = threading.Thread(target=_produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = results.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item  # type: ignore[misc]
+    finally:
+        stop.set()
+        thread.join()
+
+
+def input_stat(path: PathLike) -> os.stat_result:
+    """Stat the file holding an input, the archive of a member."""
+    return split_member(path)[0].stat()
+
+
+@lru_cache(maxsize=16)
+def _member_sizes(container: Path, mtime_ns: int) -> Dict[str, int]:
+    # Listing a compressed tar decompresses all of it, so it is done once
+    if _suffix(container.name) in ZIP_SUFFIXES:
+        with zipfile.ZipFile(container) as archive:
+            return {info.filename: info.file_size for info in archive.infolist()}
+    with tarfile.open(container) as archive:
+        return {info.name: info.size for info in archive.getmembers()}
+
+
+def input_size(path: PathLike) -> int:
+    """Get the decompressed size of an input when it is cheap to know.
+
+    It is the size recorded in the archive for members, the size in the
+    trailer of gzip files (modulo 4 GiB), and the size on disk otherwise.
+
+    """
+    container, member = split_member(path)
+    stat = container.stat()
+    if member is not None:
+        return _member_sizes(container, stat.st_mtime_ns)[member]
+    size = stat.st_size
+    if _suffix(container.name) == ".gz" and size >= 4:
+        with open(container, "rb") as f:
+            f.seek(-4, os.SEEK_END)
+            return int(struct.unpack("<I", f.read(4))[0])
+    return size
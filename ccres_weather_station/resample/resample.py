@@ -0,0 +1,233 @@
+"""Aggregate time series into regular time bins.
+
+Each variable is reduced with the time method of its configured
+``cell_methods``, e.g. ``time: mean`` or ``time: sum``. The bins are
+aligned on multiples of the period since 1970, closed on the left and
+labelled by their start; bins without any valid sample hold NaN.
+
+Direction variables (standard name ``wind_from_direction`` or
+``wind_to_direction``) averaged over time are averaged as vectors, weighted
+by the variable whose standard name is ``wind_speed`` if there is one.
+
+The flags of a flag variable (with a ``flag_masks`` attribute) are
+combined with a bitwise or, so a bin has the flags of all its samples.
+
+All the reductions are vectorised over the samples, with ``np.bincount``
+for sums and means and ``ufunc.reduceat`` on the sorted samples for the
+others.
+
+"""
+
+import logging
+import re
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from ccres_weather_station.config.config import Config
+
+lgr = logging.getLogger(__name__)
+
+DEFAULT_METHOD = "mean"
+DIRECTION_STANDARD_NAMES = ("wind_from_direction", "wind_to_direction")
+SPEED_STANDARD_NAME = "wind_speed"
+VECTOR_COMMENT = "vector average"
+
+_TIME_METHOD = re.compile(r"\btime\s*:\s*(\w+)")
+
+
+class Bins:
+    """Regular time bins and the bin of each sample.
+
+    Parameters
+    ----------
+    time : np.ndarray
+        Sorted ``datetime64[ns]`` times of the samples
+    period : pd.Timedelta
+        Width of the bins
+
+    """
+
+    def __init__(self, time: np.ndarray, period: pd.Timedelta):
+        step = period.value
+        ticks = time.astype("datetime64[ns]").astype(np.int64) // step
+        first = ticks[0] if ticks.size else 0
+        self.size = int(ticks[-1] - first + 1) if ticks.size else 0
+        self.labels = ((first + np.arange(self.size)) * step).astype("datetime64[ns]")
+        self.index = (ticks - first).astype(np.intp)
+        # Samples are sorted, so the samples of a bin are contiguous
+        self.used, self.starts = np.unique(self.index, return_index=True)
+
+    def count(self, valid: np.ndarray) -> np.ndarray:
+        return np.bincount(self.index, weights=valid, minlength=self.size)
+
+    def sum(self, values: np.ndarray, valid: np.ndarray) -> np.ndarray:
+        return np.bincount(
+            self.index, weights=np.where(valid, values, 0), minlength=self.size
+        )
+
+    def reduceat(
+        self, ufunc: np.ufunc, values: np.ndarray, fill: Any = np.nan
+    ) -> np.ndarray:
+        out = np.full(self.size, fill, dtype=np.result_type(values, fill))
+        if self.used.size:
+            out[self.used] = ufunc.reduceat(values, self.starts)
+        return out
+
+
+def _mean(bins: Bins, values: np.ndarray) -> np.ndarray:
+    valid = np.isfinite(values)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return bins.sum(values, valid) / bins.count(valid)
+
+
+def _sum(bins: Bins, values: np.ndarray) -> np.ndarray:
+    valid = np.isfinite(values)
+    return np.where(bins.count(valid) > 0, bins.sum(values, valid), np.nan)
+
+
+def _maximum(bins: Bins, values: np.ndarray) -> np.ndarray:
+    return bins.reduceat(np.fmax, values)
+
+
+def _minimum(bins: Bins, values: np.ndarray) -> np.ndarray:
+    return bins.reduceat(np.fmin, values)
+
+
+def _point(bins: Bins, values: np.ndarray) -> np.ndarray:
+    out = np.full(bins.size, np.nan)
+    out[bins.used] = values[bins.starts]
+    return out
+
+
+_REDUCERS: Dict[str, Callable[[Bins, np.ndarray], np.ndarray]] = {
+    "mean": _mean,
+    "sum": _sum,
+    "maximum": _maximum,
+    "minimum": _minimum,
+    "point": _point,
+}
+METHODS = tuple(_REDUCERS)
+
+
+def vector_mean(
+    bins: Bins, direction: np.ndarray, speed: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Average directions in degrees as vectors, weighted by ``speed``.
+
+    Samples missing the direction or the speed are ignored. Bins whose
+    vectors cancel out get the direction of their mean vector anyway.
+
+    """
+    if speed is None:
+        speed = np.ones_like(direction)
+    valid = np.isfinite(direction) & np.isfinite(speed)
+    radians = np.deg2rad(direction)
+    east = bins.sum(speed * np.sin(radians), valid)
+    north = bins.sum(speed * np.cos(radians), valid)
+    # Rounded so that a direction just below north does not become 360
+    mean = np.round(np.rad2deg(np.arctan2(east, north)), 6) % 360
+    return np.where(bins.count(valid) > 0, mean, np.nan)
+
+
+def time_method(cell_methods: Optional[str]) -> str:
+    """Get the time method of a ``cell_methods`` attribute, mean by default."""
+    if not cell_methods:
+        return DEFAULT_METHOD
+    match = _TIME_METHOD.search(cell_methods)
+    if match is None:
+        return DEFAULT_METHOD
+    method = match[1]
+    if method not in _REDUCERS:
+        raise ValueError(
+            f"Cannot resample with the cell method {method}, "
+            f"available methods are {METHODS}"
+        )
+    return method
+
+
+def _variable_methods(
+    ds: xr.Dataset, config: Config, dim_time: str
+) -> Tuple[Dict[str, str], Dict[str, str], Optional[str]]:
+    """Get the method and standard name of each time series, and the speed."""
+    attrs = config.compile().variable_attrs
+    methods, standard_names = {}, {}
+    for name, var in ds.data_vars.items():
+        if var.dims != (dim_time,) or "flag_masks" in var.attrs:
+            continue
+        var_attrs = {**attrs.get(str(name), {}), **var.attrs}
+        methods[str(name)] = time_method(var_attrs.get("cell_methods"))
+        standard_names[str(name)] = var_attrs.get("standard_name", "")
+    speeds = [
+        name for name, std in standard_names.items() if std == SPEED_STANDARD_NAME
+    ]
+    return methods, standard_names, speeds[0] if speeds else None
+
+
+def resample(ds: xr.Dataset, config: Config, period: str) -> xr.Dataset:
+    """Aggregate the time series of a dataset into regular bins.
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        Dataset with a time coordinate
+    config : Config
+        Configuration giving the ``cell_methods`` and standard names
+    period : str
+        Width of the bins, a pandas offset such as ``10min`` or ``1h``
+
+    Returns
+    -------
+    xr.Dataset
+        Dataset on the bins, whose variables have their ``cell_methods``
+        set. Variables that are not time series are dropped.
+
+    Raises
+    ------
+    ValueError
+        If the period is not positive or a cell method is not supported
+
+    """
+    dim_time = config.compile().time_name
+    step = pd.to_timedelta(period)
+    if step <= pd.Timedelta(0):
+        raise ValueError(f"The resampling period must be positive, not {period}")
+
+    time = ds[dim_time].values
+    if time.size > 1 and np.any(time[1:] < time[:-1]):
+        ds = ds.isel({dim_time: np.argsort(time, kind="stable")})
+        time = ds[dim_time].values
+    bins = Bins(time, step)
+    methods, standard_names, speed_name = _variable_methods(ds, config, dim_time)
+    speed = None if speed_name is None else ds[speed_name].values.astype(np.float64)
+
+    data_vars = {}
+    for name, method in methods.items():
+        var = ds[name]
+        values = var.values.astype(np.float64)
+        cell_methods = f"{dim_time}: {method}"
+        if method == "mean" and standard_names[name] in DIRECTION_STANDARD_NAMES:
+            reduced = vector_mean(bins, values, speed)
+            weight = f" weighted by {speed_name}" if speed_name else ""
+            cell_methods += f" (comment: {VECTOR_COMMENT}{weight})"
+        else:
+            reduced = _REDUCERS[method](bins, values)
+        dtype = var.dtype if var.dtype.kind == "f" else np.float64
+        data_vars[name] = xr.Variable(
+            (dim_time,),
+            reduced.astype(dtype),
+            attrs={**var.attrs, "cell_methods": cell_methods},
+        )
+
+    for name, var in ds.data_vars.items():
+        if var.dims == (dim_time,) and "flag_masks" in var.attrs:
+            data_vars[str(name)] = xr.Variable(
+                (dim_time,),
+                bins.reduceat(np.bitwise_or, var.values, var.dtype.type(0)),
+                attrs=var.attrs,
+            )
+
+    lgr.debug(f"{time.size} samples resampled into {bins.size} bins of {period}")
+    return xr.Dataset(data_vars, coords={dim_time: bins.labels}, attrs=dict(ds.attrs))
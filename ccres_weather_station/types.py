@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import List, Union
+from typing import Sequence, Union
 
 PathLike = Union[str, Path]
-PathsLike = List[PathLike]
+PathsLike = Sequence[PathLike]
@@ -0,0 +1,3 @@
+"""Constants of the watch mode, importable without numpy, pandas or xarray."""
+
+DEFAULT_INTERVAL = 60.0
@@ -0,0 +1,338 @@
+"""Ingest the input files of a station as they arrive.
+
+A directory is scanned for new or grown files. Only the complete lines
+written since the last scan are parsed, from the byte offset reached in the
+previous scan, and their records are appended to the outputs. A file being
+written is read again from where it stopped; a file whose size shrank or
+whose inode changed is read again from its start. The header lines of the
+reader plan are only skipped once, even when they are written over several
+scans.
+
+The offsets are kept in a JSON state file, saved after the records are
+appended, so a restart resumes where the last run stopped. If a run stops
+between the append and the save, the same records are appended again, and
+the writers skip the ones older than the end of the output.
+
+The directory is polled, or watched with inotify through the optional
+``watchdog`` package so that new data is ingested as soon as it is written.
+
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ccres_weather_station.batch.batch import (
+    BatchResult,
+    list_input_files,
+    render_output,
+)
+from ccres_weather_station.config.config import Config
+from ccres_weather_station.readers.columnar import ColumnarReader
+from ccres_weather_station.readers.dataset import dataset_from_columns
+from ccres_weather_station.readers.engines import ParsedColumns, concat_columns
+from ccres_weather_station.types import PathLike
+from ccres_weather_station.watch.constants import DEFAULT_INTERVAL
+from ccres_weather_station.writers.constants import DEFAULT_OUTPUT_FORMAT
+from ccres_weather_station.writers.presets import DEFAULT_READ_PERIOD
+from ccres_weather_station.writers.write import get_writer
+
+lgr = logging.getLogger(__name__)
+
+STATE_VERSION = 1
+
+
+@dataclass
+class FileState:
+    """Part of an input file already ingested.
+
+    ``header`` is the number of header lines of the reader plan still to
+    skip after ``offset``, when the file was read before all of them were
+    written.
+
+    """
+
+    offset: int = 0
+    inode: int = 0
+    mtime_ns: int = 0
+    header: int = 0
+
+
+@dataclass
+class WatchState:
+    """Ingested part of every input file, saved as JSON.
+
+    Parameters
+    ----------
+    path : Path
+        JSON file of the state
+    files : Dict[str, FileState]
+        State of each input file, by absolute path
+
+    """
+
+    path: Path
+    files: Dict[str, FileState] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: PathLike) -> "WatchState":
+        """Load a state, empty if its file does not exist yet."""
+        path = Path(path)
+        if not path.exists():
+            return cls(path)
+        content = json.loads(path.read_text())
+        if content.get("version") != STATE_VERSION:
+            raise ValueError(
+                f"{path} has the state version {content.get('version')}, "
+                f"expected {STATE_VERSION}"
+            )
+        files = {name: FileState(**state) for name, state in content["files"].items()}
+        return cls(path, files)
+
+    def save(self) -> None:
+        """Write the state, replacing the previous one at once."""
+        content = {
+            "version": STATE_VERSION,
+            "files": {name: asdict(state) for name, state in self.files.items()},
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(content, f, indent=1)
+            os.replace(tmp, self.path)
+        except OSError:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+
+def read_new_lines(path: PathLike, state: FileState) -> Tuple[bytes, FileState]:
+    """Read the complete lines written after the ingested part of a file.
+
+    Parameters
+    ----------
+    path : PathLike
+        Input file
+    state : FileState
+        Ingested part of the file
+
+    Returns
+    -------
+    Tuple[bytes, FileState]
+        New complete lines, possibly empty, and the state once they are
+        ingested. A last line without end of line is left for later.
+
+    """
+    with open(path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        offset = state.offset
+        if stat.st_ino != state.inode or stat.st_size < offset:
+            if offset > 0:
+                lgr.warning(f"{path} was replaced or truncated, reading it again")
+            offset = 0
+        f.seek(offset)
+        data = f.read(stat.st_size - offset)
+
+    end = data.rfind(b"\n") + 1
+    return data[:end], FileState(
+        offset=offset + end, inode=stat.st_ino, mtime_ns=stat.st_mtime_ns
+    )
+
+
+def _skip_lines(data: bytes, count: int) -> Tuple[bytes, int]:
+    """Drop up to ``count`` complete lines from the start of ``data``.
+
+    Returns
+    -------
+    Tuple[bytes, int]
+        Remaining data and number of lines still to drop
+
+    """
+    start = 0
+    while count > 0:
+        end = data.find(b"\n", start) + 1
+        if end == 0:
+            break
+        start = end
+        count -= 1
+    return data[start:], count
+
+
+def ingest(
+    reader: ColumnarReader,
+    config: Config,
+    files: List[Path],
+    state: WatchState,
+    output_pattern: str,
+    station: str,
+    preset: Optional[str] = None,
+    read_period: str = DEFAULT_READ_PERIOD,
+    output_format: str = DEFAULT_OUTPUT_FORMAT,
+) -> List[BatchResult]:
+    """Append the new lines of the input files to their outputs.
+
+    The state of the files of an output is saved once its records are
+    appended. A file that cannot be parsed or an output that cannot be
+    written is logged and retried at the next call.
+
+    Returns
+    -------
+    List[BatchResult]
+        One result per output with new lines
+
+    """
+    groups: Dict[Path, List[Tuple[Path, ParsedColumns, FileState]]] = {}
+    results = []
+    for file in files:
+        file = file.resolve()
+        previous = state.files.get(str(file), FileState())
+        try:
+            stat = file.stat()
+            if stat.st_ino == previous.inode and stat.st_size == previous.offset:
+                continue
+            data, new_state = read_new_lines(file, previous)
+            output = render_output(reader, file, output_pattern, station)
+            # New lines read from the start of the file begin with its header
+            header = (
+                reader.plan.skip_rows
+                if new_state.offset == len(data)
+                else previous.header
+            )
+            lines, new_state.header = _skip_lines(data, header)
+            parsed = reader.parse_lines(lines, str(file))
+        except Exception as err:
+            lgr.error(f"Cannot ingest {file}: {err}")
+            results.append(BatchResult(output=Path(), inputs=[file], error=str(err)))
+            continue
+        if (new_state.offset, new_state.inode) != (previous.offset, previous.inode):
+            groups.setdefault(output, []).append((file, parsed, new_state))
+
+    for output, group in sorted(groups.items()):
+        inputs = [file for file, _, _ in group]
+        result = BatchResult(output=output, inputs=inputs)
+        parts = [parsed for _, parsed, _ in group if len(parsed) > 0]
+        try:
+            if parts:
+                merged = concat_columns(parts, reader.plan)
+                order = np.argsort(merged.time, kind="stable")
+                ds = dataset_from_columns(
+                    merged.time[order],
+                    {name: values[order] for name, values in merged.variables.items()},
+                    reader.time_name,
+                )
+                output.parent.mkdir(parents=True, exist_ok=True)
+                get_writer(output_format)(ds, config, output, "a", preset, read_period)
+                lgr.info(f"{ds.sizes[reader.time_name]} records appended to {output}")
+        except Exception as err:
+            lgr.exception(f"Cannot append to {output}")
+            result.error = str(err)
+        else:
+            for file, _, new_state in group:
+                state.files[str(file)] = new_state
+            state.save()
+        results.append(result)
+    return results
+
+
+def _wake_on_changes(directory: PathLike, wake: threading.Event) -> Optional[Any]:
+    """Set ``wake`` on each change in the directory, if watchdog is installed."""
+    try:
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+    except ImportError:
+        lgr.info("watchdog is not installed, polling the directory")
+        return None
+
+    class _Handler(FileSystemEventHandler):  # type: ignore[misc]
+        def on_any_event(self, event: Any) -> None:
+            wake.set()
+
+    observer = Observer()
+    observer.schedule(_Handler(), str(directory), recursive=True)
+    observer.start()
+    return observer
+
+
+def watch(
+    reader: ColumnarReader,
+    config: Config,
+    input_dir: PathLike,
+    state: WatchState,
+    output_pattern: str,
+    station: str,
+    pattern: str = "*",
+    interval: float = DEFAULT_INTERVAL,
+    once: bool = False,
+    preset: Optional[str] = None,
+    read_period: str = DEFAULT_READ_PERIOD,
+    output_format: str = DEFAULT_OUTPUT_FORMAT,
+    on_pass: Optional[Callable[[List[BatchResult]], None]] = None,
+) -> None:
+    """Ingest the new lines of the input files until interrupted.
+
+    Parameters
+    ----------
+    reader : ColumnarReader
+        Reader parsing the new lines
+    config : Config
+        Configuration of the outputs
+    input_dir : PathLike
+        Directory searched recursively for input files
+    state : WatchState
+        Ingested part of the files, saved after each append
+    output_pattern : str
+        Template of the outputs, see ``render_output``
+    station : str
+        Station name, available in the output pattern
+    pattern : str
+        Glob pattern of the input files
+    interval : float
+        Maximum number of seconds between two scans. With watchdog, a scan
+        also starts as soon as a file changes.
+    once : bool
+        Scan only once then return
+    preset : Optional[str]
+        Encoding preset of new outputs
+    read_period : str
+        Expected read pattern of new outputs
+    output_format : str
+        Format of the outputs, one of ``OUTPUT_FORMATS``
+    on_pass : Optional[Callable[[List[BatchResult]], None]]
+        Called with the results of each scan
+
+    """
+    wake = threading.Event()
+    observer = None if once else _wake_on_changes(input_dir, wake)
+    try:
+        while True:
+            wake.clear()
+            start = time.monotonic()
+            files = list_input_files(input_dir, pattern)
+            results = ingest(
+                reader,
+                config,
+                files,
+                state,
+                output_pattern,
+                station,
+                preset,
+                read_period,
+                output_format,
+            )
+            if on_pass is not None:
+                on_pass(results)
+            if once:
+                return
+            wake.wait(max(0.0, interval - (time.monotonic() - start)))
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
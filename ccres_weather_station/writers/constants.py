@@ -0,0 +1,4 @@
+"""Constants of the writers, importable without numpy, pandas or xarray."""
+
+OUTPUT_FORMATS = ("netcdf", "zarr")
+DEFAULT_OUTPUT_FORMAT = "netcdf"
@@ -0,0 +1,180 @@
+"""Encoding presets and automatic chunking of the NetCDF outputs.
+
+A preset fills the compression of every time series not set in the
+configuration, and their chunk size along time is derived from the
+sampling of the data and the expected read pattern: a chunk holds the
+samples of one read period, e.g. one day, bounded to ``MAX_CHUNK_BYTES``.
+
+"""
+
+import math
+import tempfile
+import time as timer
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import netCDF4
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from ccres_weather_station.writers.presets import DEFAULT_READ_PERIOD, ENCODING_PRESETS
+
+# Stay below the default HDF5 chunk cache of a variable
+MAX_CHUNK_BYTES = 2**20
+FULL_READ_PERIOD = "full"
+
+
+def check_preset(preset: str) -> str:
+    if preset not in ENCODING_PRESETS:
+        raise ValueError(
+            f"Unknown encoding preset {preset}. "
+            f"Available presets are {list(ENCODING_PRESETS)}"
+        )
+    return preset
+
+
+def auto_chunksize(
+    time: np.ndarray,
+    read_period: str = DEFAULT_READ_PERIOD,
+    itemsize: int = 4,
+    max_chunk_bytes: int = MAX_CHUNK_BYTES,
+) -> Optional[int]:
+    """Get the chunk size along time of a time series.
+
+    Parameters
+    ----------
+    time : np.ndarray
+        Times of the series, its median step is the sampling period
+    read_period : str
+        Period usually read at once, a ``pd.Timedelta`` string like "1D",
+        or "full" when the whole series is read
+    itemsize : int
+        Size in bytes of one value
+    max_chunk_bytes : int
+        Maximum size of a chunk in bytes
+
+    Returns
+    -------
+    Optional[int]
+        Number of samples per chunk, None for an empty series
+
+    """
+    size = time.size
+    if size == 0:
+        return None
+    samples = size
+    if read_period != FULL_READ_PERIOD and size > 1:
+        step = pd.Timedelta(np.median(np.diff(time)))
+        if step > pd.Timedelta(0):
+            samples = math.ceil(pd.Timedelta(read_period) / step)
+    samples = min(samples, size, max(1, max_chunk_bytes // itemsize))
+    return max(1, samples)
+
+
+def apply_preset(
+    ds: xr.Dataset,
+    encoding: Dict[str, Dict[str, Any]],
+    time_name: str,
+    preset: str,
+    read_period: str = DEFAULT_READ_PERIOD,
+) -> Dict[str, Dict[str, Any]]:
+    """Complete the encoding of the time series with a preset.
+
+    The values set in ``encoding``, coming from the configuration, are
+    kept. The other time series and the time coordinate get the preset
+    compression and an automatic chunk size.
+
+    Returns
+    -------
+    Dict[str, Dict[str, Any]]
+        New encoding, ``encoding`` is not modified
+
+    """
+    values = ENCODING_PRESETS[check_preset(preset)]
+    completed = {name: dict(var_encoding) for name, var_encoding in encoding.items()}
+    time = ds[time_name].values
+    for name, var in ds.variables.items():
+        if var.dims != (time_name,):
+            continue
+        var_encoding = completed.setdefault(str(name), {})
+        for key, value in values.items():
+            var_encoding.setdefault(key, value)
+        if "chunksizes" not in var_encoding and not var_encoding.get("contiguous"):
+            dtype = np.dtype(var_encoding.get("dtype", var.dtype))
+            chunksize = auto_chunksize(time, read_period, dtype.itemsize)
+            if chunksize is not None:
+                var_encoding["chunksizes"] = (chunksize,)
+    return completed
+
+
+@dataclass
+class PresetMeasure:
+    """Cost of an encoding preset on a dataset."""
+
+    preset: str
+    size: int
+    write_time: float
+    read_time: float
+
+
+def _read_all(path: Path) -> None:
+    with netCDF4.Dataset(path) as nc:
+        for var in nc.variables.values():
+            var[:]
+
+
+def measure_presets(
+    ds: xr.Dataset,
+    time_name: str,
+    presets: Optional[Sequence[str]] = None,
+    read_period: str = DEFAULT_READ_PERIOD,
+    directory: Optional[Path] = None,
+) -> List[PresetMeasure]:
+    """Measure the file size, write time and full read time of presets.
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        Dataset written with each preset, its own encoding is ignored
+    time_name : str
+        Name of the time dimension
+    presets : Optional[Sequence[str]]
+        Presets to measure, all by default
+    read_period : str
+        Expected read pattern, see ``auto_chunksize``
+    directory : Optional[Path]
+        Directory of the written files, a temporary one by default
+
+    Returns
+    -------
+    List[PresetMeasure]
+        One measure per preset
+
+    """
+    ds = ds.copy()
+    for var in ds.variables.values():
+        var.encoding = {
+            key: value
+            for key, value in var.encoding.items()
+            if key in ("dtype", "units", "calendar", "_FillValue")
+        }
+    measures = []
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        for preset in presets or list(ENCODING_PRESETS):
+            path = Path(tmp) / f"{preset}.nc"
+            encoding = apply_preset(ds, {}, time_name, preset, read_period)
+
+            start = timer.perf_counter()
+            ds.to_netcdf(path, encoding=encoding)
+            write_time = timer.perf_counter() - start
+
+            start = timer.perf_counter()
+            _read_all(path)
+            read_time = timer.perf_counter() - start
+
+            measures.append(
+                PresetMeasure(preset, path.stat().st_size, write_time, read_time)
+            )
+    return measures
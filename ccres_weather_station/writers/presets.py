@@ -0,0 +1,23 @@
+"""Named NetCDF encoding presets, importable without the heavy dependencies.
+
+Each preset gives the compression of the time series. Their chunk size
+along time is derived from the data, see
+``ccres_weather_station.writers.encoding``.
+
+- ``fast-write``: no compression, the fastest to write and read.
+- ``balanced``: light deflate with shuffle, most of the size gain for a
+  small write cost.
+- ``archive``: strongest deflate with shuffle and checksums, for long
+  term storage.
+
+"""
+
+from typing import Any, Dict
+
+ENCODING_PRESETS: Dict[str, Dict[str, Any]] = {
+    "fast-write": {"zlib": False},
+    "balanced": {"zlib": True, "complevel": 1, "shuffle": True},
+    "archive": {"zlib": True, "complevel": 9, "shuffle": True, "fletcher32": True},
+}
+# Expected read pattern: a time series is mostly read one day at a time
+DEFAULT_READ_PERIOD = "1D"
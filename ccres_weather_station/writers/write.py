@@ -5,25 +5,30 @@ Also handle saving of file.
 """
 
 import datetime as dt
+import logging
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
+import netCDF4
+import numpy as np
 import pandas as pd
 import xarray as xr
+from xarray.coding.times import decode_cf_datetime, encode_cf_datetime
 
 from ccres_weather_station.config.config import Config
+from ccres_weather_station.metrics.metrics import Metrics, measure, path_size
 from ccres_weather_station.types import PathLike
+from ccres_weather_station.writers.constants import OUTPUT_FORMATS
+from ccres_weather_station.writers.encoding import apply_preset, auto_chunksize
+from ccres_weather_station.writers.presets import DEFAULT_READ_PERIOD
 
+lgr = logging.getLogger(__name__)
+WRITE_MODES = ("w", "a")
 
-def add_time_coverage_attributes(ds: xr.Dataset, dim_time: str) -> xr.Dataset:
-    time = pd.to_datetime(ds[dim_time].values)
-
-    if isinstance(time, pd.Timestamp):
-        # Convert do nothing if already that, but if only
-        # one time value, then pandas return a timestamp object
-        #  need to reconvert it
-        time = pd.DatetimeIndex([time])
 
+def _get_time_coverage(time: pd.DatetimeIndex) -> Dict[str, str]:
     time_coverage_start = ""
     time_coverage_end = ""
     time_coverage_duration = ""
@@ -37,16 +42,34 @@ def add_time_coverage_attributes(ds: xr.Dataset, dim_time: str) -> xr.Dataset:
     if time.size > 1:
         time_coverage_resolution = (time[1] - time[0]).isoformat()
 
-    ds.attrs["time_coverage_start"] = time_coverage_start
-    ds.attrs["time_coverage_end"] = time_coverage_end
-    ds.attrs["time_coverage_duration"] = time_coverage_duration
-    ds.attrs["time_coverage_resolution"] = time_coverage_resolution
+    return {
+        "time_coverage_start": time_coverage_start,
+        "time_coverage_end": time_coverage_end,
+        "time_coverage_duration": time_coverage_duration,
+        "time_coverage_resolution": time_coverage_resolution,
+    }
+
+
+def add_time_coverage_attributes(ds: xr.Dataset, dim_time: str) -> xr.Dataset:
+    time = pd.to_datetime(ds[dim_time].values)
+
+    if isinstance(time, pd.Timestamp):
+        # Convert do nothing if already that, but if only
+        # one time value, then pandas return a timestamp object
+        #  need to reconvert it
+        time = pd.DatetimeIndex([time])
+
+    ds.attrs.update(_get_time_coverage(time))
     return ds
 
 
+@lru_cache(maxsize=None)
 def _get_software_git_infos() -> str:
     """Get a formatted string with software infos.
 
+    The repository is inspected once per process, the source code does not
+    change while it runs.
+
     Returns
     -------
     str
@@ -74,9 +97,12 @@ def _get_software_git_infos() -> str:
         return ""
 
 
+def _get_history_line(action: str) -> str:
+    return f"{action} on {pd.Timestamp.now().isoformat()}.{_get_software_git_infos()}"
+
+
 def add_history(ds: xr.Dataset) -> xr.Dataset:
-    history = f"Created on {pd.Timestamp.now().isoformat()}.{_get_software_git_infos()}"
-    ds.attrs["history"] = history
+    ds.attrs["history"] = _get_history_line("Created")
     return ds
 
 
@@ -103,31 +129,37 @@ def add_date_metadata_modified(ds: xr.Dataset) -> xr.Dataset:
 class ConfigWriter:
     def __init__(self, config: Config):
         self.config = config
+        self.compiled = config.compile()
+
+    def _typed_range(self, var: xr.DataArray, attrs: Dict[str, Any]) -> Dict[str, Any]:
+        """Give the valid range the type of the variable in the file, as in CF."""
+        encoding = self.compiled.variable_encodings.get(str(var.name), {})
+        dtype = np.dtype(encoding.get("dtype", var.dtype))
+        if dtype.kind not in "fiu":
+            return attrs
+        return {
+            key: dtype.type(value) if key in ("valid_min", "valid_max") else value
+            for key, value in attrs.items()
+        }
 
     def _add_var_attrs(self, ds: xr.Dataset) -> xr.Dataset:
-        for _, conf_var in self.config.variables.items():
-            if conf_var.name not in ds.data_vars:
-                continue
-            for attr, value in conf_var.meta:
-                if value is None:
-                    continue
-                ds[conf_var.name].attrs[attr] = value
+        for name, attrs in self.compiled.variable_attrs.items():
+            if name in ds.data_vars:
+                # A cell_methods set by a processing stage such as resample wins
+                cell_methods = ds[name].attrs.get("cell_methods")
+                ds[name].attrs.update(self._typed_range(ds[name], attrs))
+                if cell_methods is not None:
+                    ds[name].attrs["cell_methods"] = cell_methods
         return ds
 
     def _add_coord_attrs(self, ds: xr.Dataset) -> xr.Dataset:
-        for _, conf_coord in self.config.coords.items():
-            if conf_coord.name not in ds.coords:
-                continue
-            for attr, value in conf_coord.meta:
-                if value is None:
-                    continue
-                ds[conf_coord.name].attrs[attr] = value
+        for name, attrs in self.compiled.coord_attrs.items():
+            if name in ds.coords:
+                ds[name].attrs.update(attrs)
         return ds
 
     def _add_global_attrs(self, ds: xr.Dataset) -> xr.Dataset:
-        for attr, value in self.config.attrs.items():
-            if value is not None:
-                ds.attrs[attr] = value
+        ds.attrs.update(self.compiled.global_attrs)
         return ds
 
     def add_config_meta(self, ds: xr.Dataset) -> xr.Dataset:
@@ -160,14 +192,9 @@ class ConfigWriter:
         encoding: Dict[str, Dict[str, str]],
     ) -> Dict[str, Dict[str, str]]:
         """Get the variables encoding from config file."""
-        for _, encoding_var in self.config.variables.items():
-            if encoding_var.name not in ds.data_vars:
-                continue
-            encoding[encoding_var.name] = {}
-            for key, value in encoding_var.encoding:
-                if value is None:
-                    continue
-                encoding[encoding_var.name][key] = value
+        for name, var_encoding in self.compiled.variable_encodings.items():
+            if name in ds.data_vars:
+                encoding[name] = dict(var_encoding)
         return encoding
 
     def _get_coord_encoding(
@@ -176,14 +203,9 @@ class ConfigWriter:
         encoding: Dict[str, Dict[str, str]],
     ) -> Dict[str, Dict[str, str]]:
         """Get the coordinates encoding from config file."""
-        for _, encoding_coord in self.config.coords.items():
-            if encoding_coord.name not in ds.coords:
-                continue
-            encoding[encoding_coord.name] = {}
-            for key, value in encoding_coord.encoding:
-                if value is None:
-                    continue
-                encoding[encoding_coord.name][key] = value
+        for name, coord_encoding in self.compiled.coord_encodings.items():
+            if name in ds.coords:
+                encoding[name] = dict(coord_encoding)
         return encoding
 
     def get_encoding(self, ds: xr.Dataset) -> Dict[str, Dict[str, str]]:
@@ -208,8 +230,191 @@ class ConfigWriter:
         return encoding
 
 
-def write_nc(ds: xr.Dataset, config: Config, output_path: PathLike) -> None:
+def _decode_time(nc_time: netCDF4.Variable, values: np.ndarray) -> pd.DatetimeIndex:
+    return pd.DatetimeIndex(
+        decode_cf_datetime(
+            values, nc_time.units, getattr(nc_time, "calendar", "standard")
+        )
+    )
+
+
+class _AppendTarget:
+    """Variable of a NetCDF file where dask blocks are appended.
+
+    The blocks are written after the ``offset`` records already in the file,
+    with their NaN masked.
+
+    """
+
+    def __init__(self, variable: netCDF4.Variable, offset: int):
+        self.variable = variable
+        self.offset = offset
+
+    def __setitem__(self, key: Tuple[slice, ...], values: np.ndarray) -> None:
+        (index,) = key
+        start, stop = self.offset + index.start, self.offset + index.stop
+        self.variable[start:stop] = np.ma.masked_invalid(values)
+
+
+def _append_nc(ds: xr.Dataset, config: Config, output_path: Path) -> None:
+    """Append the records of ``ds`` to an existing NetCDF file.
+
+    Only the records newer than the last time of the file are written. The
+    existing data is never read back, only its first and last time. Dask
+    variables are written block by block.
+
+    """
+    dim_time = config.coords["time"].name
+    with netCDF4.Dataset(output_path, "a") as nc:
+        if dim_time not in nc.dimensions or not nc.dimensions[dim_time].isunlimited():
+            raise ValueError(
+                f"{output_path} has no unlimited {dim_time} dimension to append to"
+            )
+        nc_time = nc.variables[dim_time]
+        size = len(nc_time)
+
+        time = pd.DatetimeIndex(ds[dim_time].values)
+        if size > 0:
+            bounds = _decode_time(nc_time, nc_time[[0, size - 1]])
+            new = time > bounds[-1]
+            if not new.all():
+                lgr.warning(
+                    f"Skipping {np.count_nonzero(~new)} records already "
+                    f"in {output_path}"
+                )
+            ds = ds.isel({dim_time: new})
+            time = time[new]
+        if time.size == 0:
+            return
+
+        # Every variable is checked first, the time dimension cannot shrink
+        # back if a variable fails once it is extended
+        series = []
+        for name, var in ds.data_vars.items():
+            if var.dims != (dim_time,):
+                lgr.warning(f"Variable {name} is not a time series, not appended")
+                continue
+            if name not in nc.variables:
+                raise ValueError(f"Variable {name} is not in {output_path}")
+            if nc.variables[name].dimensions != (dim_time,):
+                raise ValueError(
+                    f"Variable {name} of {output_path} is not a time series"
+                )
+            series.append(name)
+
+        end = size + time.size
+        values, _, _ = encode_cf_datetime(
+            time, nc_time.units, getattr(nc_time, "calendar", "standard")
+        )
+        nc_time[size:end] = values
+        lazy = [name for name in series if ds[name].chunks is not None]
+        for name in series:
+            if name not in lazy:
+                nc.variables[name][size:end] = np.ma.masked_invalid(ds[name].values)
+        if lazy:
+            import dask.array as da
+
+            # The NetCDF handle is shared by the threads of dask
+            targets: List[Any] = [
+                _AppendTarget(nc.variables[name], size) for name in lazy
+            ]
+            da.store([ds[name].data for name in lazy], targets, lock=True)
+
+        if size == 0:
+            coverage = _get_time_coverage(time)
+        else:
+            # The start and the resolution of the file are kept
+            coverage = {
+                "time_coverage_end": time[-1].isoformat(),
+                "time_coverage_duration": (time[-1] - bounds[0]).isoformat(),
+            }
+            if size == 1:
+                resolution = (time[0] - bounds[0]).isoformat()
+                coverage["time_coverage_resolution"] = resolution
+        nc.setncatts(coverage)
+
+        history = _get_history_line("Appended")
+        if "history" in nc.ncattrs():
+            history = f"{nc.history}\n{history}"
+        nc.setncattr("history", history)
+        nc.setncattr("metadata_modified", str(dt.datetime.utcnow()))
+
+
+def write_nc(
+    ds: xr.Dataset,
+    config: Config,
+    output_path: PathLike,
+    mode: str = "w",
+    preset: Optional[str] = None,
+    read_period: str = DEFAULT_READ_PERIOD,
+    metrics: Optional[Metrics] = None,
+) -> None:
+    """Write the dataset with its metadata to a NetCDF file.
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        Dataset to write
+    config : Config
+        Configuration object
+    output_path : PathLike
+        Path of the NetCDF file
+    mode : str
+        "w" to overwrite the file, "a" to append the new records along time
+        to an existing file. If the file does not exist, "a" creates it with
+        an unlimited time dimension.
+    preset : Optional[str]
+        Encoding preset completing the configuration encoding of the time
+        series, see ``ccres_weather_station.writers.presets``. When
+        appending, the encoding of the existing file is kept.
+    read_period : str
+        Expected read pattern used to chunk the time series with a preset
+    metrics : Optional[Metrics]
+        Metrics where the "metadata" and "write" stages are recorded
+
+    """
+    if mode not in WRITE_MODES:
+        raise ValueError(f"Unknown mode {mode}. Available modes are {WRITE_MODES}")
     output_path = Path(output_path)
+    if mode == "a" and output_path.exists():
+        with _measure_write(metrics, ds, config, output_path, append=True):
+            _append_nc(ds, config, output_path)
+        return
+
+    with measure(metrics, "metadata", output_path) as record:
+        ds, encoding = _prepare(ds, config, preset, read_period)
+        record.rows = ds.sizes.get(config.coords["time"].name, 0)
+    with _measure_write(metrics, ds, config, output_path):
+        ds.to_netcdf(
+            output_path,
+            encoding=encoding,
+            unlimited_dims=[config.coords["time"].name] if mode == "a" else None,
+        )
+
+
+@contextmanager
+def _measure_write(
+    metrics: Optional[Metrics],
+    ds: xr.Dataset,
+    config: Config,
+    output_path: Path,
+    append: bool = False,
+) -> Iterator[None]:
+    """Record the "write" stage with the bytes added to the output."""
+    if metrics is None:
+        yield
+        return
+    size = path_size(output_path) if append else 0
+    with metrics.stage("write", output_path) as record:
+        yield
+        record.rows = ds.sizes.get(config.coords["time"].name, 0)
+        record.bytes_written = path_size(output_path) - size
+
+
+def _prepare(
+    ds: xr.Dataset, config: Config, preset: Optional[str], read_period: str
+) -> Tuple[xr.Dataset, Dict[str, Dict[str, Any]]]:
+    """Add the metadata of a new output and get its encoding."""
     config_writer = ConfigWriter(config)
     ds = add_time_coverage_attributes(ds, config.coords["time"].name)
     ds = add_history(ds)
@@ -217,4 +422,228 @@ def write_nc(ds: xr.Dataset, config: Config, output_path: PathLike) -> None:
     ds = add_date_metadata_modified(ds)
     ds = config_writer.add_config_meta(ds)
     encoding = config_writer.get_encoding(ds)
-    ds.to_netcdf(output_path, encoding=encoding)
+    if preset is not None:
+        encoding = apply_preset(
+            ds, encoding, config.coords["time"].name, preset, read_period
+        )
+    return ds, encoding
+
+
+def _zarr_encoding(
+    ds: xr.Dataset,
+    encoding: Dict[str, Dict[str, Any]],
+    dim_time: str,
+    read_period: str,
+) -> Dict[str, Dict[str, Any]]:
+    """Translate a NetCDF encoding to Zarr.
+
+    Deflate becomes a Zlib compressor, shuffle and fletcher32 become
+    filters. Time series without chunk sizes are chunked along time from
+    ``read_period``, a Zarr store has no unlimited dimension to rely on.
+
+    """
+    from numcodecs import Fletcher32, Shuffle, Zlib
+
+    zarr_encoding: Dict[str, Dict[str, Any]] = {}
+    for name, var in ds.variables.items():
+        var_encoding = encoding.get(str(name), {})
+        converted = {
+            key: value
+            for key, value in var_encoding.items()
+            if key in ("dtype", "units", "calendar", "_FillValue")
+        }
+        itemsize = np.dtype(var_encoding.get("dtype", var.dtype)).itemsize
+
+        if var_encoding.get("contiguous"):
+            converted["chunks"] = var.shape
+        elif "chunksizes" in var_encoding:
+            converted["chunks"] = tuple(var_encoding["chunksizes"])
+        elif var.dims == (dim_time,):
+            chunksize = auto_chunksize(ds[dim_time].values, read_period, itemsize)
+            if chunksize is not None:
+                converted["chunks"] = (chunksize,)
+
+        if "zlib" in var_encoding:
+            converted["compressor"] = (
+                Zlib(level=var_encoding.get("complevel", 4))
+                if var_encoding["zlib"]
+                else None
+            )
+        filters = []
+        if var_encoding.get("shuffle"):
+            filters.append(Shuffle(elementsize=itemsize))
+        if var_encoding.get("fletcher32"):
+            filters.append(Fletcher32())
+        if filters:
+            converted["filters"] = filters
+
+        if converted:
+            zarr_encoding[str(name)] = converted
+    return zarr_encoding
+
+
+def _align_dask_chunks(
+    ds: xr.Dataset, encoding: Dict[str, Dict[str, Any]]
+) -> xr.Dataset:
+    """Rechunk the dask variables on their Zarr chunks.
+
+    Two dask chunks must never write the same Zarr chunk, e.g. when each
+    input file of a lazy dataset is a dask chunk.
+
+    """
+    rechunked = {}
+    for name, var in ds.data_vars.items():
+        chunks = encoding.get(str(name), {}).get("chunks")
+        if var.chunks is not None and chunks is not None:
+            rechunked[name] = var.chunk(dict(zip(var.dims, chunks)))
+    return ds.assign(rechunked) if rechunked else ds
+
+
+def _append_chunks(size: int, offset: int, chunk: int) -> Tuple[int, ...]:
+    """Split ``size`` records appended after ``offset`` records on Zarr chunks.
+
+    The first dask chunk fills the last Zarr chunk of the store, so that two
+    dask chunks never write the same Zarr chunk.
+
+    """
+    first = min(size, -offset % chunk or chunk)
+    full, last = divmod(size - first, chunk)
+    return (first,) + (chunk,) * full + ((last,) if last else ())
+
+
+def _append_zarr(ds: xr.Dataset, config: Config, output_path: Path) -> None:
+    """Append the records of ``ds`` to an existing Zarr store.
+
+    Only the records newer than the last time of the store are written, with
+    the encoding of the store. Only its time coordinate is read. Dask
+    variables are rechunked on the chunks of the store and written block by
+    block.
+
+    """
+    import zarr
+
+    dim_time = config.coords["time"].name
+    with xr.open_zarr(output_path) as existing:
+        stored = pd.DatetimeIndex(existing[dim_time].values)
+        history = existing.attrs.get("history")
+        store_chunks = {
+            name: existing[name].encoding.get("chunks")
+            for name in ds.data_vars
+            if name in existing
+        }
+
+    time = pd.DatetimeIndex(ds[dim_time].values)
+    if stored.size > 0:
+        new = time > stored[-1]
+        if not new.all():
+            lgr.warning(
+                f"Skipping {np.count_nonzero(~new)} records already in {output_path}"
+            )
+        ds = ds.isel({dim_time: new})
+        time = time[new]
+    if time.size == 0:
+        return
+
+    # Appended records rarely start on a chunk boundary of the store, the
+    # first dask chunk is shorter. xarray only accepts uniform dask chunks
+    # unless safe_chunks is off, these ones are aligned by construction.
+    rechunked = {}
+    for name, series in ds.data_vars.items():
+        chunks = store_chunks.get(name)
+        if series.chunks is None or not chunks or series.dims[0] != dim_time:
+            continue
+        rechunked[name] = series.chunk(
+            {dim_time: _append_chunks(time.size, stored.size, chunks[0])}
+        )
+    ds = ds.assign(rechunked)
+    ds.attrs = {}
+    for var in ds.variables.values():
+        var.encoding = {}
+    ds.to_zarr(output_path, append_dim=dim_time, consolidated=True, safe_chunks=False)
+
+    # Only the first two and the last times of the store give its coverage
+    edges = stored[:2].append(time)[:2].append(time[-1:])
+    attrs = _get_time_coverage(edges)
+    new_history = _get_history_line("Appended")
+    attrs["history"] = new_history if history is None else f"{history}\n{new_history}"
+    attrs["metadata_modified"] = str(dt.datetime.utcnow())
+    zarr.open_group(str(output_path), mode="a").attrs.update(attrs)
+    zarr.consolidate_metadata(str(output_path))
+
+
+def write_zarr(
+    ds: xr.Dataset,
+    config: Config,
+    output_path: PathLike,
+    mode: str = "w",
+    preset: Optional[str] = None,
+    read_period: str = DEFAULT_READ_PERIOD,
+    metrics: Optional[Metrics] = None,
+) -> None:
+    """Write the dataset with its metadata to a local Zarr store.
+
+    The metadata and encoding are the ones of ``write_nc``. The metadata of
+    the store is consolidated, so opening it reads a single file.
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        Dataset to write
+    config : Config
+        Configuration object
+    output_path : PathLike
+        Directory of the Zarr store
+    mode : str
+        "w" to overwrite the store, "a" to append the new records along
+        time to an existing store, created if it does not exist.
+    preset : Optional[str]
+        Encoding preset, see ``write_nc``
+    read_period : str
+        Expected read pattern, the time series are chunked so that a chunk
+        holds the samples of this period
+    metrics : Optional[Metrics]
+        Metrics where the "metadata" and "write" stages are recorded
+
+    Raises
+    ------
+    ImportError
+        If the optional ``zarr`` package is not installed
+
+    """
+    try:
+        import zarr  # noqa: F401
+    except ImportError as err:
+        raise ImportError(
+            "The zarr output needs zarr. Install it with `pip install zarr`"
+        ) from err
+
+    if mode not in WRITE_MODES:
+        raise ValueError(f"Unknown mode {mode}. Available modes are {WRITE_MODES}")
+    output_path = Path(output_path)
+    if mode == "a" and output_path.exists():
+        with _measure_write(metrics, ds, config, output_path, append=True):
+            _append_zarr(ds, config, output_path)
+        return
+
+    dim_time = config.coords["time"].name
+    with measure(metrics, "metadata", output_path) as record:
+        ds, encoding = _prepare(ds, config, preset, read_period)
+        encoding = _zarr_encoding(ds, encoding, dim_time, read_period)
+        ds = _align_dask_chunks(ds, encoding)
+        record.rows = ds.sizes.get(dim_time, 0)
+    with _measure_write(metrics, ds, config, output_path):
+        ds.to_zarr(output_path, mode="w", encoding=encoding, consolidated=True)
+
+
+Writer = Callable[..., None]
+_WRITERS: Dict[str, Writer] = {"netcdf": write_nc, "zarr": write_zarr}
+
+
+def get_writer(output_format: str) -> Writer:
+    """Get the write function of an output format, one of ``OUTPUT_FORMATS``."""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(
+            f"Unknown output format {output_format}. "
+            f"Available formats are {OUTPUT_FORMATS}"
+        )
+    return _WRITERS[output_format]
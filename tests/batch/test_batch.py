@@ -0,0 +1,85 @@
+import zipfile
+from pathlib import Path
+
+import pytest
+import xarray as xr
+
+from ccres_weather_station.batch.batch import (
+    group_by_output,
+    list_input_files,
+    render_output,
+    run_batch,
+)
+from ccres_weather_station.config.config import Config
+from ccres_weather_station.readers.sirta import SirtaReader
+
+
+@pytest.fixture()
+def reader():
+    return SirtaReader(Config.default(), engine="numpy")
+
+
+def test_list_input_files(sirta_files, tmp_path: Path):
+    files = sirta_files(3)
+    listed = list_input_files(tmp_path, "*.asc", [f"{files[0]}\n", "\n"])
+    assert listed == sorted(files)
+
+
+def test_render_output(reader, sirta_file: Path):
+    output = render_output(reader, sirta_file, "out/{station}_{date:%Y%m}.nc", "sirta")
+    assert output == Path("out/sirta_202010.nc")
+    with pytest.raises(ValueError):
+        render_output(reader, "meteo.asc", "{date:%Y}.nc", "sirta")
+
+
+def test_group_by_output(reader, sirta_files):
+    files = sirta_files(3) + [Path("unknown.asc")]
+    groups, failures = group_by_output(reader, files, "{date:%Y%m}.nc", "sirta")
+    assert groups == {Path("202010.nc"): files[:3]}
+    assert len(failures) == 1
+    assert failures[0].inputs == [Path("unknown.asc")]
+
+
+def test_run_batch_isolates_failures(reader, sirta_files, tmp_path: Path):
+    files = sirta_files(3)
+    files[1].write_text("not a SIRTA file\n")
+    pattern = str(tmp_path / "out" / "{date:%Y%m%d}.nc")
+
+    results = run_batch(reader, Config.default(), files, pattern, "sirta")
+
+    assert [result.ok for result in results] == [True, False, True]
+    assert results[1].failed_inputs == [files[1]]
+    assert not results[1].output.exists()
+    with xr.open_dataset(results[2].output) as ds:
+        assert ds["time"].size == 1440
+
+
+def test_run_batch_merges_outputs(reader, sirta_files, tmp_path: Path):
+    files = sirta_files(3)
+    files[1].write_text("not a SIRTA file\n")
+    pattern = str(tmp_path / "{station}_{date:%Y%m}.nc")
+
+    results = run_batch(reader, Config.default(), files, pattern, "sirta")
+
+    assert len(results) == 1
+    assert results[0].failed_inputs == [files[1]]
+    with xr.open_dataset(tmp_path / "sirta_202010.nc") as ds:
+        assert ds["time"].size == 2 * 1440
+
+
+def test_run_batch_archive_members(reader, sirta_files, tmp_path: Path):
+    files = sirta_files(2)
+    archive = tmp_path / "october.zip"
+    with zipfile.ZipFile(archive, "w") as opened:
+        for file in files:
+            opened.write(file, file.name)
+    pattern = str(tmp_path / "out" / "{stem}.nc")
+
+    results = run_batch(reader, Config.default(), [archive], pattern, "sirta")
+
+    assert [result.output.name for result in results] == [
+        file.with_suffix(".nc").name for file in files
+    ]
+    assert all(result.ok for result in results)
+    with xr.open_dataset(results[1].output) as ds:
+        assert ds["time"].size == 1440
@@ -0,0 +1,121 @@
+import datetime as dt
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from ccres_weather_station.catalog.catalog import Catalog
+from ccres_weather_station.config.config import Config
+from ccres_weather_station.readers.generic import GenericReader
+from ccres_weather_station.readers.sirta import SirtaReader
+from tests.conftest import write_sirta_file
+
+HEADERED_LAYOUT = """
+[reader]
+layout = "delimited"
+delimiter = ","
+comment = ";"
+skip_rows = 1
+file_pattern = '^meteo_(\\d{8})\\.csv$'
+file_date_format = "%Y%m%d"
+file_period = "1D"
+
+[reader.columns]
+air_temperature = 1
+"""
+
+
+@pytest.fixture()
+def reader():
+    return SirtaReader(Config.default())
+
+
+def test_catalog_update(reader, sirta_files, tmp_path: Path):
+    files = sirta_files(3)
+    with Catalog(tmp_path / "catalog.db", "sirta") as catalog:
+        assert catalog.update(reader, files) == (3, 0, [])
+        assert catalog.update(reader, files) == (0, 3, [])
+
+        # Modified files are indexed again
+        write_sirta_file(files[2], start="2020-10-12", periods=60)
+        os.utime(files[2], ns=(0, 10**9))
+        assert catalog.update(reader, files) == (1, 2, [])
+
+        entries = catalog.entries()
+    assert [entry.path for entry in entries] == [file.resolve() for file in files]
+    assert entries[0].rows == 1440
+    assert entries[0].first == np.datetime64("2020-10-10T00:00")
+    assert entries[0].last == np.datetime64("2020-10-10T23:59")
+    assert entries[0].step == np.timedelta64(1, "m")
+    assert entries[2].rows == 60
+
+
+def test_catalog_persistent(reader, sirta_files, tmp_path: Path):
+    files = sirta_files(2)
+    with Catalog(tmp_path / "catalog.db", "sirta") as catalog:
+        catalog.update(reader, files)
+    with Catalog(tmp_path / "catalog.db", "SIRTA") as catalog:
+        assert len(catalog.entries()) == 2
+    with pytest.raises(ValueError):
+        Catalog(tmp_path / "catalog.db", "other")
+
+
+def test_catalog_select(reader, sirta_files, tmp_path: Path):
+    files = [file.resolve() for file in sirta_files(4)]
+    with Catalog(tmp_path / "catalog.db", "sirta") as catalog:
+        catalog.update(reader, files)
+        assert catalog.select() == files
+        assert catalog.select(dt.datetime(2020, 10, 11, 12)) == files[1:]
+        assert catalog.select(end_date=dt.datetime(2020, 10, 11)) == files[:2]
+        assert (
+            catalog.select(dt.datetime(2020, 10, 11, 12), dt.datetime(2020, 10, 12, 12))
+            == files[1:3]
+        )
+        assert catalog.select(dt.datetime(2021, 1, 1)) == []
+
+
+def test_catalog_gaps_overlaps(reader, sirta_files, tmp_path: Path):
+    files = sirta_files(4)
+    files[1].unlink()
+    # Half a day overlapping the first file
+    overlap = write_sirta_file(
+        tmp_path / "meteo_20201010_120000_720.asc",
+        start="2020-10-10T12:00",
+        periods=720,
+    )
+    broken = tmp_path / "meteo.asc"
+    broken.write_text("# only a header\n")
+
+    with Catalog(tmp_path / "catalog.db", "sirta") as catalog:
+        indexed, _, failed = catalog.update(reader, files[:1] + files[2:] + [overlap])
+        indexed, _, failed = catalog.update(reader, [broken])
+        assert failed == [broken.resolve()]
+
+        assert catalog.gaps() == [
+            (np.datetime64("2020-10-10T23:59"), np.datetime64("2020-10-12T00:00"))
+        ]
+        assert catalog.overlaps() == [(files[0].resolve(), overlap.resolve())]
+
+        overlap.unlink()
+        assert catalog.prune() == [overlap.resolve()]
+        assert len(catalog.entries()) == 3
+
+
+def test_catalog_headered_layout(tmp_path: Path):
+    config_file = tmp_path / "station.toml"
+    config_file.write_text(HEADERED_LAYOUT)
+    reader = GenericReader(Config.default().add_config_from_toml(config_file))
+    lines = [f"2020-10-10T{hour:02d}:00:00Z,{hour}.5" for hour in range(24)]
+    lines.insert(12, "; maintenance")
+    file = tmp_path / "meteo_20201010.csv"
+    file.write_text("time,ta\n" + "\n".join(lines) + "\n")
+
+    with Catalog(tmp_path / "catalog.db", "somewhere") as catalog:
+        catalog.update(reader, [file])
+        (entry,) = catalog.entries()
+
+    assert entry.rows == 24
+    assert entry.first == np.datetime64("2020-10-10T00:00")
+    assert entry.last == np.datetime64("2020-10-10T23:00")
+    assert entry.step == np.timedelta64(1, "h")
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 import pytest
@@ -77,3 +78,61 @@ def test_no_variables_name_error():
 def test_no_coords_name_error():
     with pytest.raises(ValueError):
         Config.from_toml(NO_COORD_NAME)
+
+
+CUSTOM_TOML = """
+[variables.wind_speed]
+name = "ws"
+
+[variables.wind_speed.meta]
+long_name = "Wind speed"
+
+[variables.wind_speed.encoding]
+chunksizes = [1440]
+
+[coords.time]
+name = "time"
+"""
+
+
+def test_from_toml_memoised(tmp_path: Path):
+    path = tmp_path / "custom.toml"
+    path.write_text(CUSTOM_TOML)
+
+    config = Config.from_toml(path)
+    other = Config.from_toml(path)
+    assert config == other
+    assert config is not other
+    # Copies can be modified independently
+    config.variables["wind_speed"].name = "wind"
+    assert other.variables["wind_speed"].name == "ws"
+
+    path.write_text(CUSTOM_TOML.replace('"ws"', '"speed"'))
+    os.utime(path, ns=(0, path.stat().st_mtime_ns + 10**9))
+    assert Config.from_toml(path).variables["wind_speed"].name == "speed"
+
+
+def test_compiled_config(tmp_path: Path):
+    path = tmp_path / "custom.toml"
+    path.write_text(CUSTOM_TOML)
+    config = Config.from_toml(path)
+
+    compiled = config.compile()
+    assert compiled is config.compile()
+    assert compiled == Config.from_toml(path).compile()
+    assert hash(compiled) == hash(Config.from_toml(path).compile())
+    assert compiled.time_name == "time"
+    assert compiled.variable_names == {"wind_speed": "ws"}
+    # Unset fields are dropped, lists become tuples
+    assert compiled.variable_attrs == {"ws": {"long_name": "Wind speed"}}
+    assert compiled.variable_encodings == {"ws": {"chunksizes": (1440,)}}
+
+    config.add_config_from_toml(path)
+    assert config.compile() is not compiled
+    compiled = config.compile()
+    assert config.compile() is compiled
+    # Fields modified directly are noticed
+    config.variables["wind_speed"].name = "wind"
+    config.attrs["site"] = "Somewhere"
+    assert config.compile().variable_names == {"wind_speed": "wind"}
+    assert ("site", "Somewhere") in config.compile().attrs
@@ -0,0 +1,57 @@
+"""Shared fixtures for the tests.
+
+The real SIRTA files are stored with git LFS, the fixtures here write small
+synthetic files following the same layout.
+
+"""
+
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+import pytest
+
+SIRTA_HEADER = "# Synthetic SIRTA file\n" "# time ws wd ta rh p pr\n"
+
+
+def write_sirta_file(
+    path: Path,
+    start: str = "2020-10-10",
+    periods: int = 1440,
+    freq: str = "1min",
+    seed: int = 0,
+) -> Path:
+    rng = np.random.default_rng(seed)
+    time = pd.date_range(start, periods=periods, freq=freq)
+    values = rng.uniform(0, 100, size=(periods, 6)).round(2)
+    values[::97, 3] = np.nan
+    lines = [
+        f"{t:%Y-%m-%dT%H:%M:%SZ} " + " ".join(f"{v:.2f}" for v in row)
+        for t, row in zip(time, values)
+    ]
+    path.write_text(SIRTA_HEADER + "\n".join(lines) + "\n")
+    return path
+
+
+@pytest.fixture()
+def sirta_file(tmp_path: Path) -> Path:
+    return write_sirta_file(
+        tmp_path / "meteoairsol_1a_Lz1NairF1minPtuvPrain_v01_20201010_000000_1440.asc"
+    )
+
+
+@pytest.fixture()
+def sirta_files(tmp_path: Path) -> Callable[[int], list]:
+    def _sirta_files(days: int) -> list:
+        files = []
+        for day in pd.date_range("2020-10-10", periods=days, freq="1D"):
+            name = (
+                f"meteoairsol_1a_Lz1NairF1minPtuvPrain_v01_{day:%Y%m%d}_000000_1440.asc"
+            )
+            files.append(
+                write_sirta_file(tmp_path / name, start=str(day.date()), seed=day.day)
+            )
+        return files
+
+    return _sirta_files
@@ -0,0 +1,100 @@
+"""Tests for the batch command of the CLI."""
+
+from pathlib import Path
+
+import xarray as xr
+from click.testing import CliRunner
+
+from ccres_weather_station.cli import cli
+
+
+def test_e2e_batch_input_dir(sirta_files, tmp_path: Path):
+    sirta_files(3)
+    runner = CliRunner()
+
+    result = runner.invoke(
+        cli.main,
+        [
+            "batch",
+            "--station",
+            "sirta",
+            "--input-dir",
+            tmp_path,
+            "--pattern",
+            "*.asc",
+            "--from",
+            "2020-10-11",
+            "--to",
+            "2020-10-12",
+            "--output-pattern",
+            str(tmp_path / "out" / "{station}_{date:%Y%m%d}.nc"),
+            "--no-cache",
+        ],
+    )
+    assert result.exit_code == 0
+    assert sorted(p.name for p in (tmp_path / "out").iterdir()) == [
+        "sirta_20201011.nc",
+        "sirta_20201012.nc",
+    ]
+
+
+def test_e2e_batch_from_without_to(sirta_files, tmp_path: Path):
+    sirta_files(3)
+    runner = CliRunner()
+
+    result = runner.invoke(
+        cli.main,
+        [
+            "batch",
+            "--station",
+            "sirta",
+            "--input-dir",
+            tmp_path,
+            "--pattern",
+            "*.asc",
+            "--from",
+            "2020-10-11",
+            "--output-pattern",
+            str(tmp_path / "out" / "{station}_{date:%Y%m%d}.nc"),
+            "--no-cache",
+        ],
+    )
+    assert result.exit_code == 0
+    # No end date keeps everything after the start date
+    outputs = sorted((tmp_path / "out").iterdir())
+    assert [p.name for p in outputs] == ["sirta_20201011.nc", "sirta_20201012.nc"]
+    for output in outputs:
+        with xr.open_dataset(output) as ds:
+            assert ds.sizes["time"] == 1440
+
+
+def test_e2e_batch_stdin_with_failure(sirta_files, tmp_path: Path):
+    files = sirta_files(2)
+    files[0].write_text("broken\n")
+    runner = CliRunner()
+
+    result = runner.invoke(
+        cli.main,
+        [
+            "batch",
+            "--station",
+            "sirta",
+            "--file-list",
+            "-",
+            "--output-pattern",
+            str(tmp_path / "{stem}.nc"),
+            "--no-cache",
+        ],
+        input="\n".join(str(file) for file in files),
+    )
+    assert result.exit_code == 1
+    assert "1 succeeded, 1 failed" in result.output
+    assert (tmp_path / f"{files[1].stem}.nc").exists()
+
+
+def test_e2e_batch_no_input(tmp_path: Path):
+    runner = CliRunner()
+    result = runner.invoke(
+        cli.main, ["batch", "--station", "sirta", "--output-pattern", "out.nc"]
+    )
+    assert result.exit_code == 2
@@ -0,0 +1,101 @@
+"""End-to-end tests of a station declared in its configuration only."""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+from click.testing import CliRunner
+
+from ccres_weather_station.cli import cli
+
+STATION_CONFIG = """
+[attrs]
+site = "Somewhere"
+
+[reader]
+layout = "delimited"
+delimiter = ","
+time_format = "%Y-%m-%d %H:%M:%S"
+skip_rows = 1
+missing_values = ["-999"]
+file_pattern = '^meteo_(\\d{8})\\.csv$'
+file_date_format = "%Y%m%d"
+file_period = "1D"
+
+[reader.columns]
+air_temperature = 1
+relative_humidity = 2
+"""
+
+
+@pytest.fixture()
+def station(tmp_path: Path) -> Path:
+    config = tmp_path / "station.toml"
+    config.write_text(STATION_CONFIG)
+    for day in pd.date_range("2021-03-01", periods=2):
+        time = pd.date_range(day, periods=144, freq="10min")
+        lines = [
+            f"{t:%Y-%m-%d %H:%M:%S},{i % 30}.5,{50 + i % 40}"
+            for i, t in enumerate(time)
+        ]
+        lines[3] = lines[3].rsplit(",", 1)[0] + ",-999"
+        (tmp_path / f"meteo_{day:%Y%m%d}.csv").write_text(
+            "time,ta,rh\n" + "\n".join(lines) + "\n"
+        )
+    return config
+
+
+def test_e2e_generic_convert(station: Path, tmp_path: Path):
+    output_file = tmp_path / "out.nc"
+
+    result = CliRunner().invoke(
+        cli.main,
+        [
+            "--station",
+            "somewhere",
+            "--config",
+            station,
+            "--input-files",
+            tmp_path / "meteo_20210301.csv",
+            "--output-file",
+            output_file,
+            "--engine",
+            "auto",
+            "--no-cache",
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    with xr.open_dataset(output_file) as ds:
+        assert ds.sizes["time"] == 144
+        assert ds.attrs["site"] == "Somewhere"
+        assert np.isnan(ds["relative_humidity"].values[3])
+        assert ds["air_temperature"].values[1] == pytest.approx(1.5)
+
+
+def test_e2e_generic_batch(station: Path, tmp_path: Path):
+    result = CliRunner().invoke(
+        cli.main,
+        [
+            "batch",
+            "--station",
+            "somewhere",
+            "--config",
+            station,
+            "--input-dir",
+            tmp_path,
+            "--pattern",
+            "*.csv",
+            "--output-pattern",
+            str(tmp_path / "out" / "{station}_{date:%Y%m%d}.nc"),
+            "--no-cache",
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert sorted(p.name for p in (tmp_path / "out").iterdir()) == [
+        "somewhere_20210301.nc",
+        "somewhere_20210302.nc",
+    ]
@@ -1,5 +1,8 @@
 """Tests for `ccres_weather_station` package."""
 
+import subprocess
+import sys
+
 from click.testing import CliRunner
 
 from ccres_weather_station.cli import cli
@@ -11,3 +14,21 @@ def test_command_line_interface_help():
     help_result = runner.invoke(cli.main, ["--help"])
     assert help_result.exit_code == 0
     assert "Show this message and exit." in help_result.output
+
+
+def test_command_line_interface_help_is_light():
+    """Heavy dependencies are not imported to show the help."""
+    code = (
+        "import sys\n"
+        "from ccres_weather_station.cli.cli import main\n"
+        "try:\n"
+        "    main(['--help'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "heavy = {'numpy', 'pandas', 'xarray', 'netCDF4', 'git'}\n"
+        "print(sorted(heavy.intersection(sys.modules)))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.splitlines()[-1] == "[]"
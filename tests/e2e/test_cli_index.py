@@ -0,0 +1,59 @@
+"""Tests for the index command of the CLI."""
+
+from pathlib import Path
+
+from click.testing import CliRunner
+
+from ccres_weather_station.cli import cli
+
+
+def test_e2e_index_then_batch(sirta_files, tmp_path: Path):
+    files = sirta_files(4)
+    files[2].unlink()
+    catalog = tmp_path / "catalog.db"
+    runner = CliRunner()
+
+    result = runner.invoke(
+        cli.main,
+        ["index", "--station", "sirta", "--input-dir", tmp_path, "--pattern", "*.asc"]
+        + ["--catalog", catalog],
+    )
+    assert result.exit_code == 0
+    assert "3 indexed, 0 unchanged, 0 removed, 0 failed" in result.output
+    assert "3 files, 4320 rows" in result.output
+    assert "GAP 2020-10-11T23:59" in result.output
+
+    result = runner.invoke(
+        cli.main,
+        [
+            "batch",
+            "--station",
+            "sirta",
+            "--catalog",
+            catalog,
+            "--from",
+            "2020-10-11",
+            "--to",
+            "2020-10-13",
+            "--output-pattern",
+            str(tmp_path / "out" / "{date:%Y%m%d}.nc"),
+            "--no-cache",
+        ],
+    )
+    assert result.exit_code == 0
+    assert sorted(p.name for p in (tmp_path / "out").iterdir()) == [
+        "20201011.nc",
+        "20201013.nc",
+    ]
+
+
+def test_e2e_index_failure(tmp_path: Path):
+    (tmp_path / "broken.asc").write_text("not a SIRTA file\n")
+    runner = CliRunner()
+    result = runner.invoke(
+        cli.main,
+        ["index", "--station", "sirta", "--input-dir", tmp_path, "--pattern", "*.asc"]
+        + ["--catalog", tmp_path / "catalog.db"],
+    )
+    assert result.exit_code == 1
+    assert "0 indexed, 0 unchanged, 0 removed, 1 failed" in result.output
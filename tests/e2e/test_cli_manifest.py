@@ -0,0 +1,79 @@
+"""Tests for the manifest command of the CLI."""
+
+import json
+from pathlib import Path
+
+import pandas as pd
+from click.testing import CliRunner
+
+from ccres_weather_station.cli import cli
+
+STATION_CONFIG = """
+[reader]
+layout = "delimited"
+delimiter = ","
+time_format = "%Y-%m-%d %H:%M:%S"
+skip_rows = 1
+file_pattern = '^meteo_(\\d{8})\\.csv$'
+file_date_format = "%Y%m%d"
+file_period = "1D"
+
+[reader.columns]
+air_temperature = 1
+"""
+
+MANIFEST = """
+[defaults]
+output_pattern = "out/{station}_{date:%Y%m}.nc"
+
+[[stations]]
+station = "sirta"
+input_dir = "."
+pattern = "*.asc"
+engine = "numpy"
+
+[[stations]]
+station = "somewhere"
+config = "somewhere.toml"
+inputs = ["meteo_20210301.csv", "meteo_20210302.csv", "missing.csv"]
+"""
+
+
+def test_e2e_manifest(sirta_files, tmp_path: Path):
+    sirta_files(2)
+    (tmp_path / "somewhere.toml").write_text(STATION_CONFIG)
+    for day in pd.date_range("2021-03-01", periods=2):
+        time = pd.date_range(day, periods=144, freq="10min")
+        lines = [f"{t:%Y-%m-%d %H:%M:%S},{i % 30}.5" for i, t in enumerate(time)]
+        (tmp_path / f"meteo_{day:%Y%m%d}.csv").write_text(
+            "time,ta\n" + "\n".join(lines) + "\n"
+        )
+    manifest = tmp_path / "manifest.toml"
+    manifest.write_text(MANIFEST)
+    summary_file = tmp_path / "summary.json"
+
+    result = CliRunner().invoke(
+        cli.main,
+        [
+            "manifest",
+            "--manifest",
+            manifest,
+            "--jobs",
+            "2",
+            "--no-cache",
+            "--summary-json",
+            summary_file,
+        ],
+    )
+
+    # missing.csv has no output, the other files are converted
+    assert result.exit_code == 1
+    assert "FAILED somewhere" in result.output
+    assert sorted(p.name for p in (tmp_path / "out").iterdir()) == [
+        "sirta_202010.nc",
+        "somewhere_202103.nc",
+    ]
+    summary = json.loads(summary_file.read_text())
+    assert (summary["total"]["outputs"], summary["total"]["failed"]) == (2, 1)
+    rows = {station["station"]: station["rows"] for station in summary["stations"]}
+    assert rows == {"sirta": 2 * 1440, "somewhere": 2 * 144}
@@ -0,0 +1,56 @@
+"""Tests for the measure-encoding command of the CLI."""
+
+from pathlib import Path
+
+from click.testing import CliRunner
+
+from ccres_weather_station.cli import cli
+
+
+def test_e2e_measure_encoding(sirta_file: Path, tmp_path: Path):
+    runner = CliRunner()
+    output = tmp_path / "out.nc"
+    result = runner.invoke(
+        cli.main,
+        ["--station", "sirta", "--input-files", sirta_file]
+        + ["--output-file", output, "--no-cache", "--encoding-preset", "balanced"],
+    )
+    assert result.exit_code == 0
+
+    result = runner.invoke(
+        cli.main,
+        ["measure-encoding", "--input-file", output, "--preset", "fast-write"]
+        + ["--preset", "archive", "--read-period", "full"],
+    )
+    assert result.exit_code == 0
+    lines = result.output.splitlines()
+    assert lines[0].split() == [
+        "preset",
+        "size",
+        "(MiB)",
+        "write",
+        "(s)",
+        "read",
+        "(s)",
+    ]
+    assert [line.split()[0] for line in lines[1:]] == ["fast-write", "archive"]
+
+
+def test_e2e_measure_encoding_config(sirta_file: Path, tmp_path: Path):
+    config = tmp_path / "station.toml"
+    config.write_text('[coords.time]\nname = "date"\n')
+    runner = CliRunner()
+    output = tmp_path / "out.nc"
+    result = runner.invoke(
+        cli.main,
+        ["--station", "sirta", "--config", config, "--input-files", sirta_file]
+        + ["--output-file", output, "--no-cache"],
+    )
+    assert result.exit_code == 0
+
+    result = runner.invoke(
+        cli.main,
+        ["measure-encoding", "--input-file", output, "--config", config]
+        + ["--preset", "balanced"],
+    )
+    assert result.exit_code == 0, result.output
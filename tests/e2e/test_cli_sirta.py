@@ -1,7 +1,10 @@
 """Tests for `ccres_weather_station` package."""
 
+import json
 from pathlib import Path
 
+import pytest
+import xarray as xr
 from click.testing import CliRunner
 
 from ccres_weather_station.cli import cli
@@ -30,3 +33,210 @@ def test_e2e_sirta():
         ],
     )
     assert result.exit_code == 0
+
+
+def test_e2e_sirta_numpy_engine(sirta_file: Path, tmp_path: Path):
+    output_file = tmp_path / "e2e_sirta_numpy.nc"
+    runner = CliRunner()
+
+    result = runner.invoke(
+        cli.main,
+        [
+            "--station",
+            "SIRTA",
+            "--input-files",
+            sirta_file,
+            "--output-file",
+            output_file,
+            "--engine",
+            "numpy",
+            "--cache-dir",
+            tmp_path / "cache",
+        ],
+    )
+    assert result.exit_code == 0
+    assert output_file.exists()
+    assert len(list((tmp_path / "cache").glob("*.npz"))) == 1
+
+
+def test_e2e_sirta_no_cache(sirta_file: Path, tmp_path: Path):
+    output_file = tmp_path / "e2e_sirta_no_cache.nc"
+    runner = CliRunner()
+
+    result = runner.invoke(
+        cli.main,
+        [
+            "--station",
+            "SIRTA",
+            "--input-files",
+            sirta_file,
+            "--output-file",
+            output_file,
+            "--cache-dir",
+            tmp_path / "cache",
+            "--no-cache",
+        ],
+    )
+    assert result.exit_code == 0
+    assert output_file.exists()
+    assert not (tmp_path / "cache").exists()
+
+
+def test_e2e_sirta_append(sirta_files, tmp_path: Path):
+    output_file = tmp_path / "e2e_sirta_append.nc"
+    runner = CliRunner()
+
+    for input_file in sirta_files(2):
+        result = runner.invoke(
+            cli.main,
+            [
+                "--station",
+                "SIRTA",
+                "--input-files",
+                input_file,
+                "--output-file",
+                output_file,
+                "--no-cache",
+                "--append",
+            ],
+        )
+        assert result.exit_code == 0
+
+    with xr.open_dataset(output_file) as ds:
+        assert ds["time"].size == 2 * 1440
+
+
+def test_e2e_sirta_zarr(sirta_files, tmp_path: Path):
+    pytest.importorskip("zarr")
+    output_file = tmp_path / "e2e_sirta.zarr"
+    runner = CliRunner()
+
+    for input_file in sirta_files(2):
+        result = runner.invoke(
+            cli.main,
+            [
+                "--station",
+                "SIRTA",
+                "--input-files",
+                input_file,
+                "--output-file",
+                output_file,
+                "--no-cache",
+                "--append",
+                "--output-format",
+                "zarr",
+            ],
+        )
+        assert result.exit_code == 0
+
+    with xr.open_zarr(output_file) as ds:
+        assert ds["time"].size == 2 * 1440
+
+
+def test_e2e_sirta_metrics_and_profile(sirta_file: Path, tmp_path: Path):
+    output_file = tmp_path / "e2e_sirta.nc"
+    metrics_file = tmp_path / "metrics.json"
+    runner = CliRunner()
+
+    result = runner.invoke(
+        cli.main,
+        [
+            "--station",
+            "SIRTA",
+            "--input-files",
+            sirta_file,
+            "--output-file",
+            output_file,
+            "--no-cache",
+            "--metrics-json",
+            metrics_file,
+            "--profile",
+            tmp_path / "run.prof",
+        ],
+    )
+    assert result.exit_code == 0
+
+    metrics = json.loads(metrics_file.read_text())
+    assert list(metrics["stages"]) == ["read", "parse", "bounds", "metadata", "write"]
+    assert metrics["stages"]["parse"]["rows"] == 1440
+    assert metrics["stages"]["read"]["bytes_read"] == sirta_file.stat().st_size
+    assert metrics["stages"]["write"]["bytes_written"] == output_file.stat().st_size
+    assert metrics["stages"]["read"]["peak_memory"] > 0
+    assert (tmp_path / "run.prof").exists()
+
+
+def test_e2e_sirta_lazy(sirta_files, tmp_path: Path):
+    pytest.importorskip("dask")
+    files = sirta_files(2)
+    output_file = tmp_path / "e2e_sirta_lazy.nc"
+    runner = CliRunner()
+
+    args = ["--station", "SIRTA", "--output-file", output_file, "--no-cache"]
+    for file in files:
+        args += ["--input-files", file]
+    result = runner.invoke(
+        cli.main, args + ["--lazy", "--memory-budget", "64", "--engine", "numpy"]
+    )
+    assert result.exit_code == 0
+
+    with xr.open_dataset(output_file) as ds:
+        assert ds.sizes["time"] == 2880
+
+
+def test_e2e_sirta_resample(sirta_files, tmp_path: Path):
+    files = sirta_files(2)
+    output_file = tmp_path / "e2e_sirta_resample.nc"
+    runner = CliRunner()
+
+    args = ["--station", "SIRTA", "--output-file", output_file, "--no-cache"]
+    for file in files:
+        args += ["--input-files", file]
+    result = runner.invoke(cli.main, args + ["--resample", "10min"])
+    assert result.exit_code == 0
+
+    with xr.open_dataset(output_file) as ds:
+        assert ds.sizes["time"] == 288
+        assert ds["air_temperature"].attrs["cell_methods"] == "time: mean"
+
+
+def test_e2e_sirta_qc_mask(sirta_file: Path, tmp_path: Path):
+    output_file = tmp_path / "e2e_sirta_qc.nc"
+    runner = CliRunner()
+
+    result = runner.invoke(
+        cli.main,
+        [
+            "--station",
+            "SIRTA",
+            "--input-files",
+            sirta_file,
+            "--output-file",
+            output_file,
+            "--no-cache",
+            "--qc-mask",
+        ],
+    )
+    assert result.exit_code == 0
+
+    with xr.open_dataset(output_file) as ds:
+        assert ds["pressure_qc"].sizes["time"] == ds.sizes["time"]
+        assert "qc_flagged_samples" in ds.attrs
+
+
+def test_e2e_sirta_duplicates(sirta_files, tmp_path: Path):
+    files = sirta_files(2)
+    output_file = tmp_path / "e2e_sirta_duplicates.nc"
+    runner = CliRunner()
+
+    args = ["--station", "SIRTA", "--output-file", output_file, "--no-cache"]
+    for file in [files[1], files[0], files[1]]:
+        args += ["--input-files", file]
+    result = runner.invoke(cli.main, args + ["--duplicates", "first"])
+    assert result.exit_code == 0
+
+    with xr.open_dataset(output_file) as ds:
+        assert ds.sizes["time"] == 2880
+        assert ds.indexes["time"].is_monotonic_increasing
+
+    result = runner.invoke(cli.main, args + ["--regular-grid", "--lazy"])
+    assert result.exit_code == 2
@@ -0,0 +1,39 @@
+"""Tests for the watch command of the CLI."""
+
+import json
+from pathlib import Path
+
+import xarray as xr
+from click.testing import CliRunner
+
+from ccres_weather_station.cli import cli
+
+
+def test_e2e_watch_once_resumes(sirta_files, tmp_path: Path):
+    sirta_files(1)
+    state = tmp_path / "state" / "watch.json"
+    args = [
+        "watch",
+        "--station",
+        "sirta",
+        "--input-dir",
+        tmp_path,
+        "--pattern",
+        "*.asc",
+        "--output-pattern",
+        str(tmp_path / "out" / "{station}_{date:%Y%m}.nc"),
+        "--state",
+        state,
+        "--once",
+    ]
+    runner = CliRunner()
+
+    result = runner.invoke(cli.main, args)
+    assert result.exit_code == 0
+    assert len(json.loads(state.read_text())["files"]) == 1
+
+    sirta_files(2)
+    result = runner.invoke(cli.main, args)
+    assert result.exit_code == 0
+    with xr.open_dataset(tmp_path / "out" / "sirta_202010.nc") as ds:
+        assert ds.sizes["time"] == 2880
@@ -0,0 +1,110 @@
+from pathlib import Path
+
+import pytest
+import xarray as xr
+
+from ccres_weather_station.manifest.manifest import (
+    IOScheduler,
+    Job,
+    StationEntry,
+    load_manifest,
+    plan_jobs,
+    run_jobs,
+    summarize,
+)
+
+STATION = """
+[[stations]]
+station = "sirta"
+input_dir = "."
+output_pattern = "out/{station}_{date:%Y%m%d}.nc"
+start_date = 2020-10-10
+"""
+MANIFEST = """
+[defaults]
+engine = "numpy"
+pattern = "*.asc"
+""" + STATION
+
+
+def _job(station: str, size: int, device: int) -> Job:
+    entry = StationEntry(station, "{date:%Y}.nc")
+    return Job(station, None, None, Path(), [], entry, size, device)
+
+
+def test_load_manifest(tmp_path: Path):
+    manifest = tmp_path / "manifest.toml"
+    manifest.write_text(MANIFEST)
+
+    (entry,) = load_manifest(manifest)
+
+    assert entry.engine == "numpy"
+    assert entry.pattern == "*.asc"
+    assert Path(entry.input_dir) == tmp_path
+    assert Path(entry.output_pattern).parent == tmp_path / "out"
+    assert entry.start_date.year == 2020
+
+
+@pytest.mark.parametrize(
+    "content, message",
+    [
+        (MANIFEST + 'unknown = "value"\n', "Unknown options"),
+        ('[[stations]]\nstation = "sirta"\n', "Missing options"),
+        (MANIFEST + STATION, "more than once"),
+    ],
+)
+def test_load_manifest_invalid(tmp_path: Path, content: str, message: str):
+    manifest = tmp_path / "manifest.toml"
+    manifest.write_text(content)
+    with pytest.raises(ValueError, match=message):
+        load_manifest(manifest)
+
+
+def test_scheduler_spreads_devices():
+    jobs = [_job("a", 10, 1), _job("a", 30, 1), _job("b", 20, 2), _job("c", 5, 3)]
+    scheduler = IOScheduler(jobs, per_device=1)
+
+    started = [scheduler.next_job() for _ in range(3)]
+
+    # Most bytes left first, then every other device before a second read
+    assert [(job.device, job.size) for job in started] == [(1, 30), (2, 20), (3, 5)]
+    assert scheduler.next_job() is None
+    scheduler.done(started[0])
+    assert scheduler.next_job().size == 10
+    assert not scheduler
+
+
+def test_plan_jobs_output_conflict(sirta_files, tmp_path: Path):
+    sirta_files(2)
+    pattern = str(tmp_path / "{date:%Y%m}.nc")
+    entries = [
+        StationEntry("sirta", pattern, input_dir=str(tmp_path), pattern="*.asc"),
+        StationEntry("generic", pattern, input_dir=str(tmp_path), pattern="*.asc"),
+    ]
+
+    jobs, failures = plan_jobs(entries)
+
+    assert [(job.station, len(job.files)) for job in jobs] == [("sirta", 2)]
+    assert jobs[0].size == sum(file.stat().st_size for file in jobs[0].files)
+    # The generic reader needs a [reader] section
+    assert [failure.station for failure in failures] == ["generic"]
+
+
+def test_run_jobs(sirta_files, tmp_path: Path):
+    files = sirta_files(3)
+    files[1].write_text("not a SIRTA file\n")
+    manifest = tmp_path / "manifest.toml"
+    manifest.write_text(MANIFEST)
+    jobs, failures = plan_jobs(load_manifest(manifest))
+    assert len(jobs) == 3 and not failures
+
+    results = run_jobs(jobs, max_jobs=2)
+    stations, total = summarize(results, elapsed=1.0)
+
+    assert sorted(result.result.ok for result in results) == [False, True, True]
+    assert (total.outputs, total.failed, total.inputs) == (3, 1, 3)
+    assert total.rows == 2 * 1440
+    assert total.bytes_read == sum(file.stat().st_size for file in files)
+    assert stations[0].station == "sirta"
+    with xr.open_dataset(tmp_path / "out" / "sirta_20201012.nc") as ds:
+        assert ds.sizes["time"] == 1440
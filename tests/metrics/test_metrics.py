@@ -0,0 +1,109 @@
+import json
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+from ccres_weather_station.metrics.metrics import (
+    Metrics,
+    StageMetrics,
+    collect,
+    measure,
+    path_size,
+    timed,
+    timed_peak,
+)
+
+
+def test_stage_records_times_and_memory():
+    with Metrics() as metrics:
+        with metrics.stage("read", "out.nc") as record:
+            data = [0] * 100_000
+            record.rows = len(data)
+            del data
+    assert not tracemalloc.is_tracing()
+
+    (record,) = metrics.records
+    assert record.stage == "read"
+    assert record.output == "out.nc"
+    assert record.rows == 100_000
+    assert record.wall_time > 0
+    assert record.peak_memory is not None and record.peak_memory >= 800_000
+    assert metrics.total.wall_time >= record.wall_time
+
+
+def test_stage_recorded_on_error():
+    metrics = Metrics(trace_memory=False)
+    with pytest.raises(ValueError):
+        with metrics:
+            with metrics.stage("write"):
+                raise ValueError("failed")
+    assert metrics.records[0].wall_time > 0
+    assert metrics.records[0].peak_memory is None
+
+
+def test_stages_sum_records():
+    metrics = Metrics()
+    metrics.add(StageMetrics("parse", "a", rows=2, bytes_read=10, peak_memory=5))
+    metrics.add(StageMetrics("parse", "b", rows=3, bytes_read=20, peak_memory=7))
+    metrics.add(StageMetrics("write", bytes_written=4))
+
+    stages = metrics.stages()
+    assert list(stages) == ["parse", "write"]
+    assert stages["parse"].rows == 5
+    assert stages["parse"].bytes_read == 30
+    assert stages["parse"].peak_memory == 7
+    assert stages["write"].peak_memory is None
+
+
+def test_measure_without_metrics():
+    with measure(None, "read") as record:
+        record.rows = 1
+
+
+def test_timed():
+    result, wall, cpu = timed(sum, range(1000))
+    assert result == sum(range(1000))
+    assert wall >= 0 and cpu >= 0
+
+
+def test_timed_peak_keeps_stage_peak():
+    assert timed_peak(sum, range(10))[3] is None
+    with Metrics() as metrics:
+        with metrics.stage("read") as record:
+            data = [0] * 1_000_000
+            del data
+            result, _, _, peak = timed_peak(lambda: len([0] * 100_000))
+
+    assert result == 100_000
+    # The call is traced alone, the stage keeps the peak before the call
+    assert peak is not None and 800_000 <= peak < 8_000_000
+    assert record.peak_memory is not None and record.peak_memory >= 8_000_000
+    assert metrics.total.peak_memory >= record.peak_memory
+
+
+def test_path_size(tmp_path: Path):
+    assert path_size(tmp_path / "missing") == 0
+    (tmp_path / "a").write_bytes(b"12345")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "b").write_bytes(b"123")
+    assert path_size(tmp_path / "a") == 5
+    assert path_size(tmp_path) == 8
+
+
+def test_collect_writes_json_and_profile(tmp_path: Path):
+    with collect(tmp_path / "metrics.json", tmp_path / "run.prof") as metrics:
+        assert metrics is not None
+        with metrics.stage("read") as record:
+            record.rows = 3
+
+    content = json.loads((tmp_path / "metrics.json").read_text())
+    assert content["stages"]["read"]["rows"] == 3
+    assert content["records"][0]["stage"] == "read"
+    assert content["total"]["wall_time"] > 0
+    assert (tmp_path / "run.prof").stat().st_size > 0
+
+
+def test_collect_nothing():
+    with collect() as metrics:
+        assert metrics is None
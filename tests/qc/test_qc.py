@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from ccres_weather_station.config.config import Config
+from ccres_weather_station.qc.qc import COUNTS_ATTR, apply_qc, range_flags
+from ccres_weather_station.resample.resample import resample
+from ccres_weather_station.writers.write import write_nc
+
+
+@pytest.fixture()
+def ds() -> xr.Dataset:
+    return xr.Dataset(
+        {
+            "relative_humidity": ("time", np.array([-1, 50, 101, np.nan], "f4")),
+            "pressure": ("time", np.array([1000, 700, 1200, 1001], "f4")),
+            "air_temperature": ("time", np.array([10, 11, 12, 13], "f8")),
+        },
+        coords={"time": pd.date_range("2020-01-01", periods=4, freq="1min")},
+    )
+
+
+def test_range_flags(ds):
+    flags = range_flags(ds, Config.default())
+    assert list(flags["relative_humidity"]) == [1, 0, 2, 0]
+    assert list(flags["pressure"]) == [0, 1, 2, 0]
+    assert list(flags["air_temperature"]) == [0, 0, 0, 0]
+    assert flags["pressure"].dtype == np.uint8
+
+
+def test_range_flags_without_range(ds):
+    config = Config.default()
+    config.variables["pressure"].meta.valid_min = None
+    config.variables["pressure"].meta.valid_max = None
+    assert "pressure" not in range_flags(ds, config)
+
+
+def test_apply_qc(ds):
+    out = apply_qc(ds, Config.default())
+
+    qc = out["pressure_qc"]
+    assert list(qc.values) == [0, 1, 2, 0]
+    assert list(qc.attrs["flag_masks"]) == [1, 2, 4, 8, 16]
+    assert qc.attrs["flag_meanings"].startswith("below_valid_min above_valid_max")
+    assert qc.attrs["standard_name"] == "surface_air_pressure status_flag"
+    assert out["pressure"].attrs["ancillary_variables"] == "pressure_qc"
+    assert out["pressure"].values[1] == 700
+    assert out.attrs[COUNTS_ATTR] == (
+        "relative_humidity: 2, pressure: 2, air_temperature: 0"
+    )
+    assert "ancillary_variables" not in ds["pressure"].attrs
+
+
+def test_apply_qc_mask(ds):
+    out = apply_qc(ds, Config.default(), mask=True)
+    np.testing.assert_array_equal(out["pressure"], [1000, np.nan, np.nan, 1001])
+    assert out["pressure"].attrs["ancillary_variables"] == "pressure_qc"
+
+
+def test_resample_combines_flags(ds):
+    out = resample(apply_qc(ds, Config.default()), Config.default(), "2min")
+    assert list(out["relative_humidity_qc"].values) == [1, 2]
+    assert out["relative_humidity_qc"].dtype == np.uint8
+    assert "cell_methods" not in out["relative_humidity_qc"].attrs
+
+
+def test_write_qc(ds, tmp_path):
+    output = tmp_path / "qc.nc"
+    write_nc(apply_qc(ds, Config.default()), Config.default(), output)
+    with xr.open_dataset(output) as written:
+        assert written["pressure_qc"].dtype == np.uint8
+        assert written["pressure"].attrs["valid_min"] == 800
+        assert written["pressure"].attrs["valid_min"].dtype == np.float32
+        assert written["pressure"].attrs["ancillary_variables"] == "pressure_qc"
+        assert written.attrs[COUNTS_ATTR].startswith("relative_humidity: 2")
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from ccres_weather_station.config.config import Config
+from ccres_weather_station.qc.flags import FLAT_LINE, SPIKE, STEP_TOO_LARGE
+from ccres_weather_station.qc.qc import apply_qc
+from ccres_weather_station.qc.temporal import (
+    flat_line_flags,
+    spike_flags,
+    step_flags,
+    temporal_flags,
+    variable_flags,
+)
+
+
+def test_step_flags():
+    minutes = np.array([0.0, 1, 2, 12])
+    values = np.array([10.0, 11, 15, 20])
+    assert list(step_flags(minutes, values, 3.0)) == [False, False, True, False]
+
+
+def test_flat_line_flags():
+    minutes = np.arange(8.0)
+    values = np.array([1.0, 2, 2, 2, 2, 3, 3, 4])
+    flagged = flat_line_flags(minutes, values, 3.0)
+    assert list(flagged) == [False, True, True, True, True, False, False, False]
+    flagged = flat_line_flags(minutes, values + [0, 0, 0.1, 0, 0.1, 0, 0, 0], 3.0)
+    assert not flagged.any()
+    flagged = flat_line_flags(minutes, values + [0, 0, 0.1, 0, 0.1, 0, 0, 0], 3.0, 0.15)
+    assert flagged[1:5].all()
+
+
+def test_spike_flags():
+    rng = np.random.default_rng(0)
+    values = 10 + rng.normal(0, 0.1, 200)
+    values[[50, 120]] += [5, -4]
+    values[80] = np.nan
+    flagged = spike_flags(values, 21, 6.0)
+    assert list(np.flatnonzero(flagged)) == [50, 120]
+
+
+def test_spike_flags_min_deviation():
+    values = np.array([1.0, 1, 1, 1.1, 1, 1, 1, 1, 1])
+    assert spike_flags(values, 5, 3.0)[3]
+    assert not spike_flags(values, 5, 3.0, min_deviation=0.5).any()
+
+
+def test_variable_flags_ignores_missing_samples():
+    minutes = np.arange(6.0)
+    values = np.array([1.0, np.nan, np.nan, 1, 1, 9])
+    flags = variable_flags(minutes, values, {"max_step": 2.0, "flat_line_minutes": 4.0})
+    assert list(flags) == [FLAT_LINE.mask, 0, 0, FLAT_LINE.mask, FLAT_LINE.mask, 4]
+
+
+@pytest.fixture()
+def ds() -> xr.Dataset:
+    time = pd.date_range("2020-01-01", periods=120, freq="1min")
+    temperature = 10 + np.sin(np.arange(120) / 20)
+    temperature[30] += 8
+    temperature[50:] = temperature[50]
+    return xr.Dataset(
+        {
+            "air_temperature": ("time", temperature.astype("f4")),
+            "pressure": ("time", np.linspace(1000, 1010, 120, dtype="f4")),
+        },
+        coords={"time": time},
+    )
+
+
+def test_temporal_flags(ds):
+    flags = temporal_flags(ds, Config.default())["air_temperature"]
+    assert flags[30] & SPIKE.mask
+    assert flags[30] & STEP_TOO_LARGE.mask
+    assert flags[31] & STEP_TOO_LARGE.mask
+    assert (flags[50:] & FLAT_LINE.mask).all()
+    assert not flags[:30].any()
+    assert not temporal_flags(ds, Config.default())["pressure"].any()
+
+
+def test_temporal_flags_skip_range_flags(ds):
+    ds["air_temperature"][30] = 70
+    out = apply_qc(ds, Config.default())
+    assert out["air_temperature_qc"].values[30] == 2
+    assert out["air_temperature_qc"].values[31] == 0
+
+
+def test_temporal_flags_unsorted_time(ds):
+    with pytest.raises(ValueError):
+        temporal_flags(ds.isel(time=slice(None, None, -1)), Config.default())
+
+
+def test_config_qc_section(tmp_path):
+    path = tmp_path / "qc.toml"
+    path.write_text(
+        '[variables.pressure]\nname = "pressure"\n\n'
+        "[variables.pressure.qc]\nspike_window_minutes = 5.0\n"
+    )
+    config = Config.default().add_config_from_toml(path)
+    qc = config.compile().variable_qc["pressure"]
+    assert qc == {
+        "max_step": 1.0,
+        "flat_line_minutes": 240.0,
+        "spike_window_minutes": 5.0,
+    }
@@ -0,0 +1,85 @@
+import os
+from pathlib import Path
+
+import numpy as np
+
+from ccres_weather_station.config.config import Config
+from ccres_weather_station.readers.cache import ParsedCache
+from ccres_weather_station.readers.engines import ParsedColumns
+from ccres_weather_station.readers.sirta import SirtaReader
+
+
+def _parsed(size: int) -> ParsedColumns:
+    return ParsedColumns(
+        time=np.arange(size).astype("datetime64[m]").astype("datetime64[ns]"),
+        variables={"var": np.arange(size, dtype=np.float32)},
+    )
+
+
+def test_cache_put_get(tmp_path: Path, sirta_file: Path):
+    cache = ParsedCache(tmp_path / "cache")
+    assert cache.get(sirta_file, "ns") is None
+    assert cache.count(sirta_file, "ns") is None
+
+    cache.put(sirta_file, "ns", _parsed(10))
+    parsed = cache.get(sirta_file, "ns")
+    assert parsed is not None
+    np.testing.assert_array_equal(parsed.time, _parsed(10).time)
+    np.testing.assert_array_equal(parsed.variables["var"], np.arange(10))
+    assert cache.count(sirta_file, "ns") == 10
+    assert cache.get(sirta_file, "other_namespace") is None
+
+
+def test_cache_invalidated_by_modification(tmp_path: Path, sirta_file: Path):
+    cache = ParsedCache(tmp_path / "cache")
+    cache.put(sirta_file, "ns", _parsed(10))
+    with open(sirta_file, "a") as f:
+        f.write("# modified\n")
+    assert cache.get(sirta_file, "ns") is None
+
+
+def test_cache_lru_eviction(tmp_path: Path):
+    inputs = []
+    for i in range(3):
+        inputs.append(tmp_path / f"input_{i}.asc")
+        inputs[-1].write_text(str(i))
+    cache = ParsedCache(tmp_path / "cache")
+    cache.put(inputs[0], "ns", _parsed(1000))
+    entry_size = sum(f.stat().st_size for f in cache.directory.glob("*.npz"))
+    cache = ParsedCache(tmp_path / "cache", max_bytes=2 * entry_size)
+
+    cache.put(inputs[1], "ns", _parsed(1000))
+    entries = sorted(cache.directory.glob("*.npz"), key=os.path.getmtime)
+    # Make the first entry the oldest, then use it again
+    os.utime(entries[0], (0, 0))
+    os.utime(entries[1], (1, 1))
+    assert cache.get(inputs[0], "ns") is not None
+
+    cache.put(inputs[2], "ns", _parsed(1000))
+    assert cache.get(inputs[0], "ns") is not None
+    assert cache.get(inputs[1], "ns") is None
+    assert cache.get(inputs[2], "ns") is not None
+
+
+def test_cache_replaced_entry_size(tmp_path: Path, sirta_file: Path):
+    cache = ParsedCache(tmp_path / "cache")
+    for _ in range(4):
+        cache.put(sirta_file, "ns", _parsed(1000))
+
+    # Replacing an entry does not count its size twice
+    assert cache._size == sum(f.stat().st_size for f in cache.directory.glob("*.npz"))
+
+
+def test_reader_uses_cache(tmp_path: Path, sirta_files, mocker):
+    files = sirta_files(2)
+    cache = ParsedCache(tmp_path / "cache")
+    reader = SirtaReader(Config.default(), engine="numpy", cache=cache)
+    first = reader.read_files(files)
+    assert len(list(cache.directory.glob("*.npz"))) == 2
+
+    parse = mocker.patch("ccres_weather_station.readers.columnar.parse")
+    count_rows = mocker.patch("ccres_weather_station.readers.columnar.count_rows")
+    second = reader.read_files(files)
+    parse.assert_not_called()
+    count_rows.assert_not_called()
+    assert first.equals(second)
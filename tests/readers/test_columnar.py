@@ -0,0 +1,134 @@
+import datetime as dt
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from ccres_weather_station.bounders.apply_bounds import apply_bounds
+from ccres_weather_station.config.config import Config
+from ccres_weather_station.metrics.metrics import Metrics
+from ccres_weather_station.readers.columnar import get_workers
+from ccres_weather_station.readers.sirta import SirtaReader
+
+
+@pytest.mark.parametrize("engine", ["pandas", "numpy"])
+def test_read_files_parallel_keeps_order(sirta_files, engine):
+    files = sirta_files(4)
+    reader = SirtaReader(Config.default(), engine=engine)
+
+    sequential = reader.read_files(files)
+    parallel = reader.read_files(files[::-1], workers=2)
+
+    time = parallel["time"].values
+    assert time.size == 4 * 1440
+    assert np.all(time[:1440] == sequential["time"].values[-1440:])
+    assert parallel["wind_speed"].dtype == np.float32
+    assert sequential.equals(parallel.sortby("time"))
+
+
+def test_get_workers():
+    assert get_workers(None) == 1
+    assert get_workers(3) == 3
+    assert get_workers(0) >= 1
+    with pytest.raises(ValueError):
+        get_workers(-1)
+
+
+def test_read_files_preallocated(sirta_files, tmp_path):
+    files = sirta_files(2)
+    # Counted lines without data are trimmed from the preallocated arrays
+    with open(files[0], "a") as f:
+        f.write("   # indented comment\n")
+    reader = SirtaReader(Config.default(), engine="numpy")
+
+    ds = reader.read_files(files)
+    expected = xr.concat([reader.read_file(file) for file in files], dim="time")
+
+    assert reader.count_rows(files[0]) == 1441
+    assert ds.sizes["time"] == 2 * 1440
+    assert ds.equals(expected)
+
+
+def test_read_files_no_file():
+    ds = SirtaReader(Config.default()).read_files([])
+    assert ds.sizes["time"] == 0
+    assert ds["wind_speed"].dtype == np.float32
+
+
+def test_select_files(sirta_files):
+    files = sirta_files(3)
+    reader = SirtaReader(Config.default())
+    selected = reader.select_files(
+        files, dt.datetime(2020, 10, 11), dt.datetime(2020, 10, 11, 12)
+    )
+    assert selected == [files[1]]
+    assert reader.select_files(files) == files
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_read_files_between(sirta_files, workers):
+    files = sirta_files(3)
+    config = Config.default()
+    reader = SirtaReader(config, engine="numpy")
+    start, end = dt.datetime(2020, 10, 11, 6), dt.datetime(2020, 10, 12)
+    # Out of range files are pruned by name and never opened
+    files[0].unlink()
+
+    ds = reader.read_files(files, workers=workers, start_date=start, end_date=end)
+    expected = apply_bounds(reader.read_files(files[1:]), config, start, end)
+
+    assert ds.sizes["time"] == 18 * 60 + 1
+    assert ds.equals(expected)
+
+
+def test_plan_built_once_per_config():
+    reader = SirtaReader(Config.default())
+    assert SirtaReader(Config.default()).plan is reader.plan
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_read_files_metrics(sirta_files, workers):
+    files = sirta_files(2)
+    reader = SirtaReader(Config.default(), engine="numpy")
+    with Metrics() as metrics:
+        reader.read_files(
+            files,
+            workers=workers,
+            start_date=dt.datetime(2020, 10, 10, 12),
+            metrics=metrics,
+        )
+
+    records = metrics.records
+    assert [record.input_file for record in records] == [str(f) for f in files]
+    assert all(record.stage == "parse" for record in records)
+    assert [record.rows for record in records] == [720, 1440]
+    assert records[1].bytes_read == files[1].stat().st_size
+    assert records[1].cpu_time > 0
+    # Only the files parsed in this process are traced
+    if workers == 1:
+        assert all(record.peak_memory > 0 for record in records)
+    else:
+        assert all(record.peak_memory is None for record in records)
+
+
+def test_read_files_merge_duplicates(sirta_files):
+    files = sirta_files(2)
+    reader = SirtaReader(Config.default(), engine="numpy")
+
+    ds = reader.read_files([files[1], files[0], files[1]], duplicates="last")
+
+    time = ds["time"].values
+    assert time.size == 2 * 1440
+    assert np.all(time[1:] > time[:-1])
+    assert ds.equals(reader.read_files(files))
+
+
+def test_read_files_regular_grid(sirta_files):
+    files = sirta_files(3)
+    reader = SirtaReader(Config.default(), engine="numpy")
+
+    ds = reader.read_files([files[2], files[0]], regular=True)
+
+    assert ds.sizes["time"] == 3 * 1440
+    assert np.isnan(ds["wind_speed"].values[1440:2880]).all()
+    assert not np.isnan(ds["wind_speed"].values[:1440]).all()
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from ccres_weather_station.readers.dataset import dataset_from_columns
+
+
+def test_dataset_from_columns_shares_memory():
+    time = np.arange("2020-10-10", "2020-10-11", dtype="datetime64[m]").astype(
+        "datetime64[ns]"
+    )
+    values = np.arange(time.size, dtype="float32")
+
+    ds = dataset_from_columns(time, {"ta": values}, "time", attrs={"site": "x"})
+
+    assert np.shares_memory(ds["ta"].values, values)
+    assert np.shares_memory(ds["time"].values, time)
+    assert ds["ta"].dims == ("time",)
+    assert ds.attrs == {"site": "x"}
+    assert ds.sel(time=time[10])["ta"].item() == 10
+
+
+def test_dataset_from_columns_converts_time_unit():
+    time = np.arange(3).astype("datetime64[s]")
+    ds = dataset_from_columns(time, {"ta": np.zeros(3)}, "time")
+    assert ds["time"].dtype == np.dtype("datetime64[ns]")
+    assert ds["time"].values[1] == np.datetime64(1, "s")
+
+
+def test_dataset_from_columns_empty():
+    ds = dataset_from_columns(
+        np.array([], dtype="datetime64[ns]"), {"ta": np.array([])}, "time"
+    )
+    assert ds.sizes["time"] == 0
+
+
+@pytest.mark.parametrize(
+    "time, values",
+    [
+        (np.arange(3), np.zeros(3)),
+        (np.arange(3).astype("datetime64[ns]"), np.zeros(2)),
+        (np.arange(3).astype("datetime64[ns]"), np.zeros((3, 1))),
+    ],
+)
+def test_dataset_from_columns_invalid(time, values):
+    with pytest.raises(ValueError):
+        dataset_from_columns(time, {"ta": values}, "time")
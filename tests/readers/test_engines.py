@@ -0,0 +1,153 @@
+import datetime as dt
+from dataclasses import replace
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ccres_weather_station.readers.engines import (
+    ParsePlan,
+    check_engine,
+    count_rows,
+    decode_iso8601,
+    line_time,
+    parse,
+    read_edge_lines,
+    select_engine,
+    supported_engines,
+)
+
+PLAN = ParsePlan(
+    time_name="time",
+    time_position=0,
+    variables=(("wind_speed", 1), ("pressure", 5), ("precipitation_rate", 6)),
+)
+
+
+def test_decode_iso8601():
+    stamps = np.array(
+        [b"2020-10-10T00:00:00Z", b"2020-02-29T23:59:59Z", b"1969-12-31T12:30:00Z"]
+    )
+    time = decode_iso8601(stamps)
+    expected = pd.to_datetime(
+        ["2020-10-10T00:00:00", "2020-02-29T23:59:59", "1969-12-31T12:30:00"]
+    )
+    assert time.dtype == np.dtype("datetime64[ns]")
+    np.testing.assert_array_equal(time, expected.values)
+
+
+@pytest.mark.parametrize(
+    "stamp",
+    [b"2020-10-10 00:00:00Z", b"2020-13-10T00:00:00Z", b"2021-02-29T00:00:00Z"],
+)
+def test_decode_iso8601_bad_format(stamp):
+    with pytest.raises(ValueError):
+        decode_iso8601(np.array([stamp]))
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        check_engine("fortran")
+
+
+@pytest.mark.parametrize("engine", ["numpy", "pyarrow"])
+def test_engines_match_pandas(sirta_file: Path, engine: str):
+    if engine == "pyarrow":
+        pytest.importorskip("pyarrow")
+    reference = parse(sirta_file, PLAN, "pandas")
+    parsed = parse(sirta_file, PLAN, engine)
+
+    assert len(parsed) == len(reference) == 1440
+    np.testing.assert_array_equal(parsed.time, reference.time)
+    for name, values in reference.variables.items():
+        assert parsed.variables[name].dtype == np.float32
+        np.testing.assert_array_equal(parsed.variables[name], values)
+
+
+@pytest.mark.parametrize("engine", ["pandas", "pyarrow", "numpy"])
+def test_engines_comments_and_spaces(tmp_path: Path, engine: str):
+    if engine == "pyarrow":
+        pytest.importorskip("pyarrow")
+    path = tmp_path / "file.asc"
+    path.write_text(
+        "# header\n"
+        "\n"
+        "2020-10-10T00:00:00Z  1.0 2 3 4 5 6 # trailing comment\n"
+        "2020-10-10T00:01:00Z\t1.5 2 3 4 nan 6  \r\n"
+    )
+    parsed = parse(path, PLAN, engine)
+    assert len(parsed) == 2
+    np.testing.assert_array_equal(parsed.variables["wind_speed"], [1.0, 1.5])
+    assert np.isnan(parsed.variables["pressure"][1])
+
+
+def test_numpy_engine_inconsistent_columns(tmp_path: Path):
+    path = tmp_path / "file.asc"
+    path.write_text("2020-10-10T00:00:00Z 1 2 3 4 5 6\n2020-10-10T00:01:00Z 1 2\n")
+    with pytest.raises(ValueError):
+        parse(path, PLAN, "numpy")
+
+
+@pytest.mark.parametrize("engine", ["numpy", "pandas"])
+def test_engine_errors_name_the_file(tmp_path: Path, engine: str):
+    path = tmp_path / "file.asc"
+    path.write_text("2020-10-10 00:00:00 1 2 3 4 5 6\n")
+    with pytest.raises(ValueError, match="file.asc"):
+        parse(path, PLAN, engine)
+
+
+def test_count_rows(tmp_path: Path, sirta_file: Path):
+    path = tmp_path / "file.asc"
+    path.write_text("# header\n\n2020-10-10T00:00:00Z 1 2 3 4 5 6\n# comment\n")
+    assert count_rows(path) == 1
+    assert count_rows(sirta_file) == 1440
+    assert count_rows(sirta_file, block_size=100) == 1440
+    path.write_text("time\n\n; note\n2020-10-10T00:00:00Z 1\n")
+    assert count_rows(path, comment=";", skip_rows=1, block_size=7) == 1
+
+
+def test_parsed_columns_between(sirta_file: Path):
+    parsed = parse(sirta_file, PLAN, "numpy")
+    assert parsed.between() is parsed
+    assert parsed.between(dt.datetime(2020, 10, 9)) is parsed
+
+    cropped = parsed.between(dt.datetime(2020, 10, 10, 1), dt.datetime(2020, 10, 10, 2))
+    assert len(cropped) == 61
+    assert cropped.time[0] == np.datetime64("2020-10-10T01:00")
+    np.testing.assert_array_equal(
+        cropped.variables["pressure"], parsed.variables["pressure"][60:121]
+    )
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 65536])
+def test_read_edge_lines(tmp_path: Path, block_size: int):
+    path = tmp_path / "edges.asc"
+    path.write_bytes(
+        b"# header\n\n  2020-10-10T00:00:00Z 1 2 # note\n"
+        b"2020-10-10T00:01:00Z 3 4\n2020-10-10T00:02:00Z 5 6\n# end\n\n"
+    )
+    first, last = read_edge_lines(path, block_size=block_size)
+    assert first == b"2020-10-10T00:00:00Z 1 2"
+    assert last == b"2020-10-10T00:02:00Z 5 6"
+    assert line_time(last, PLAN) == np.datetime64("2020-10-10T00:02")
+
+    path.write_bytes(b"time a b\n2020-10-10T00:00:00Z 1 2\n")
+    first, last = read_edge_lines(path, skip_rows=1, block_size=block_size)
+    assert first == last == b"2020-10-10T00:00:00Z 1 2"
+    assert read_edge_lines(path, skip_rows=2, block_size=block_size) is None
+
+    path.write_bytes(b"# header only\n")
+    assert read_edge_lines(path) is None
+
+
+def test_supported_engines():
+    assert supported_engines(PLAN)[0] == "numpy"
+    assert select_engine(PLAN, "auto") == "numpy"
+    fixed = replace(PLAN, spans=((0, 20), (21, 26), (27, 32), (33, 38)))
+    assert supported_engines(fixed) == ("pandas",)
+    with pytest.raises(ValueError):
+        select_engine(fixed, "numpy")
+    text_missing = replace(PLAN, missing_values=("-999", "NA"))
+    assert text_missing.missing_numbers == (-999.0,)
+    assert supported_engines(text_missing) == ("pandas",)
@@ -0,0 +1,181 @@
+import datetime as dt
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from ccres_weather_station.config.config import Config
+from ccres_weather_station.readers.generic import GenericReader
+from ccres_weather_station.readers.sirta import SirtaReader
+
+SIRTA_LAYOUT = """
+[reader]
+layout = "whitespace"
+time_column = 0
+file_pattern = '_(\\d{8})_000000_1440\\.'
+file_date_format = "%Y%m%d"
+file_period = "1D"
+
+[reader.columns]
+wind_speed = 1
+wind_direction = 2
+air_temperature = 3
+relative_humidity = 4
+pressure = 5
+precipitation_rate = 6
+"""
+
+CSV_LAYOUT = """
+[reader]
+layout = "delimited"
+delimiter = ";"
+time_column = 1
+time_format = "%d/%m/%Y %H:%M"
+skip_rows = 1
+missing_values = ["-999", "NA"]
+
+[reader.columns]
+air_temperature = 2
+pressure = 3
+"""
+
+CSV = (
+    "station;time;ta;p\n"
+    "x;10/10/2020 00:00;12.5;1013.2\n"
+    "x;10/10/2020 00:10;-999;1013.1\n"
+    "# maintenance\n"
+    "x;10/10/2020 00:20;12.1;NA\n"
+)
+
+FIXED_LAYOUT = """
+[reader]
+layout = "fixed_width"
+time_column = [0, 12]
+time_format = "%Y%m%d%H%M"
+missing_values = ["-99.9"]
+
+[reader.columns]
+air_temperature = [12, 18]
+relative_humidity = [18, 23]
+"""
+
+FIXED = "202010100000  12.5 80.1\n202010100010 -99.9 79.5\n"
+
+
+def _config(tmp_path: Path, layout: str) -> Config:
+    path = tmp_path / "station.toml"
+    path.write_text(layout)
+    return Config.default().add_config_from_toml(path)
+
+
+@pytest.mark.parametrize("engine", ["auto", "pandas", "numpy"])
+def test_sirta_layout_matches_sirta_reader(sirta_files, tmp_path, engine):
+    files = sirta_files(2)
+    reader = GenericReader(_config(tmp_path, SIRTA_LAYOUT), engine=engine)
+
+    expected = SirtaReader(Config.default()).read_files(files)
+
+    assert reader.read_files(files).equals(expected)
+    assert reader.file_coverage(files[1]) == (
+        dt.datetime(2020, 10, 11),
+        dt.datetime(2020, 10, 12),
+    )
+    assert reader.file_extent(files[0]) is not None
+
+
+def test_auto_engine_is_numpy(tmp_path):
+    reader = GenericReader(_config(tmp_path, SIRTA_LAYOUT))
+    assert reader.engine == "numpy"
+    assert GenericReader(_config(tmp_path, FIXED_LAYOUT)).engine == "pandas"
+
+
+@pytest.mark.parametrize("engine", ["auto", "pandas"])
+def test_delimited_layout(tmp_path, engine):
+    config = _config(tmp_path, CSV_LAYOUT)
+    file = tmp_path / "station.csv"
+    file.write_text(CSV)
+
+    ds = GenericReader(config, engine=engine).read_files([file])
+
+    np.testing.assert_array_equal(
+        ds["time"].values,
+        np.array(
+            ["2020-10-10T00:00", "2020-10-10T00:10", "2020-10-10T00:20"],
+            dtype="datetime64[ns]",
+        ),
+    )
+    np.testing.assert_allclose(ds["air_temperature"].values, [12.5, np.nan, 12.1])
+    np.testing.assert_allclose(ds["pressure"].values, [1013.2, 1013.1, np.nan])
+    assert ds["air_temperature"].dtype == np.float32
+    # The header line is neither counted nor taken as the first row
+    assert GenericReader(config).count_rows(file) == 3
+    assert GenericReader(config).file_extent(file) == (
+        np.datetime64("2020-10-10T00:00", "ns"),
+        np.datetime64("2020-10-10T00:20", "ns"),
+    )
+
+
+def test_delimited_layout_numeric_missing_values(tmp_path):
+    pytest.importorskip("pyarrow")
+    layout = CSV_LAYOUT.replace('"NA"', '"-9999"')
+    config = _config(tmp_path, layout)
+    file = tmp_path / "station.csv"
+    file.write_text(CSV.replace("NA", "-9999"))
+
+    reader = GenericReader(config)
+    expected = GenericReader(config, engine="pandas").read_files([file])
+
+    assert reader.engine == "pyarrow"
+    assert reader.read_files([file]).equals(expected)
+
+
+def test_delimited_layout_empty_field(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    layout = '[reader]\nlayout = "delimited"\ndelimiter = ","\n'
+    layout += "[reader.columns]\nair_temperature = 1\npressure = 2\n"
+    file = tmp_path / "station.csv"
+    file.write_text("2020-10-10T00:00:00Z,12.5,1013.2\n2020-10-10T00:01:00Z,,1013.1\n")
+
+    reader = GenericReader(_config(tmp_path, layout))
+
+    assert reader.engine == "pandas"
+    ds = reader.read_files([file])
+    np.testing.assert_allclose(ds["air_temperature"].values, [12.5, np.nan])
+    np.testing.assert_allclose(ds["pressure"].values, [1013.2, 1013.1])
+
+
+def test_fixed_width_layout(tmp_path):
+    file = tmp_path / "station.txt"
+    file.write_text(FIXED)
+
+    ds = GenericReader(_config(tmp_path, FIXED_LAYOUT)).read_files([file])
+
+    assert ds["time"].values[1] == np.datetime64("2020-10-10T00:10")
+    np.testing.assert_allclose(ds["air_temperature"].values, [12.5, np.nan])
+    np.testing.assert_allclose(ds["relative_humidity"].values, [80.1, 79.5])
+
+
+def test_engine_not_supporting_layout(tmp_path):
+    with pytest.raises(ValueError, match="cannot parse this layout"):
+        GenericReader(_config(tmp_path, FIXED_LAYOUT), engine="numpy")
+
+
+@pytest.mark.parametrize(
+    "layout, match",
+    [
+        ("", "no \\[reader\\] section"),
+        ('[reader]\nlayout = "json"\n[reader.columns]\npressure = 1\n', "layout"),
+        ('[reader]\nlayout = "delimited"\n[reader.columns]\npressure = 1\n', "delim"),
+        ("[reader]\n[reader.columns]\nvisibility = 1\n", "unknown variables"),
+        ("[reader]\n[reader.columns]\npressure = [1, 2]\n", "positive index"),
+        (
+            '[reader]\nlayout = "fixed_width"\n[reader.columns]\npressure = 1\n',
+            "span",
+        ),
+        ("[reader]\nfile_pattern = 'x'\n[reader.columns]\npressure = 1\n", "group"),
+    ],
+)
+def test_invalid_layout(tmp_path, layout, match):
+    with pytest.raises(ValueError, match=match):
+        GenericReader(_config(tmp_path, layout))
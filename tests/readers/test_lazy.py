@@ -0,0 +1,162 @@
+import datetime as dt
+
+import pytest
+import xarray as xr
+
+from ccres_weather_station.bounders.apply_bounds import apply_bounds
+from ccres_weather_station.config.config import Config
+from ccres_weather_station.readers.lazy import (
+    PARSE_MEMORY_FACTOR,
+    lazy_scheduler,
+    lazy_workers,
+)
+from ccres_weather_station.readers.sirta import SirtaReader
+from ccres_weather_station.writers import write as write_module
+from ccres_weather_station.writers.write import write_nc, write_zarr
+
+pytest.importorskip("dask")
+
+
+def test_read_files_lazy_one_chunk_per_file(sirta_files):
+    files = sirta_files(3)
+    reader = SirtaReader(Config.default(), engine="numpy")
+
+    ds = reader.read_files_lazy(files)
+
+    assert ds["air_temperature"].chunks == ((1440, 1440, 1440),)
+    assert ds.load().equals(reader.read_files(files))
+
+
+@pytest.mark.parametrize("engine", ["pandas", "pyarrow", "numpy"])
+def test_read_files_lazy_parses_only_time_upfront(sirta_files, monkeypatch, engine):
+    if engine == "pyarrow":
+        pytest.importorskip("pyarrow")
+    files = sirta_files(2)
+    reader = SirtaReader(Config.default(), engine=engine)
+    expected = reader.read_files(files)
+    parsed = []
+    parse_file = reader.parse_file
+    monkeypatch.setattr(
+        reader, "parse_file", lambda path: parsed.append(path) or parse_file(path)
+    )
+
+    ds = reader.read_files_lazy(files)
+
+    assert parsed == []
+    assert ds.sizes["time"] == 2880
+    assert ds.load().equals(expected)
+    assert sorted(parsed) == sorted(map(str, files))
+
+
+def test_read_files_lazy_bounds(sirta_files):
+    files = sirta_files(3)
+    config = Config.default()
+    reader = SirtaReader(config, engine="numpy")
+    start, end = dt.datetime(2020, 10, 10, 12), dt.datetime(2020, 10, 11, 6)
+
+    ds = apply_bounds(reader.read_files_lazy(files, 2, start, end), config, start, end)
+
+    assert ds["air_temperature"].chunks is not None
+    assert ds["air_temperature"].chunks == ((720, 361),)
+    expected = apply_bounds(reader.read_files(files), config, start, end)
+    assert ds.load().equals(expected)
+
+
+def test_apply_bounds_stays_lazy(sirta_files):
+    files = sirta_files(3)
+    config = Config.default()
+    ds = SirtaReader(config, engine="numpy").read_files_lazy(files)
+
+    bounded = apply_bounds(ds, config, dt.datetime(2020, 10, 11), None)
+
+    assert bounded["pressure"].chunks == ((1440, 1440),)
+
+
+@pytest.mark.parametrize("scheduler", ["threads", "processes"])
+def test_write_nc_lazy(sirta_files, tmp_path, scheduler):
+    files = sirta_files(3)
+    config = Config.default()
+    reader = SirtaReader(config, engine="numpy")
+    output = tmp_path / "lazy.nc"
+
+    with lazy_scheduler(2, scheduler):
+        write_nc(reader.read_files_lazy(files), config, output, preset="balanced")
+
+    with xr.open_dataset(output) as ds:
+        assert ds.load().equals(reader.read_files(files))
+
+
+def test_write_zarr_lazy_misaligned_chunks(sirta_files, tmp_path):
+    pytest.importorskip("zarr")
+    files = sirta_files(2)
+    config = Config.default()
+    reader = SirtaReader(config, engine="numpy")
+    output = tmp_path / "lazy.zarr"
+
+    with lazy_scheduler(2):
+        write_zarr(reader.read_files_lazy(files), config, output, read_period="7h")
+
+    with xr.open_zarr(output) as ds:
+        assert ds["air_temperature"].encoding["chunks"] == (420,)
+        assert ds.load().equals(reader.read_files(files))
+
+
+def test_write_nc_lazy_append(sirta_files, tmp_path, monkeypatch):
+    files = sirta_files(3)
+    config = Config.default()
+    reader = SirtaReader(config, engine="numpy")
+    output = tmp_path / "lazy.nc"
+    write_nc(reader.read_files(files[:1]), config, output, mode="a")
+    blocks = []
+    monkeypatch.setattr(
+        xr.Dataset, "compute", lambda self: pytest.fail("Dataset computed at once")
+    )
+    store = write_module._AppendTarget.__setitem__
+    monkeypatch.setattr(
+        write_module._AppendTarget,
+        "__setitem__",
+        lambda self, key, values: blocks.append(values.size)
+        or store(self, key, values),
+    )
+
+    with lazy_scheduler(2):
+        write_nc(reader.read_files_lazy(files), config, output, mode="a")
+
+    assert set(blocks) == {1440}
+    with xr.open_dataset(output) as ds:
+        assert ds.load().equals(reader.read_files(files))
+
+
+def test_write_zarr_lazy_append(sirta_files, tmp_path, monkeypatch):
+    pytest.importorskip("zarr")
+    files = sirta_files(3)
+    config = Config.default()
+    reader = SirtaReader(config, engine="numpy")
+    output = tmp_path / "lazy.zarr"
+    first = reader.read_files(files[:1]).isel(time=slice(0, 1000))
+    write_zarr(first, config, output, read_period="7h")
+    monkeypatch.setattr(
+        xr.Dataset, "compute", lambda self: pytest.fail("Dataset computed at once")
+    )
+
+    with lazy_scheduler(2):
+        write_zarr(reader.read_files_lazy(files), config, output, mode="a")
+
+    with xr.open_zarr(output) as ds:
+        assert ds["air_temperature"].encoding["chunks"] == (420,)
+        assert ds.load().equals(reader.read_files(files))
+
+
+def test_lazy_workers(sirta_files):
+    files = sirta_files(2)
+    per_file = files[0].stat().st_size * PARSE_MEMORY_FACTOR
+
+    assert lazy_workers(files, per_file * 3, max_workers=8) == 3
+    assert lazy_workers(files, per_file * 3, max_workers=2) == 2
+    assert lazy_workers(files, 1, max_workers=8) == 1
+
+
+def test_lazy_scheduler_unknown():
+    with pytest.raises(ValueError):
+        with lazy_scheduler(1, "cluster"):
+            pass
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from ccres_weather_station.readers.engines import ParsedColumns
+from ccres_weather_station.readers.merge import (
+    drop_duplicates,
+    merge_dataset,
+    merge_runs,
+    regular_grid,
+    sort_runs,
+)
+
+
+def _parsed(minutes, values) -> ParsedColumns:
+    return ParsedColumns(
+        time=np.datetime64("2020-01-01", "ns")
+        + np.array(minutes) * np.timedelta64(1, "m"),
+        variables={"x": np.array(values, dtype="float32")},
+    )
+
+
+def _minutes(parsed: ParsedColumns):
+    return list((parsed.time - parsed.time[0]) // np.timedelta64(1, "m"))
+
+
+def test_sort_runs():
+    parsed = _parsed([3, 4, 5, 0, 1, 2], [3, 4, 5, 0, 1, 2])
+    merged = sort_runs(parsed)
+    assert _minutes(merged) == [0, 1, 2, 3, 4, 5]
+    assert list(merged.variables["x"]) == [0, 1, 2, 3, 4, 5]
+
+
+def test_sort_runs_sorted_is_not_copied():
+    parsed = _parsed([0, 1, 2], [0, 1, 2])
+    assert sort_runs(parsed) is parsed
+
+
+@pytest.mark.parametrize(
+    "duplicates, expected",
+    [
+        ("first", [0, np.nan, 2, 3]),
+        ("last", [0, 11, 12, 3]),
+        ("first_valid", [0, 11, 2, 3]),
+    ],
+)
+def test_drop_duplicates(duplicates, expected):
+    parsed = sort_runs(_parsed([0, 1, 2, 1, 2, 3], [0, np.nan, 2, 11, 12, 3]))
+    merged = drop_duplicates(parsed, duplicates)
+    assert _minutes(merged) == [0, 1, 2, 3]
+    np.testing.assert_array_equal(merged.variables["x"], expected)
+
+
+def test_drop_duplicates_unknown_policy():
+    with pytest.raises(ValueError):
+        drop_duplicates(_parsed([0, 0], [1, 2]), "mean")
+
+
+def test_regular_grid():
+    parsed = _parsed([0, 1, 2, 5, 6], [0, 1, 2, 5, 6])
+    gridded = regular_grid(parsed)
+    assert _minutes(gridded) == list(range(7))
+    np.testing.assert_array_equal(
+        gridded.variables["x"], [0, 1, 2, np.nan, np.nan, 5, 6]
+    )
+
+
+def test_regular_grid_drops_rows_off_the_grid():
+    gridded = regular_grid(_parsed([0, 2, 3, 4, 6, 8], [0, 2, 3, 4, 6, 8]))
+    assert _minutes(gridded) == [0, 2, 4, 6, 8]
+    np.testing.assert_array_equal(gridded.variables["x"], [0, 2, 4, 6, 8])
+
+
+def test_merge_runs_overlapping_files():
+    parsed = _parsed([2, 3, 4, 0, 1, 2], [2, 3, 4, 0, 1, 20])
+    merged = merge_runs(parsed, "last", regular=True)
+    assert _minutes(merged) == [0, 1, 2, 3, 4]
+    np.testing.assert_array_equal(merged.variables["x"], [0, 1, 20, 3, 4])
+
+
+def test_merge_dataset_keeps_attrs_and_other_variables():
+    parsed = _parsed([2, 3, 0, 1, 2], [2, 3, 0, 1, 5])
+    ds = xr.Dataset(
+        {"x": ("time", parsed.variables["x"], {"units": "K"}), "altitude": 156.0},
+        coords={"time": parsed.time},
+        attrs={"site": "SIRTA"},
+    )
+
+    merged = merge_dataset(ds, "time", "last")
+
+    assert list(merged["x"].values) == [0, 1, 5, 3]
+    assert merged["x"].attrs == {"units": "K"}
+    assert merged["altitude"] == 156.0
+    assert merged.attrs == {"site": "SIRTA"}
@@ -1,8 +1,23 @@
+import importlib.metadata
+import sys
+
+import numpy as np
+import pandas as pd
 import pytest
 import xarray as xr
+from click.testing import CliRunner
 
+from ccres_weather_station.cli import cli
+from ccres_weather_station.readers import register
 from ccres_weather_station.readers.base import BaseReader
-from ccres_weather_station.readers.register import READERS, register_reader
+from ccres_weather_station.readers.register import (
+    ENTRY_POINT_GROUP,
+    READERS,
+    available_readers,
+    declared_readers,
+    get_reader_class,
+    register_reader,
+)
 from ccres_weather_station.types import PathLike
 
 
@@ -33,3 +48,95 @@ def test_register_bad_reader():
 
     with pytest.raises(TypeError):
         register_reader(BadReader, "bad_reader")
+
+
+@pytest.fixture()
+def plugin(tmp_path, monkeypatch):
+    """Declare a reader of a module not imported yet as an entry point."""
+    (tmp_path / "plugin_reader.py").write_text(
+        "import pandas as pd\n"
+        "import xarray as xr\n"
+        "from ccres_weather_station.readers.base import BaseReader\n\n"
+        "class PluginReader(BaseReader):\n"
+        "    def read_file(self, file):\n"
+        "        df = pd.read_csv(file, parse_dates=['time'], index_col='time')\n"
+        "        return df.to_xarray()\n\n"
+        "    def read_files(self, files):\n"
+        "        return xr.concat([self.read_file(f) for f in files], 'time')\n\n"
+        "class NotAReader:\n"
+        "    pass\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "plugin_reader", raising=False)
+    declared = dict(declared_readers())
+    for name, value in [
+        ("plugin", "plugin_reader:PluginReader"),
+        ("not_a_reader", "plugin_reader:NotAReader"),
+    ]:
+        declared[name] = importlib.metadata.EntryPoint(name, value, ENTRY_POINT_GROUP)
+    monkeypatch.setattr(register, "_DECLARED", declared)
+    monkeypatch.setattr(register, "READERS", dict(READERS))
+    return declared
+
+
+def test_declared_reader_loaded_on_demand(plugin):
+    assert "plugin" in available_readers()
+    assert "plugin_reader" not in sys.modules
+
+    reader_class = get_reader_class("Plugin")
+
+    assert reader_class.__name__ == "PluginReader"
+    assert "plugin_reader" in sys.modules
+    assert get_reader_class("plugin") is reader_class
+
+
+def test_declared_reader_not_implementing_base(plugin):
+    with pytest.raises(TypeError):
+        get_reader_class("not_a_reader")
+
+
+def test_builtin_reader_declared():
+    assert "sirta" in declared_readers()
+    assert get_reader_class("SIRTA").__name__ == "SirtaReader"
+    with pytest.raises(ValueError, match="Available readers are"):
+        get_reader_class("unknown")
+
+
+def test_convert_with_plugin_reader(plugin, tmp_path):
+    files = []
+    for index, start in enumerate(["2021-03-01 00:00", "2021-03-01 12:00"]):
+        time = pd.date_range(start, periods=24, freq="1h")
+        files.append(tmp_path / f"plugin_{index}.csv")
+        pd.DataFrame({"time": time, "air_temperature": float(index)}).to_csv(
+            files[-1], index=False
+        )
+    output_file = tmp_path / "out.nc"
+
+    result = CliRunner().invoke(
+        cli.main,
+        [
+            "--station",
+            "plugin",
+            "--input-files",
+            files[0],
+            "--input-files",
+            files[1],
+            "--output-file",
+            output_file,
+            "--start-date",
+            "2021-03-01",
+            "--end-date",
+            "2021-03-02",
+            "--duplicates",
+            "last",
+            "--workers",
+            "2",
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    with xr.open_dataset(output_file) as ds:
+        assert ds.sizes["time"] == 25
+        assert ds["time"].to_index().is_monotonic_increasing
+        np.testing.assert_array_equal(ds["air_temperature"][:12], 0)
+        np.testing.assert_array_equal(ds["air_temperature"][12:], 1)
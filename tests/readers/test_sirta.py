@@ -1,3 +1,4 @@
+import datetime as dt
 from pathlib import Path
 
 import pandas as pd
@@ -34,3 +35,11 @@ def test_sirta_reader_one_file():
     assert time[0] == pd.Timestamp(2020, 10, 10, 0, 0, 0)
     assert time[-1] == pd.Timestamp(2020, 10, 10, 23, 59, 0)
     assert config.coords["time"].name in ds.coords
+
+
+def test_sirta_file_coverage():
+    reader = SirtaReader(config=Config.default())
+    start, end = reader.file_coverage(SIRTA_FILE)
+    assert start == dt.datetime(2020, 10, 10)
+    assert end == dt.datetime(2020, 10, 11)
+    assert reader.file_coverage("meteo.asc") is None
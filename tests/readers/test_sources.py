@@ -0,0 +1,143 @@
+import gzip
+import lzma
+import tarfile
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from ccres_weather_station.config.config import Config
+from ccres_weather_station.metrics.metrics import Metrics
+from ccres_weather_station.readers.cache import ParsedCache
+from ccres_weather_station.readers.sirta import SirtaReader
+from ccres_weather_station.readers.sources import (
+    expand_archives,
+    input_size,
+    is_plain,
+    iter_inputs,
+    prefetch,
+    read_input,
+    split_member,
+)
+
+
+def _gzip(file: Path) -> Path:
+    out = file.with_name(file.name + ".gz")
+    out.write_bytes(gzip.compress(file.read_bytes()))
+    return out
+
+
+def _zip(files: list, path: Path) -> Path:
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for file in files:
+            archive.write(file, file.name)
+    return path
+
+
+def _tar(files: list, path: Path) -> Path:
+    with tarfile.open(path, "w:gz") as archive:
+        for file in files:
+            archive.add(file, file.name)
+    return path
+
+
+def test_split_member():
+    assert split_member("a/b.zip::c/d.asc") == (Path("a/b.zip"), "c/d.asc")
+    assert split_member(Path("a/b.asc")) == (Path("a/b.asc"), None)
+
+
+def test_read_compressed(tmp_path):
+    plain = tmp_path / "a.asc"
+    plain.write_bytes(b"1 2\n3 4\n")
+    xz = tmp_path / "a.asc.xz"
+    xz.write_bytes(lzma.compress(plain.read_bytes()))
+
+    gz = _gzip(plain)
+
+    assert is_plain(plain)
+    assert not is_plain(gz)
+    assert read_input(gz) == read_input(xz) == plain.read_bytes()
+    assert input_size(gz) == input_size(plain) == 8
+
+
+def test_expand_archives(sirta_files, tmp_path):
+    files = sirta_files(2)
+    archive = _zip(files, tmp_path / "october.zip")
+
+    members = expand_archives([archive, files[0]])
+
+    assert members == [
+        Path(f"{archive}::{files[0].name}"),
+        Path(f"{archive}::{files[1].name}"),
+        files[0],
+    ]
+    assert read_input(members[1]) == files[1].read_bytes()
+    assert input_size(members[1]) == files[1].stat().st_size
+
+
+def test_iter_inputs_tar_of_gzip(sirta_files, tmp_path):
+    files = sirta_files(3)
+    archive = _tar([_gzip(file) for file in files], tmp_path / "october.tar.gz")
+    members = expand_archives([archive])
+
+    skipped = members[1]
+    data = list(prefetch(iter_inputs(members, skip=lambda m: m == skipped)))
+
+    assert data == [files[0].read_bytes(), None, files[2].read_bytes()]
+
+
+def test_prefetch_raises_at_failed_item():
+    def _items():
+        yield b"a"
+        raise OSError("corrupted")
+
+    items = prefetch(_items())
+    assert next(items) == b"a"
+    with pytest.raises(OSError, match="corrupted"):
+        next(items)
+
+
+def test_prefetch_stops_producer():
+    produced = []
+
+    def _items():
+        for i in range(100):
+            produced.append(i)
+            yield bytes([i])
+
+    items = prefetch(_items(), ahead=1)
+    assert next(items) == b"\x00"
+    items.close()
+    assert len(produced) < 100
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_read_files_archives(sirta_files, tmp_path, workers):
+    files = sirta_files(3)
+    reader = SirtaReader(Config.default())
+    expected = reader.read_files(files)
+
+    zipped = _zip(files[:2], tmp_path / "october.zip")
+    metrics = Metrics(trace_memory=False)
+    ds = reader.read_files([zipped, _gzip(files[2])], workers=workers, metrics=metrics)
+
+    assert ds.equals(expected)
+    parse = [record for record in metrics.records if record.stage == "parse"]
+    assert [record.rows for record in parse] == [1440] * 3
+    assert parse[0].bytes_read == files[0].stat().st_size
+
+
+def test_read_files_archive_cached(sirta_files, tmp_path):
+    files = sirta_files(2)
+    archive = _tar(files, tmp_path / "october.tar.gz")
+    reader = SirtaReader(Config.default(), cache=ParsedCache(tmp_path / "cache"))
+
+    first = reader.read_files([archive])
+    member = expand_archives([archive])[0]
+    assert reader.cache is not None
+    assert reader.cache.count(member, reader.cache_namespace) == 1440
+    second = reader.read_files([archive])
+
+    assert first.equals(second)
+    assert np.all(np.diff(second["time"].values) > np.timedelta64(0))
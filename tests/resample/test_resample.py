@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from ccres_weather_station.config.config import Config
+from ccres_weather_station.resample.resample import Bins, resample, time_method
+
+
+def _dataset(time, **variables) -> xr.Dataset:
+    return xr.Dataset(
+        {
+            name: ("time", np.asarray(values, "f4"))
+            for name, values in variables.items()
+        },
+        coords={"time": pd.to_datetime(time)},
+    )
+
+
+@pytest.fixture()
+def config() -> Config:
+    config = Config.default()
+    config.variables["precipitation_rate"].meta.cell_methods = "time: sum"
+    config.variables["pressure"].meta.cell_methods = "area: mean time: maximum"
+    return config
+
+
+def test_time_method():
+    assert time_method(None) == "mean"
+    assert time_method("area: mean time: sum") == "sum"
+    assert time_method("area: mean") == "mean"
+    with pytest.raises(ValueError):
+        time_method("time: mode")
+
+
+def test_bins_are_aligned_and_regular():
+    time = pd.to_datetime(["2020-01-01 00:07", "2020-01-01 00:12", "2020-01-01 00:41"])
+    bins = Bins(time.values, pd.Timedelta("10min"))
+    assert list(bins.labels) == list(
+        pd.date_range("2020-01-01 00:00", "2020-01-01 00:40", freq="10min").values
+    )
+    assert list(bins.index) == [0, 1, 4]
+
+
+def test_resample_methods(config):
+    time = pd.date_range("2020-01-01", periods=6, freq="5min")
+    ds = _dataset(
+        time,
+        air_temperature=[1, 3, np.nan, np.nan, 5, np.nan],
+        precipitation_rate=[1, 2, np.nan, np.nan, 4, 4],
+        pressure=[1000, 1002, 1001, 1003, np.nan, 1004],
+    )
+
+    out = resample(ds, config, "10min")
+
+    assert list(out["time"].values) == list(time[::2].values)
+    np.testing.assert_allclose(out["air_temperature"], [2, np.nan, 5])
+    np.testing.assert_allclose(out["precipitation_rate"], [3, np.nan, 8])
+    np.testing.assert_allclose(out["pressure"], [1002, 1003, 1004])
+    assert out["air_temperature"].dtype == np.float32
+    assert out["air_temperature"].attrs["cell_methods"] == "time: mean"
+    assert out["precipitation_rate"].attrs["cell_methods"] == "time: sum"
+    assert out["pressure"].attrs["cell_methods"] == "time: maximum"
+
+
+def test_resample_fills_empty_bins(config):
+    time = pd.to_datetime(["2020-01-01 00:00", "2020-01-01 00:35"])
+    out = resample(_dataset(time, air_temperature=[1, 2]), config, "10min")
+    np.testing.assert_allclose(out["air_temperature"], [1, np.nan, np.nan, 2])
+
+
+def test_resample_wind_direction_as_vectors(config):
+    time = pd.date_range("2020-01-01", periods=4, freq="1min")
+    ds = _dataset(
+        time,
+        wind_direction=[350, 10, 90, 270],
+        wind_speed=[1, 1, 1, 3],
+    )
+
+    out = resample(ds, config, "2min")
+
+    np.testing.assert_allclose(out["wind_direction"], [0, 270], atol=1e-4)
+    np.testing.assert_allclose(out["wind_speed"], [1, 2])
+    assert out["wind_direction"].attrs["cell_methods"] == (
+        "time: mean (comment: vector average weighted by wind_speed)"
+    )
+
+
+def test_resample_sorts_time(config):
+    time = pd.to_datetime(["2020-01-01 00:11", "2020-01-01 00:01", "2020-01-01 00:02"])
+    out = resample(_dataset(time, air_temperature=[5, 1, 2]), config, "10min")
+    np.testing.assert_allclose(out["air_temperature"], [1.5, 5])
+
+
+def test_resample_invalid_period(config):
+    ds = _dataset(pd.date_range("2020-01-01", periods=2), air_temperature=[1, 2])
+    with pytest.raises(ValueError):
+        resample(ds, config, "0min")
+    with pytest.raises(ValueError):
+        resample(ds, config, "ten minutes")
+
+
+def test_run_batch_resample(sirta_files, tmp_path):
+    from ccres_weather_station.batch.batch import run_batch
+    from ccres_weather_station.readers.sirta import SirtaReader
+
+    config = Config.default()
+    reader = SirtaReader(config, engine="numpy")
+    pattern = str(tmp_path / "{date:%Y%m%d}.nc")
+
+    results = run_batch(
+        reader, config, sirta_files(1), pattern, "sirta", resample_period="10min"
+    )
+
+    assert results[0].ok
+    with xr.open_dataset(results[0].output) as ds:
+        assert ds["time"].size == 144
+        assert ds["wind_direction"].attrs["cell_methods"].startswith("time: mean (")
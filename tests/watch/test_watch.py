@@ -0,0 +1,167 @@
+from pathlib import Path
+
+import pytest
+import xarray as xr
+
+from ccres_weather_station.config.config import Config
+from ccres_weather_station.readers.generic import GenericReader
+from ccres_weather_station.readers.sirta import SirtaReader
+from ccres_weather_station.watch.watch import (
+    FileState,
+    WatchState,
+    ingest,
+    read_new_lines,
+    watch,
+)
+from tests.conftest import write_sirta_file
+
+SIRTA_NAME = "meteoairsol_1a_Lz1NairF1minPtuvPrain_v01_{}_000000_1440.asc"
+
+HEADERED_LAYOUT = """
+[reader]
+layout = "delimited"
+delimiter = ","
+skip_rows = 2
+
+[reader.columns]
+air_temperature = 1
+"""
+
+
+def _split(path: Path, n_lines: int) -> bytes:
+    """Keep the header and n_lines of a file plus half a line, get the rest."""
+    content = path.read_bytes()
+    lines = content.splitlines(keepends=True)
+    kept = b"".join(lines[: 2 + n_lines]) + lines[2 + n_lines][:10]
+    path.write_bytes(kept)
+    return content[len(kept) :]
+
+
+@pytest.fixture()
+def reader() -> SirtaReader:
+    return SirtaReader(Config.default(), engine="numpy")
+
+
+def test_read_new_lines(tmp_path: Path):
+    path = tmp_path / "data.txt"
+    path.write_bytes(b"a\nb\nc")
+
+    data, state = read_new_lines(path, FileState())
+    assert data == b"a\nb\n"
+    assert state.offset == 4
+
+    with path.open("ab") as f:
+        f.write(b"d\ne")
+    data, state = read_new_lines(path, state)
+    assert data == b"cd\n"
+    assert state.offset == 7
+
+    path.write_bytes(b"x\n")
+    data, state = read_new_lines(path, state)
+    assert data == b"x\n"
+    assert state.offset == 2
+
+
+def test_state_roundtrip(tmp_path: Path):
+    state = WatchState(tmp_path / "state.json")
+    state.files["/data/a.asc"] = FileState(offset=10, inode=2, mtime_ns=3)
+    state.save()
+
+    assert WatchState.load(state.path) == state
+    assert WatchState.load(tmp_path / "missing.json").files == {}
+
+
+def test_ingest_growing_file(reader, tmp_path: Path):
+    inputs = tmp_path / "inputs"
+    inputs.mkdir()
+    path = write_sirta_file(inputs / SIRTA_NAME.format("20201010"))
+    rest = _split(path, 100)
+    pattern = str(tmp_path / "out" / "{station}_{date:%Y%m}.nc")
+    output = tmp_path / "out" / "sirta_202010.nc"
+    state = WatchState(tmp_path / "state.json")
+
+    results = ingest(reader, reader.config, [path], state, pattern, "sirta")
+    assert [result.ok for result in results] == [True]
+    with xr.open_dataset(output) as ds:
+        assert ds.sizes["time"] == 100
+
+    # Nothing new, the partial line is still being written
+    assert ingest(reader, reader.config, [path], state, pattern, "sirta") == []
+
+    with path.open("ab") as f:
+        f.write(rest)
+    restarted = WatchState.load(state.path)
+    results = ingest(reader, reader.config, [path], restarted, pattern, "sirta")
+    assert [result.ok for result in results] == [True]
+    with xr.open_dataset(output) as ds:
+        expected = reader.read_file(path)
+        assert ds.sizes["time"] == 1440
+        assert (ds["time"].values == expected["time"].values).all()
+        xr.testing.assert_allclose(
+            ds["air_temperature"].reset_coords(drop=True),
+            expected["air_temperature"],
+        )
+    assert restarted.files[str(path.resolve())].offset == path.stat().st_size
+
+
+def test_ingest_header_written_in_parts(tmp_path: Path):
+    config_file = tmp_path / "station.toml"
+    config_file.write_text(HEADERED_LAYOUT)
+    reader = GenericReader(Config.default().add_config_from_toml(config_file))
+    path = tmp_path / "station.csv"
+    output = tmp_path / "out.nc"
+    state = WatchState(tmp_path / "state.json")
+
+    # Only the first header line is flushed
+    path.write_text("station somewhere\n")
+    results = ingest(reader, reader.config, [path], state, str(output), "x")
+    assert [result.ok for result in results] == [True]
+    assert state.files[str(path.resolve())].header == 1
+
+    with path.open("a") as f:
+        f.write("time,ta\n2020-10-10T00:00:00Z,12.5\n2020-10-10T00:01:00Z,12.6\n")
+    restarted = WatchState.load(state.path)
+    results = ingest(reader, reader.config, [path], restarted, str(output), "x")
+    assert [result.ok for result in results] == [True]
+    assert restarted.files[str(path.resolve())].header == 0
+    with xr.open_dataset(output) as ds:
+        assert ds["air_temperature"].values.tolist() == pytest.approx([12.5, 12.6])
+
+
+def test_ingest_bad_file_retried(reader, tmp_path: Path):
+    path = tmp_path / SIRTA_NAME.format("20201010")
+    path.write_text("2020-10-10T00:00:00Z 1 2\n")
+    state = WatchState(tmp_path / "state.json")
+
+    results = ingest(
+        reader, reader.config, [path], state, str(tmp_path / "out.nc"), "sirta"
+    )
+
+    assert [result.ok for result in results] == [False]
+    assert state.files == {}
+    assert not (tmp_path / "out.nc").exists()
+
+
+def test_watch_once(reader, tmp_path: Path):
+    inputs = tmp_path / "inputs"
+    inputs.mkdir()
+    for day in ("20201010", "20201011"):
+        write_sirta_file(inputs / SIRTA_NAME.format(day), start=day)
+    passes = []
+
+    watch(
+        reader,
+        reader.config,
+        inputs,
+        WatchState(tmp_path / "state.json"),
+        str(tmp_path / "{station}.nc"),
+        "sirta",
+        pattern="*.asc",
+        once=True,
+        on_pass=passes.append,
+    )
+
+    assert len(passes) == 1
+    with xr.open_dataset(tmp_path / "sirta.nc") as ds:
+        assert ds.sizes["time"] == 2880
+        assert ds["time"].to_index().is_monotonic_increasing
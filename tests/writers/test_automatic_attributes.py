@@ -5,6 +5,7 @@ import pytest
 import xarray as xr
 
 from ccres_weather_station.writers.write import (
+    _get_software_git_infos,
     add_created_date,
     add_date_metadata_modified,
     add_history,
@@ -85,6 +86,15 @@ def test_add_history(ds):
     assert "TAG" in ds.attrs["history"]
 
 
+def test_software_git_infos_cached(mocker):
+    _get_software_git_infos.cache_clear()
+    repo = mocker.patch("git.Repo")
+    first = _get_software_git_infos()
+    assert _get_software_git_infos() == first
+    repo.assert_called_once()
+    _get_software_git_infos.cache_clear()
+
+
 def test_add_created_date(ds):
     ds = add_created_date(ds)
     assert "created_date" in ds.attrs
@@ -0,0 +1,95 @@
+from pathlib import Path
+
+import netCDF4
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from ccres_weather_station.config.config import Config, VariableEncoding
+from ccres_weather_station.writers.encoding import (
+    apply_preset,
+    auto_chunksize,
+    check_preset,
+    measure_presets,
+)
+from ccres_weather_station.writers.write import ConfigWriter, write_nc
+
+
+@pytest.fixture()
+def ds():
+    time = pd.date_range("2020-01-01", periods=3 * 1440, freq="1min")
+    return xr.Dataset(
+        {
+            "wind_speed": ("time", np.random.default_rng(0).random(time.size, "f4")),
+            "pressure": ("time", np.full(time.size, 1013.0, dtype="f4")),
+        },
+        coords={"time": time},
+    )
+
+
+def test_auto_chunksize(ds):
+    time = ds["time"].values
+    assert auto_chunksize(time) == 1440
+    assert auto_chunksize(time, "1h") == 60
+    assert auto_chunksize(time, "full") == time.size
+    assert auto_chunksize(time, "30D") == time.size
+    assert auto_chunksize(time, "full", itemsize=4, max_chunk_bytes=4000) == 1000
+    assert auto_chunksize(time[:1]) == 1
+    assert auto_chunksize(time[:0]) is None
+
+
+def test_check_preset():
+    assert check_preset("archive") == "archive"
+    with pytest.raises(ValueError):
+        check_preset("smallest")
+
+
+def test_apply_preset_keeps_config(ds):
+    encoding = {"pressure": {"zlib": False, "chunksizes": (10,)}}
+    completed = apply_preset(ds, encoding, "time", "balanced", "1h")
+
+    assert encoding == {"pressure": {"zlib": False, "chunksizes": (10,)}}
+    assert completed["pressure"] == {
+        "zlib": False,
+        "chunksizes": (10,),
+        "complevel": 1,
+        "shuffle": True,
+    }
+    assert completed["wind_speed"]["zlib"] is True
+    assert completed["wind_speed"]["chunksizes"] == (60,)
+    assert completed["time"]["chunksizes"] == (60,)
+
+
+def test_chunksizes_config():
+    assert VariableEncoding(chunksizes=1440).chunksizes == (1440,)
+    assert VariableEncoding(chunksizes=[1440]).chunksizes == (1440,)
+
+
+def test_write_nc_preset(ds, tmp_path: Path):
+    config = Config.default()
+    write_nc(ds, config, tmp_path / "fast.nc", preset="fast-write")
+    write_nc(ds, config, tmp_path / "archive.nc", preset="archive")
+
+    with netCDF4.Dataset(tmp_path / "archive.nc") as nc:
+        var = nc.variables["pressure"]
+        assert var.filters()["zlib"] is True
+        assert var.filters()["complevel"] == 9
+        assert var.chunking() == [1440]
+    assert (tmp_path / "archive.nc").stat().st_size < (
+        tmp_path / "fast.nc"
+    ).stat().st_size
+    with xr.open_dataset(tmp_path / "archive.nc") as written:
+        assert written["wind_speed"].equals(ds["wind_speed"])
+
+
+def test_measure_presets(ds):
+    encoding = ConfigWriter(Config.default()).get_encoding(ds)
+    ds["time"].encoding.update(encoding["time"])
+
+    measures = measure_presets(ds, "time")
+
+    assert [m.preset for m in measures] == ["fast-write", "balanced", "archive"]
+    sizes = {m.preset: m.size for m in measures}
+    assert sizes["archive"] < sizes["fast-write"]
+    assert all(m.write_time > 0 and m.read_time > 0 for m in measures)
@@ -63,3 +63,58 @@ def test_write(ds, config, tmp_path: Path):
     assert not output_file.exists()
     write_nc(ds, config, output_file)
     assert output_file.exists()
+
+
+def test_write_append(ds, config, tmp_path: Path):
+    output_file = tmp_path / "test.nc"
+    write_nc(ds.isel(time=slice(0, 10)), config, output_file, mode="a")
+    write_nc(ds.isel(time=slice(10, None)), config, output_file, mode="a")
+
+    with xr.open_dataset(output_file) as written:
+        assert written["time"].size == ds["time"].size
+        assert (written["time"].values == ds["time"].values).all()
+        assert written["var"].dtype == "float32"
+        assert "time" in written.encoding["unlimited_dims"]
+        assert written.attrs["time_coverage_start"] == "2010-01-01T00:00:00"
+        assert written.attrs["time_coverage_end"] == "2010-01-02T00:00:00"
+        assert written.attrs["time_coverage_duration"] == "P1DT0H0M0S"
+        assert written.attrs["time_coverage_resolution"] == "P0DT1H0M0S"
+        assert written.attrs["history"].startswith("Created on")
+        assert "\nAppended on" in written.attrs["history"]
+
+
+def test_write_append_skips_existing_records(ds, config, tmp_path: Path):
+    output_file = tmp_path / "test.nc"
+    write_nc(ds.isel(time=slice(0, 10)), config, output_file, mode="a")
+    write_nc(ds.isel(time=slice(5, 12)), config, output_file, mode="a")
+
+    with xr.open_dataset(output_file) as written:
+        assert written["time"].size == 12
+        assert written.attrs["time_coverage_end"] == "2010-01-01T11:00:00"
+
+
+def test_write_append_unknown_variable(ds, config, tmp_path: Path):
+    output_file = tmp_path / "test.nc"
+    write_nc(ds.isel(time=slice(0, 10)), config, output_file, mode="a")
+    extra = ds.isel(time=slice(10, 15)).assign(flag=lambda ds: ds["var"] + 1)
+    with pytest.raises(ValueError, match="flag"):
+        write_nc(extra, config, output_file, mode="a")
+
+    # The file is left as it was, the records can be appended again
+    with xr.open_dataset(output_file) as written:
+        assert written["time"].size == 10
+    write_nc(ds.isel(time=slice(10, 15)), config, output_file, mode="a")
+    with xr.open_dataset(output_file) as written:
+        assert written["time"].size == 15
+
+
+def test_write_append_fixed_time(ds, config, tmp_path: Path):
+    output_file = tmp_path / "test.nc"
+    write_nc(ds.isel(time=slice(0, 10)), config, output_file)
+    with pytest.raises(ValueError):
+        write_nc(ds.isel(time=slice(10, None)), config, output_file, mode="a")
+
+
+def test_write_bad_mode(ds, config, tmp_path: Path):
+    with pytest.raises(ValueError):
+        write_nc(ds, config, tmp_path / "test.nc", mode="r")
@@ -0,0 +1,54 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from ccres_weather_station.config.config import Config
+from ccres_weather_station.writers.write import get_writer, write_nc, write_zarr
+
+zarr = pytest.importorskip("zarr")
+
+
+@pytest.fixture()
+def ds():
+    time = pd.date_range("2020-01-01", periods=3 * 1440, freq="1min")
+    return xr.Dataset(
+        {"wind_speed": ("time", np.random.default_rng(0).random(time.size, "f4"))},
+        coords={"time": time},
+    )
+
+
+def test_write_zarr(ds, tmp_path: Path):
+    output = tmp_path / "out.zarr"
+    write_zarr(ds, Config.default(), output, preset="balanced", read_period="1h")
+
+    group = zarr.open_consolidated(str(output))
+    assert group["wind_speed"].chunks == (60,)
+    assert group["wind_speed"].compressor == zarr.Zlib(level=1)
+    with xr.open_zarr(output) as written:
+        assert written["wind_speed"].equals(ds["wind_speed"])
+        assert written["wind_speed"].attrs["long_name"] == "Wind speed"
+        assert written.attrs["time_coverage_end"] == "2020-01-03T23:59:00"
+
+
+def test_write_zarr_append(ds, tmp_path: Path):
+    output = tmp_path / "out.zarr"
+    config = Config.default()
+    write_zarr(ds.isel(time=slice(0, 1440)), config, output, mode="a")
+    write_zarr(ds.isel(time=slice(1000, None)), config, output, mode="a")
+
+    with xr.open_zarr(output) as written:
+        assert written["wind_speed"].equals(ds["wind_speed"])
+        assert written.attrs["time_coverage_start"] == "2020-01-01T00:00:00"
+        assert written.attrs["time_coverage_end"] == "2020-01-03T23:59:00"
+        assert written.attrs["time_coverage_resolution"] == "P0DT0H1M0S"
+        assert written.attrs["history"].splitlines()[1].startswith("Appended on")
+
+
+def test_get_writer():
+    assert get_writer("netcdf") is write_nc
+    assert get_writer("zarr") is write_zarr
+    with pytest.raises(ValueError):
+        get_writer("grib")